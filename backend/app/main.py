@@ -1,6 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import aws, policies, custodian, auth
+from app.services.async_inventory import async_inventory
+from app.services.c7n_engine import c7n_engine
+from app.services.change_events import change_event_consumer
+from app.services.custodian_jobs import custodian_jobs
+from app.services.inventory_service import inventory_refresher
+from app.services.rate_limiter import RetryBudget, current_retry_budget
+import asyncio
 import os
 
 app = FastAPI(
@@ -23,8 +30,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+@app.middleware("http")
+async def aws_retry_budget(request: Request, call_next):
+    """Give each request its own budget of AWS retries"""
+    token = current_retry_budget.set(RetryBudget())
+    try:
+        return await call_next(request)
+    finally:
+        current_retry_budget.reset(token)
+
 # Include routers
 app.include_router(aws.router, prefix="/api/aws", tags=["AWS"])
 app.include_router(policies.router, prefix="/api/policies", tags=["Policies"])
@@ -36,5 +53,21 @@ async def root():
     """Health check endpoint"""
     return {"status": "ok", "message": "Cloud Custodian UI API is running"}
 
+@app.on_event("startup")
+async def start_inventory_refresher():
+    """Start background refresh of stored inventory snapshots, the change event consumer and the c7n workers"""
+    inventory_refresher.start()
+    change_event_consumer.start()
+    c7n_engine.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    """Stop background refresh, event consumption, custodian jobs and c7n workers, and close pooled aiobotocore clients"""
+    await inventory_refresher.stop()
+    await change_event_consumer.stop()
+    await custodian_jobs.shutdown()
+    await asyncio.to_thread(c7n_engine.stop)
+    await async_inventory.close()
+
 # Create output directory for custodian runs if it doesn't exist
 os.makedirs(os.path.join(os.getcwd(), "outputs"), exist_ok=True)
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.services.json_encoding import dumps
+from app.services.response_cache import CachedResponse, etag_matches, negotiate_encoding, response_cache
+from app.services.single_flight import single_flight
+
+# Bodies at least this large are compressed off the event loop
+_THREAD_COMPRESS_BYTES = 256 * 1024
+
+# Query parameters that force a recompute rather than select content; left
+# out of the key so a refresh overwrites the entry plain requests read.
+# max_age stays in the key: a response built from older inventory must not
+# answer a request asking for fresher data
+_CONTROL_PARAMS = {'refresh', 'refresh_regions'}
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with json_encoding.dumps()
+
+    Returning one from a route skips FastAPI's jsonable_encoder pass, so
+    large record lists are encoded once, directly to bytes.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _cacheable(content: Any) -> bool:
+    # Errors and partial results are sent but never reused
+    return not (isinstance(content, dict) and (content.get('error') or content.get('partial')))
+
+
+async def cached_json_response(request: Request, scope: str, compute: Callable[[], Awaitable[Any]],
+                               ttl: Optional[int] = None, refresh: bool = False, key: Tuple[Hashable, ...] = (),
+                               principal: str = '') -> Response:
+    """Serve a JSON route through the response cache
+
+    Responses are keyed by scope, principal, request path, query
+    parameters other than the refresh controls and any extra key parts
+    (e.g. a revision of the underlying data). A hit skips compute() and
+    serialization; concurrent misses share one compute(). Either way the
+    response carries a strong ETag, a matching If-None-Match gets a 304
+    and the body is compressed as negotiated.
+
+    Args:
+        request: The incoming request
+        scope: Account scope (or '' for data shared by every caller)
+        compute: Coroutine function producing the response content
+        ttl: Seconds to keep the response (defaults to RESPONSE_CACHE_TTL)
+        refresh: Recompute even when a cached response exists
+        key: Extra key parts
+        principal: Caller scope for AWS data, so a response is only served to
+            the principal it was computed for; invalidating the scope still
+            drops every principal's entries
+    """
+    params = tuple(sorted(item for item in request.query_params.multi_items() if item[0] not in _CONTROL_PARAMS))
+    cache_key = (principal, request.url.path, params) + tuple(key)
+    entry = None if refresh else response_cache.get(scope, cache_key)
+    if entry is None:
+        async def _build() -> CachedResponse:
+            content = await compute()
+            return response_cache.put(scope, cache_key, dumps(content), ttl if _cacheable(content) else 0)
+
+        entry = await single_flight.do(('response', scope, cache_key, refresh), _build)
+    return await conditional_response(request, entry)
+
+
+async def conditional_response(request: Request, entry: CachedResponse) -> Response:
+    """304 when the client already holds the entry, otherwise its body in the negotiated encoding"""
+    headers = {'ETag': entry.etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), entry.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    if encoding and len(entry.body) >= _THREAD_COMPRESS_BYTES:
+        body, encoding = await asyncio.to_thread(entry.variant, encoding)
+    else:
+        body, encoding = entry.variant(encoding)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, media_type="application/json", headers=headers)
@@ -1,9 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.schemas.aws import AWSCredentials, ResourceSummary
-from app.services.aws_service import AWSService
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.responses import FastJSONResponse, cached_json_response
+from app.schemas.aws import AWSCredentials, OrganizationRequest, ResourceSummary
+from app.services.aws_service import AWSService, SUMMARY_REGION_TIMEOUT
+from app.services.change_events import EVENTS_INGEST_TOKEN, change_event_processor, iter_events
+from app.services.detail_collectors import DETAIL_COLLECTIONS
+from app.services.fanout_executor import fanout_executor
+from app.services.rate_limiter import rate_limiter
+from app.services.inventory_service import INVENTORY_MAX_AGE, InventoryService
+from app.services.json_encoding import dumps
+from app.services.organization_service import OrganizationService
+from app.services.resource_query import ResourceQuery
+from app.services.response_cache import RESPONSE_CACHE_TTL, response_cache
 from app.services.session_service import get_aws_session
 from app.middleware import requires_permission, requires_role
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import hmac
+import asyncio
 import logging
 
 router = APIRouter()
@@ -20,51 +33,367 @@ async def validate_credentials(credentials: AWSCredentials):
         logger.error(f"Error validating credentials: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Invalid AWS credentials: {str(e)}")
 
+@router.get("/fanout/stats", dependencies=[Depends(requires_permission("read"))])
+async def get_fanout_stats():
+    """Get saturation metrics for the regional fan-out executor, throttled API rate limits and response cache hits"""
+    return {**fanout_executor.stats(), 'rate_limits': rate_limiter.stats(), 'response_cache': response_cache.stats()}
+
+@router.post("/events", dependencies=[Depends(requires_permission("write"))])
+async def ingest_change_events(request: Request, x_events_token: Optional[str] = Header(None)):
+    """Apply resource-change events to the inventory, tag and response caches
+    
+    Accepts one EventBridge event, a list of them, or a CloudTrail
+    {"Records": [...]} document. Only the affected account, region and
+    resources are updated.
+    
+    Args:
+        x_events_token: Shared secret, required when EVENTS_INGEST_TOKEN is set
+    """
+    if EVENTS_INGEST_TOKEN and not hmac.compare_digest(x_events_token or "", EVENTS_INGEST_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid events token")
+    try:
+        events = list(iter_events(await request.json()))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid event payload: {str(e)}")
+    try:
+        results = await asyncio.to_thread(change_event_processor.process_batch, events)
+        return {'processed': len(results), 'applied': sum(1 for r in results if r['changes']), 'results': results}
+    except Exception as e:
+        logger.error(f"Error processing change events: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error processing change events: {str(e)}")
+
 @router.post("/resources/summary", dependencies=[Depends(requires_permission("read"))])
-async def get_resource_summary(credentials: AWSCredentials):
-    """Get summary of AWS resources across services"""
-    aws_service = AWSService(credentials)
+async def get_resource_summary(request: Request, credentials: AWSCredentials, refresh_regions: bool = False, max_age: int = INVENTORY_MAX_AGE):
+    """Get summary of AWS resources across services
+    
+    The serialized response is cached per account and caller; it carries an ETag and
+    an unchanged summary is answered with 304.
+    
+    Args:
+        credentials: AWS credentials
+        refresh_regions: Force a fresh region discovery
+        max_age: Maximum age in seconds of stored inventory to count from (0 forces a live refresh)
+    """
+    inventory_service = await InventoryService(credentials).resolve()
     try:
-        summary = await aws_service.get_resource_summary()
-        return summary
+        return await cached_json_response(
+            request, inventory_service.account_scope,
+            lambda: inventory_service.get_summary(max_age=max_age, refresh_regions=refresh_regions),
+            ttl=min(RESPONSE_CACHE_TTL, max_age), refresh=max_age == 0 or refresh_regions,
+            principal=inventory_service.scope,
+        )
     except Exception as e:
         logger.error(f"Error getting resource summary: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error retrieving AWS resources: {str(e)}")
 
-@router.post("/resources/{service}", dependencies=[Depends(requires_permission("read"))])
-async def get_resources(service: str, credentials: AWSCredentials):
-    """Get resources for a specific AWS service"""
+@router.post("/resources/summary/stream", dependencies=[Depends(requires_permission("read"))])
+async def stream_resource_summary(credentials: AWSCredentials, refresh_regions: bool = False, region_timeout: float = SUMMARY_REGION_TIMEOUT, format: str = "sse"):
+    """Stream per-region summary results as they complete
+    
+    Emits one `region` event per service/region (timed-out regions are marked
+    `partial`) followed by a final `summary` event.
+    
+    Args:
+        credentials: AWS credentials
+        refresh_regions: Force a fresh region discovery
+        region_timeout: Per-region deadline in seconds
+        format: 'sse' (Server-Sent Events) or 'ndjson'
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
     aws_service = AWSService(credentials)
+
+    async def events():
+        try:
+            async for event in aws_service.stream_resource_summary(refresh_regions=refresh_regions, region_timeout=region_timeout):
+                payload = dumps(event).decode('utf-8')
+                yield f"event: {event['type']}\ndata: {payload}\n\n" if format == "sse" else payload + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming resource summary: {str(e)}")
+            payload = dumps({'type': 'error', 'detail': str(e)}).decode('utf-8')
+            yield f"event: error\ndata: {payload}\n\n" if format == "sse" else payload + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@router.post("/resources/{service}", dependencies=[Depends(requires_permission("read"))])
+async def get_resources(
+    request: Request,
+    service: str,
+    credentials: AWSCredentials,
+    refresh_regions: bool = False,
+    max_age: int = INVENTORY_MAX_AGE,
+    region: Optional[str] = None,
+    state: Optional[str] = None,
+    instance_type: Optional[str] = None,
+    tag_key: Optional[str] = None,
+    tag_value: Optional[str] = None,
+    engine: Optional[str] = None,
+    runtime: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Get resources for a specific AWS service
+    
+    Without filter or paging parameters the full list is returned. Otherwise a
+    single page is returned along with a `next_cursor` for the following page.
+    
+    Args:
+        service: The AWS service name
+        credentials: AWS credentials
+        refresh_regions: Force a fresh region discovery
+        max_age: Maximum age in seconds of stored inventory to serve (0 forces a live refresh)
+        region, state, instance_type, engine, runtime: Filters (comma-separated values allowed)
+        tag_key, tag_value: Only resources carrying this tag (and value)
+        sort: Field to sort by, prefixed with '-' for descending order
+        fields: Comma-separated fields to include in each record
+        cursor: `next_cursor` from the previous page
+        limit: Page size
+    """
+    inventory_service = await InventoryService(credentials).resolve()
     try:
-        resources = await aws_service.get_resources(service)
-        return resources
+        query = ResourceQuery(
+            region=region, state=state, instance_type=instance_type, tag_key=tag_key, tag_value=tag_value,
+            engine=engine, runtime=runtime, sort=sort, fields=fields, cursor=cursor, limit=limit
+        )
+        return await cached_json_response(
+            request, inventory_service.account_scope,
+            lambda: inventory_service.get_resources(service, max_age=max_age, refresh_regions=refresh_regions, query=query),
+            ttl=min(RESPONSE_CACHE_TTL, max_age), refresh=max_age == 0 or refresh_regions,
+            principal=inventory_service.scope,
+        )
     except Exception as e:
         logger.error(f"Error getting resources for {service}: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error retrieving {service} resources: {str(e)}")
 
 @router.post("/resources/{service}/tags", dependencies=[Depends(requires_permission("read"))])
-async def get_resource_tags(service: str, credentials: AWSCredentials):
+async def get_resource_tags(request: Request, service: str, credentials: AWSCredentials, refresh_regions: bool = False):
     """Get all tags used in a specific service"""
-    aws_service = AWSService(credentials)
+    aws_service = await AWSService(credentials).resolve()
     try:
-        tags = await aws_service.get_resource_tags(service)
-        return tags
+        return await cached_json_response(
+            request, aws_service.account_scope,
+            lambda: aws_service.get_resource_tags(service, refresh_regions=refresh_regions),
+            refresh=refresh_regions, principal=aws_service.scope,
+        )
     except Exception as e:
         logger.error(f"Error getting tags for {service}: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error retrieving {service} tags: {str(e)}")
 
+def _tag_response(index, errors: List[str], **body) -> Dict[str, Any]:
+    """Attach index freshness and region errors to a tag query result"""
+    body['as_of'] = index.as_of()
+    if errors:
+        body['errors'] = errors
+    return body
+
+@router.post("/org/resources/summary", dependencies=[Depends(requires_permission("read"))])
+async def get_organization_summary(request: OrganizationRequest, refresh_regions: bool = False):
+    """Get resource summaries for every account of an organization
+    
+    Args:
+        request: Hub credentials plus the role ARNs (or role name) to assume
+        refresh_regions: Force a fresh region discovery in each account
+    """
+    organization_service = OrganizationService(request.credentials, request.role_arns, request.role_name, request.external_id)
+    try:
+        return await organization_service.get_resource_summary(refresh_regions=refresh_regions)
+    except Exception as e:
+        logger.error(f"Error getting organization summary: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving organization resources: {str(e)}")
+
+@router.post("/org/resources/{service}", dependencies=[Depends(requires_permission("read"))])
+async def get_organization_resources(
+    service: str,
+    request: OrganizationRequest,
+    refresh_regions: bool = False,
+    region: Optional[str] = None,
+    state: Optional[str] = None,
+    instance_type: Optional[str] = None,
+    tag_key: Optional[str] = None,
+    tag_value: Optional[str] = None,
+    engine: Optional[str] = None,
+    runtime: Optional[str] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """Get a service's resources across the accounts of an organization
+    
+    Every record carries the `account_id` it was found in. Filter and paging
+    parameters behave as for /resources/{service}.
+    
+    Args:
+        service: The AWS service name
+        request: Hub credentials plus the role ARNs (or role name) to assume
+        refresh_regions: Force a fresh region discovery in each account
+    """
+    organization_service = OrganizationService(request.credentials, request.role_arns, request.role_name, request.external_id)
+    try:
+        query = ResourceQuery(
+            region=region, state=state, instance_type=instance_type, tag_key=tag_key, tag_value=tag_value,
+            engine=engine, runtime=runtime, sort=sort, fields=fields, cursor=cursor, limit=limit
+        )
+        return FastJSONResponse(await organization_service.get_resources(service, refresh_regions=refresh_regions, query=query))
+    except Exception as e:
+        logger.error(f"Error getting organization resources for {service}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving {service} resources: {str(e)}")
+
+@router.post("/tags/keys", dependencies=[Depends(requires_permission("read"))])
+async def get_tag_keys(credentials: AWSCredentials, resource_type: Optional[str] = None, refresh: bool = False, refresh_regions: bool = False):
+    """List tag keys across all services with resource and distinct value counts
+    
+    Args:
+        credentials: AWS credentials
+        resource_type: Optional Tagging API resource type (e.g. 'ec2:instance', 's3')
+        refresh: Re-read every region instead of only stale ones
+        refresh_regions: Force a fresh region discovery
+    """
+    aws_service = AWSService(credentials)
+    try:
+        index, errors = await aws_service.refresh_tag_index(force=refresh, refresh_regions=refresh_regions)
+        return _tag_response(index, errors, keys=index.keys(resource_type), resource_types=index.resource_types())
+    except Exception as e:
+        logger.error(f"Error getting tag keys: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving tag keys: {str(e)}")
+
+@router.post("/tags/{key:path}/values", dependencies=[Depends(requires_permission("read"))])
+async def get_tag_values(key: str, credentials: AWSCredentials, resource_type: Optional[str] = None, refresh: bool = False):
+    """List the values of one tag key with the number of resources carrying each
+    
+    Args:
+        key: Tag key; may contain '/' (e.g. kubernetes.io/cluster/<name>)
+        credentials: AWS credentials
+        resource_type: Optional Tagging API resource type
+        refresh: Re-read every region instead of only stale ones
+    """
+    aws_service = AWSService(credentials)
+    try:
+        index, errors = await aws_service.refresh_tag_index(force=refresh)
+        values = index.values(key, resource_type)
+        return _tag_response(index, errors, key=key, count=sum(values.values()), values=values)
+    except Exception as e:
+        logger.error(f"Error getting values of tag {key}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving tag values: {str(e)}")
+
+@router.post("/tags/{key:path}/resources", dependencies=[Depends(requires_permission("read"))])
+async def get_tagged_resources(key: str, credentials: AWSCredentials, value: Optional[str] = None, missing: bool = False,
+                               resource_type: Optional[str] = None, limit: Optional[int] = None, refresh: bool = False):
+    """List resources carrying a tag key (optionally with a value), or lacking it
+    
+    Args:
+        key: Tag key; may contain '/' (e.g. kubernetes.io/cluster/<name>)
+        credentials: AWS credentials
+        value: Only resources where the key has this value
+        missing: Return resources without the key instead
+        resource_type: Optional Tagging API resource type
+        limit: Maximum number of resources returned; count is always the full total
+        refresh: Re-read every region instead of only stale ones
+    """
+    if missing and value is not None:
+        raise HTTPException(status_code=400, detail="value cannot be combined with missing")
+    aws_service = AWSService(credentials)
+    try:
+        index, errors = await aws_service.refresh_tag_index(force=refresh)
+        resources = index.resources(key, value=value, missing=missing, resource_type_filter=resource_type)
+        return _tag_response(index, errors, key=key, count=len(resources), resources=resources[:limit] if limit else resources)
+    except Exception as e:
+        logger.error(f"Error getting resources for tag {key}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving tagged resources: {str(e)}")
+
+@router.post("/cost", dependencies=[Depends(requires_permission("read"))])
+async def get_costs(credentials: AWSCredentials, services: Optional[str] = None, period: str = None, refresh: bool = False):
+    """Get cost data for every service in one response
+    
+    Args:
+        credentials: AWS credentials
+        services: Optional comma-separated service names; all services with costs by default
+        period: Optional time period ('1m', '3m', '6m', or None for all periods)
+        refresh: Re-read the cached cost history from Cost Explorer
+    """
+    aws_service = AWSService(credentials)
+    try:
+        return await aws_service.get_costs(services.split(",") if services else None, period, refresh=refresh)
+    except Exception as e:
+        logger.error(f"Error getting cost data: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving cost data: {str(e)}")
+
+@router.post("/cost/trends", dependencies=[Depends(requires_permission("read"))])
+async def get_cost_trends(credentials: AWSCredentials, group_by: str = "service", services: Optional[str] = None, window: int = 7):
+    """Get week-over-week / month-over-month deltas and moving averages
+    
+    Args:
+        credentials: AWS credentials
+        group_by: 'service' or 'region'
+        services: Optional comma-separated service names
+        window: Moving average window in days
+    """
+    if group_by not in ("service", "region"):
+        raise HTTPException(status_code=400, detail="group_by must be 'service' or 'region'")
+    if window < 1:
+        raise HTTPException(status_code=400, detail="window must be at least 1")
+    aws_service = AWSService(credentials)
+    try:
+        return await aws_service.get_cost_trends(group_by, services.split(",") if services else None, window)
+    except Exception as e:
+        logger.error(f"Error getting cost trends: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving cost trends: {str(e)}")
+
+@router.post("/cost/movers", dependencies=[Depends(requires_permission("read"))])
+async def get_cost_movers(credentials: AWSCredentials, group_by: str = "service", period: str = "week", n: int = Query(10, ge=1)):
+    """Get the services or regions whose cost changed the most
+    
+    Args:
+        credentials: AWS credentials
+        group_by: 'service' or 'region'
+        period: 'week' or 'month'
+        n: Number of movers returned (at least 1)
+    """
+    if group_by not in ("service", "region"):
+        raise HTTPException(status_code=400, detail="group_by must be 'service' or 'region'")
+    aws_service = AWSService(credentials)
+    try:
+        return await aws_service.get_cost_movers(group_by, period, n)
+    except Exception as e:
+        logger.error(f"Error getting cost movers: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving cost movers: {str(e)}")
+
+@router.post("/cost/tags/{tag_key:path}", dependencies=[Depends(requires_permission("read"))])
+async def get_cost_by_tag(tag_key: str, credentials: AWSCredentials, period: str = "1m", services: Optional[str] = None, refresh: bool = False):
+    """Get cost per value of a cost allocation tag
+    
+    Args:
+        tag_key: Cost allocation tag key; may contain '/'
+        credentials: AWS credentials
+        period: Time period ('1m', '3m' or '6m')
+        services: Optional comma-separated service names
+        refresh: Re-read the tag's cost history from Cost Explorer
+    """
+    if period not in ("1m", "3m", "6m"):
+        raise HTTPException(status_code=400, detail="period must be '1m', '3m' or '6m'")
+    aws_service = AWSService(credentials)
+    try:
+        return await aws_service.get_cost_by_tag(tag_key, period, services.split(",") if services else None, refresh=refresh)
+    except Exception as e:
+        logger.error(f"Error getting cost by tag {tag_key}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Error retrieving cost by tag: {str(e)}")
+
 @router.post("/cost/{service}")
-async def get_service_cost(service: str, credentials: AWSCredentials, period: str = None):
+async def get_service_cost(service: str, credentials: AWSCredentials, period: str = None, refresh: bool = False):
     """Get cost data for a specific service (if Cost Explorer is enabled)
     
     Args:
         service: The AWS service name
         credentials: AWS credentials
         period: Optional time period ('1m', '3m', '6m', or None for all periods)
+        refresh: Re-read the cached cost history from Cost Explorer
     """
     aws_service = AWSService(credentials)
     try:
-        cost_data = await aws_service.get_service_cost(service, period)
+        cost_data = await aws_service.get_service_cost(service, period, refresh=refresh)
         return cost_data
     except Exception as e:
         logger.error(f"Error getting cost data for {service}: {str(e)}")
@@ -88,12 +417,55 @@ async def get_service_cost_for_period(service: str, period: str, credentials: AW
         raise HTTPException(status_code=400, detail=f"Error retrieving cost data: {str(e)}")
 
 @router.post("/resources/{service}/details", dependencies=[Depends(requires_permission("read"))])
-async def get_resource_details(service: str, credentials: AWSCredentials):
-    """Get detailed information for resources of a specific AWS service"""
-    aws_service = AWSService(credentials)
+async def get_resource_details(request: Request, service: str, credentials: AWSCredentials, include: Optional[str] = None, refresh: bool = False):
+    """Get detailed information for resources of a specific AWS service
+    
+    Args:
+        service: The AWS service name
+        credentials: AWS credentials
+        include: Optional comma-separated attributes to fetch per resource
+            (S3: public, encryption, versioning); all by default
+        refresh: Bypass cached details (IAM)
+    """
+    aws_service = await AWSService(credentials).resolve()
     try:
-        details = await aws_service.get_resource_details(service)
-        return details
+        return await cached_json_response(
+            request, aws_service.account_scope,
+            lambda: aws_service.get_resource_details(service, include=include.split(",") if include is not None else None, refresh=refresh),
+            refresh=refresh, principal=aws_service.scope,
+        )
     except Exception as e:
         logger.error(f"Error getting detailed features for {service}: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error retrieving {service} detailed features: {str(e)}")
+
+@router.post("/resources/{service}/details/stream", dependencies=[Depends(requires_permission("read"))])
+async def stream_resource_details(service: str, credentials: AWSCredentials, refresh_regions: bool = False, format: str = "sse"):
+    """Stream detail records per collection and region as they are collected
+    
+    Emits one `records` event per collection/region (EC2: instances, vpcs,
+    security_groups) followed by a final `complete` event.
+    
+    Args:
+        service: The AWS service name (ec2, rds or lambda)
+        credentials: AWS credentials
+        refresh_regions: Force a fresh region discovery
+        format: 'sse' (Server-Sent Events) or 'ndjson'
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
+    if service not in DETAIL_COLLECTIONS:
+        raise HTTPException(status_code=400, detail=f"Streaming details for {service} not supported")
+    aws_service = AWSService(credentials)
+
+    async def events():
+        try:
+            async for event in aws_service.stream_resource_details(service, refresh_regions=refresh_regions):
+                payload = dumps(event).decode('utf-8')
+                yield f"event: {event['type']}\ndata: {payload}\n\n" if format == "sse" else payload + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming {service} details: {str(e)}")
+            payload = dumps({'type': 'error', 'detail': str(e)}).decode('utf-8')
+            yield f"event: error\ndata: {payload}\n\n" if format == "sse" else payload + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -1,45 +1,159 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.responses import cached_json_response
 from app.schemas.aws import AWSCredentials
-from app.schemas.policies import PolicyResult
+from app.schemas.policies import PolicyBatchRequest, PolicyBatchResult, PolicyJob, PolicyResult
+from app.services.c7n_engine import c7n_engine
+from app.services.custodian_jobs import FINISHED_STATES, custodian_jobs
 from app.services.custodian_service import CustodianService
 from app.middleware import requires_permission, requires_role
+from typing import Union
+import asyncio
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/run/{policy_id}", response_model=PolicyResult, dependencies=[Depends(requires_permission("run_policy"))])
-async def run_policy(policy_id: str, credentials: AWSCredentials, background_tasks: BackgroundTasks):
-    """Run a Cloud Custodian policy"""
+async def _submit(policy_id: str, credentials: AWSCredentials, dryrun: bool):
     custodian_service = CustodianService()
+    job = await custodian_service.submit_policy(policy_id, credentials, dryrun=dryrun)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Policy with ID {policy_id} not found")
+    return job
+
+@router.post("/run/{policy_id}", response_model=PolicyJob, status_code=202, dependencies=[Depends(requires_permission("run_policy"))])
+async def run_policy(policy_id: str, credentials: AWSCredentials):
+    """Run a Cloud Custodian policy
     
+    Returns the queued job at once; poll /jobs/{job_id} for its status and
+    fetch /jobs/{job_id}/result once it has finished.
+    """
     try:
-        result = await custodian_service.run_policy(policy_id, credentials)
-        return result
+        return await _submit(policy_id, credentials, dryrun=False)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error running policy {policy_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error running policy: {str(e)}")
         
-@router.post("/dryrun/{policy_id}", response_model=PolicyResult, dependencies=[Depends(requires_permission("run_policy"))])
+@router.post("/dryrun/{policy_id}", response_model=PolicyJob, status_code=202, dependencies=[Depends(requires_permission("run_policy"))])
 async def dry_run_policy(policy_id: str, credentials: AWSCredentials):
-    """Dry run a Cloud Custodian policy (no actions performed)"""
-    custodian_service = CustodianService()
+    """Dry run a Cloud Custodian policy (no actions performed)
     
+    Returns the queued job at once, like /run/{policy_id}.
+    """
     try:
-        result = await custodian_service.run_policy(policy_id, credentials, dryrun=True)
-        return result
+        return await _submit(policy_id, credentials, dryrun=True)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error running policy {policy_id} in dry run mode: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error running policy in dry run mode: {str(e)}")
         
+async def _submit_batch(request: PolicyBatchRequest, dryrun: bool):
+    custodian_service = CustodianService()
+    try:
+        return await custodian_service.submit_batch(
+            request.credentials, dryrun=dryrun, policy_ids=request.policy_ids, category=request.category
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+        
+@router.post("/batch/run", response_model=PolicyJob, status_code=202, dependencies=[Depends(requires_permission("run_policy"))])
+async def run_policy_batch(request: PolicyBatchRequest):
+    """Run several Cloud Custodian policies as one job
+    
+    The selected policies are merged into a single execution so policies on
+    the same resource type share its resource queries. The job's result
+    lists each policy separately.
+    
+    Args:
+        request: Credentials and the policies to run: policy_ids, a category, or neither for all
+    """
+    try:
+        return await _submit_batch(request, dryrun=False)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running policy batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error running policy batch: {str(e)}")
+        
+@router.post("/batch/dryrun", response_model=PolicyJob, status_code=202, dependencies=[Depends(requires_permission("run_policy"))])
+async def dry_run_policy_batch(request: PolicyBatchRequest):
+    """Dry run several Cloud Custodian policies as one job (no actions performed)
+    
+    Args:
+        request: Credentials and the policies to run: policy_ids, a category, or neither for all
+    """
+    try:
+        return await _submit_batch(request, dryrun=True)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running policy batch in dry run mode: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error running policy batch in dry run mode: {str(e)}")
+        
+@router.get("/jobs/{job_id}", response_model=PolicyJob, dependencies=[Depends(requires_permission("read"))])
+async def get_job_status(job_id: str):
+    """Get the status of a policy execution job
+    
+    Args:
+        job_id: Job ID returned by /run or /dryrun
+    """
+    job = custodian_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found with ID {job_id}")
+    return job
+    
+@router.get("/jobs/{job_id}/result", response_model=Union[PolicyBatchResult, PolicyResult], dependencies=[Depends(requires_permission("read"))])
+async def get_job_result(job_id: str):
+    """Get the result of a finished policy execution job
+    
+    Batch jobs return one result per policy. Responds 409 while the job is
+    still queued or running.
+    
+    Args:
+        job_id: Job ID returned by /run or /dryrun
+    """
+    job = custodian_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found with ID {job_id}")
+    if job['status'] not in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+        
+    try:
+        result = await asyncio.to_thread(custodian_jobs.result, job_id)
+    except Exception as e:
+        logger.error(f"Error retrieving result for job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving job result: {str(e)}")
+    if result is None:
+        # Interrupted before it produced a result
+        return PolicyResult(policy_id=job['policy_id'], success=False, message=job['message'], errors=[job['message']])
+    if job.get('policy_ids') is not None:
+        return result
+    return {'policy_id': job['policy_id'], **result}
+    
+@router.get("/engine/stats", dependencies=[Depends(requires_permission("read"))])
+async def get_engine_stats():
+    """Get c7n execution engine and job statistics
+    
+    Reports worker counts, runs, crashes and the startup time saved by
+    running on warm workers instead of a custodian CLI process per run.
+    """
+    return {'engine': c7n_engine.stats(), 'jobs': custodian_jobs.stats()}
+    
 @router.get("/outputs/{job_id}", dependencies=[Depends(requires_permission("read"))])
-async def get_policy_output(job_id: str):
-    """Get the output of a previously executed policy"""
+async def get_policy_output(request: Request, job_id: str):
+    """Get the output of a previously executed policy
+    
+    Served from the response cache until the job's metadata changes, with
+    an ETag for conditional requests.
+    """
     custodian_service = CustodianService()
     
     try:
-        output = await custodian_service.get_output(job_id)
-        return output
+        return await cached_json_response(
+            request, '', lambda: custodian_service.get_output(job_id), key=(custodian_service.output_revision(job_id),)
+        )
     except Exception as e:
         logger.error(f"Error retrieving output for job {job_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving policy output: {str(e)}")
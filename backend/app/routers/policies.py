@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.responses import cached_json_response
 from app.schemas.policies import Policy, PolicyList
 from app.services.policy_service import PolicyService
 from app.middleware import requires_permission, requires_role
@@ -12,11 +13,17 @@ logger = logging.getLogger(__name__)
 policy_service = PolicyService()
 
 @router.get("/", response_model=PolicyList, dependencies=[Depends(requires_permission("read"))])
-async def get_policies():
-    """Get all available policies"""
+async def get_policies(request: Request):
+    """Get all available policies
+    
+    Served from the response cache until a policy file changes, with an
+    ETag for conditional requests.
+    """
+    async def _policies():
+        return {"policies": await policy_service.get_all_policies()}
+
     try:
-        policies = await policy_service.get_all_policies()
-        return {"policies": policies}
+        return await cached_json_response(request, '', _policies, key=(policy_service.revision(),))
     except Exception as e:
         logger.error(f"Error retrieving policies: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving policies: {str(e)}")
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 
@@ -7,6 +8,7 @@ class AWSCredentials(BaseModel):
     secret_key: str = Field(..., description="AWS Secret Access Key")
     region: str = Field(default="us-east-1", description="AWS Region")
     session_token: Optional[str] = Field(None, description="AWS Session Token (for temporary credentials)")
+    expiration: Optional[datetime] = Field(None, description="Expiry of the session token (for temporary credentials)")
 
 class ResourceSummary(BaseModel):
     """Schema for AWS resource summary"""
@@ -14,3 +16,10 @@ class ResourceSummary(BaseModel):
     count: int
     resource_type: str
     details: Optional[Dict[str, Any]] = None
+
+class OrganizationRequest(BaseModel):
+    """Schema for inventory across the accounts of an organization"""
+    credentials: AWSCredentials = Field(..., description="Hub credentials allowed to assume the member roles")
+    role_arns: List[str] = Field(default_factory=list, description="Roles to assume, one per account; accounts are discovered through AWS Organizations when empty")
+    role_name: Optional[str] = Field(None, description="Role assumed in each discovered account")
+    external_id: Optional[str] = Field(None, description="External ID required by the member roles")
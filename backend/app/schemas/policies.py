@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
+from app.schemas.aws import AWSCredentials
 
 class Policy(BaseModel):
     """Schema for Cloud Custodian policy"""
@@ -22,3 +23,31 @@ class PolicyResult(BaseModel):
     resources_count: Optional[int] = None
     resources: Optional[List[Dict[str, Any]]] = None
     errors: Optional[List[str]] = None
+
+class PolicyJob(BaseModel):
+    """Schema for a queued, running or finished policy execution"""
+    job_id: str = Field(..., description="Job identifier; outputs are kept under outputs/{job_id}")
+    policy_id: str = Field(..., description="Policy run by the job, or 'batch' for a batch job")
+    policy_ids: Optional[List[str]] = Field(None, description="Policies run by a batch job")
+    dryrun: bool = False
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    message: Optional[str] = None
+
+class PolicyBatchRequest(BaseModel):
+    """Schema for selecting the policies of a batch run
+    
+    With neither policy_ids nor category, every policy is run.
+    """
+    credentials: AWSCredentials
+    policy_ids: Optional[List[str]] = Field(None, description="Explicit policy IDs to run")
+    category: Optional[str] = Field(None, description="Run every policy in this category")
+
+class PolicyBatchResult(BaseModel):
+    """Schema for the result of a batch run, one entry per policy"""
+    success: bool
+    message: Optional[str] = None
+    policies: List[PolicyResult] = Field(..., description="Result of each policy in the batch")
+    resource_types: Dict[str, List[str]] = Field(default_factory=dict, description="Policy IDs grouped by the resource type they shared")
@@ -0,0 +1,129 @@
+import os
+import logging
+import datetime
+import threading
+from typing import Dict, Optional, Tuple
+
+from app.schemas.aws import AWSCredentials
+from app.services.session_service import credentials_fingerprint, identity_cache, invalidate_credentials
+
+logger = logging.getLogger(__name__)
+
+# Lifetime (seconds) requested for assumed-role sessions
+ASSUME_ROLE_DURATION = int(os.getenv("ASSUME_ROLE_DURATION", "3600"))
+
+# Sessions are renewed once they have less than this many seconds left
+ASSUME_ROLE_REFRESH_MARGIN = int(os.getenv("ASSUME_ROLE_REFRESH_MARGIN", "300"))
+
+# RoleSessionName recorded in the member accounts' CloudTrail
+ASSUME_ROLE_SESSION_NAME = os.getenv("ASSUME_ROLE_SESSION_NAME", "custodian-ui")
+
+
+def role_account(role_arn: str) -> str:
+    """Account ID of a role ARN (arn:aws:iam::123456789012:role/Name)"""
+    parts = role_arn.split(':')
+    if len(parts) < 6 or parts[2] != 'iam' or not parts[4]:
+        raise ValueError(f"Invalid role ARN: {role_arn}")
+    return parts[4]
+
+
+def _utc(value: datetime.datetime) -> datetime.datetime:
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+class AssumeRolePool:
+    """Assumed-role sessions keyed by hub credentials, role ARN and external ID
+
+    Each role is assumed once and its temporary credentials are reused until
+    they come within ASSUME_ROLE_REFRESH_MARGIN of expiring. The identity of
+    a fresh session is known from the AssumeRole response, so it is stored in
+    the caller identity cache and no extra STS call is needed to scope the
+    account's caches. Concurrent callers for one role wait on a per-role lock
+    rather than assuming it twice.
+    """
+
+    def __init__(self, duration: int = ASSUME_ROLE_DURATION, refresh_margin: int = ASSUME_ROLE_REFRESH_MARGIN):
+        """Initialize the pool with a session duration and refresh margin"""
+        self.duration = duration
+        self.refresh_margin = refresh_margin
+        self._sessions: Dict[Tuple[str, str, str], AWSCredentials] = {}
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, hub: AWSCredentials, role_arn: str, external_id: Optional[str]) -> Tuple[str, str, str]:
+        return (credentials_fingerprint(hub), role_arn, external_id or '')
+
+    def _is_fresh(self, credentials: Optional[AWSCredentials]) -> bool:
+        if credentials is None or credentials.expiration is None:
+            return False
+        remaining = (_utc(credentials.expiration) - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        return remaining > self.refresh_margin
+
+    def credentials(self, hub: AWSCredentials, role_arn: str, external_id: Optional[str] = None) -> AWSCredentials:
+        """Temporary credentials for a role, assuming it when none are cached or they expire soon
+
+        Blocks on STS; call it from a worker thread. Raises the STS error
+        when the role cannot be assumed.
+        """
+        from app.services.client_pool import client_pool
+
+        key = self._key(hub, role_arn, external_id)
+        with self._lock:
+            cached = self._sessions.get(key)
+            if self._is_fresh(cached):
+                return cached
+            role_lock = self._locks.setdefault(key, threading.Lock())
+
+        with role_lock:
+            with self._lock:
+                cached = self._sessions.get(key)
+            if self._is_fresh(cached):
+                return cached
+
+            params = {'RoleArn': role_arn, 'RoleSessionName': ASSUME_ROLE_SESSION_NAME, 'DurationSeconds': self.duration}
+            if external_id:
+                params['ExternalId'] = external_id
+            response = client_pool.client(hub, 'sts').assume_role(**params)
+            issued = response['Credentials']
+            credentials = AWSCredentials(
+                access_key=issued['AccessKeyId'],
+                secret_key=issued['SecretAccessKey'],
+                session_token=issued['SessionToken'],
+                expiration=issued['Expiration'],
+                region=hub.region,
+            )
+            user = response.get('AssumedRoleUser', {})
+            identity_cache.set(credentials_fingerprint(credentials), credentials, {
+                'account': role_account(role_arn),
+                'arn': user.get('Arn', role_arn),
+                'user_id': user.get('AssumedRoleId', ''),
+            })
+
+            with self._lock:
+                self._sessions[key] = credentials
+            if cached is not None:
+                # The replaced session's pooled clients are never used again
+                invalidate_credentials(cached)
+            logger.info(f"Assumed {role_arn} until {issued['Expiration']}")
+            return credentials
+
+    def invalidate(self, hub: Optional[AWSCredentials] = None, role_arn: Optional[str] = None):
+        """Drop one hub's sessions (optionally one role), or every session"""
+        fingerprint = credentials_fingerprint(hub) if hub is not None else None
+        with self._lock:
+            dropped = [
+                key for key in self._sessions
+                if (fingerprint is None or key[0] == fingerprint) and (role_arn is None or key[1] == role_arn)
+            ]
+            sessions = [self._sessions.pop(key) for key in dropped]
+        for credentials in sessions:
+            invalidate_credentials(credentials)
+
+    def size(self) -> int:
+        """Number of cached role sessions"""
+        with self._lock:
+            return len(self._sessions)
+
+
+# Process-wide pool of assumed-role sessions
+assume_role_pool = AssumeRolePool()
@@ -0,0 +1,214 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.schemas.aws import AWSCredentials
+from app.services.client_pool import AWS_ENDPOINT_URL, CLIENT_POOL_MAX_SIZE, CLIENT_POOL_TTL
+from app.services.inventory_records import ec2_record, rds_record, lambda_record
+from app.services.session_service import credentials_fingerprint
+from app.services.rate_limiter import AWS_MAX_ATTEMPTS, rate_limiter
+from app.services.session_service import identity_cache
+from app.services.summary_engine import SUMMARY_SOURCES, region_failure, region_result
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session as get_aio_session
+    AIOBOTOCORE_AVAILABLE = True
+except ImportError:
+    AIOBOTOCORE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Inventory backend: "thread" (boto3 on the fan-out executor) or "async" (aiobotocore)
+INVENTORY_BACKEND = os.getenv("INVENTORY_BACKEND", "thread").lower()
+
+# Maximum in-flight AWS calls on the async backend
+ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", "200"))
+
+# HTTP connections shared by each async client
+ASYNC_MAX_POOL_CONNECTIONS = int(os.getenv("ASYNC_MAX_POOL_CONNECTIONS", "50"))
+
+
+def use_async_backend() -> bool:
+    """Whether inventory collection should use the native asyncio backend"""
+    if INVENTORY_BACKEND != "async":
+        return False
+    if not AIOBOTOCORE_AVAILABLE:
+        logger.warning("INVENTORY_BACKEND=async but aiobotocore is not installed; using thread backend")
+        return False
+    return True
+
+
+class AsyncInventoryCollector:
+    """Inventory collectors on aiobotocore, running on the event loop
+
+    Clients are created lazily per credentials/region/service and kept open so
+    paginated calls share one pooled HTTP connection set per client. Like
+    ClientPool, the cache is bounded by CLIENT_POOL_MAX_SIZE (least recently
+    used first) and CLIENT_POOL_TTL; evicted clients are closed along with
+    their connection pools, and invalidate_credentials() evicts a rejected
+    credential's clients.
+    """
+
+    def __init__(self, max_concurrency: int = ASYNC_MAX_CONCURRENCY, endpoint_url: Optional[str] = AWS_ENDPOINT_URL,
+                 max_size: int = CLIENT_POOL_MAX_SIZE, ttl: int = CLIENT_POOL_TTL):
+        """Initialize the collector with a concurrency cap, client cache bounds and optional endpoint override"""
+        self.max_concurrency = max_concurrency
+        self.endpoint_url = endpoint_url
+        self.max_size = max_size
+        self.ttl = ttl
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._clients: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._client_locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+        # Guards _clients; evict() may be called from worker threads
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _limit(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _cached(self, key: Tuple[str, str, str]):
+        """A live cached client, dropping it if it has expired; returns (client, expired client)"""
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                return None, None
+            if entry[0] > time.monotonic():
+                self._clients.move_to_end(key)
+                return entry[1], None
+            del self._clients[key]
+            return None, entry[1]
+
+    async def _client(self, credentials: AWSCredentials, service: str, region: str):
+        """Get or create a long-lived aiobotocore client"""
+        key = (credentials_fingerprint(credentials), region, service)
+        client, expired = self._cached(key)
+        if client is not None:
+            return client
+
+        lock = self._client_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            client, expired_again = self._cached(key)
+            expired = expired or expired_again
+            if client is None:
+                session = get_aio_session()
+                client = await session.create_client(
+                    service,
+                    region_name=region,
+                    aws_access_key_id=credentials.access_key,
+                    aws_secret_access_key=credentials.secret_key,
+                    aws_session_token=credentials.session_token,
+                    endpoint_url=self.endpoint_url,
+                    config=AioConfig(
+                        max_pool_connections=ASYNC_MAX_POOL_CONNECTIONS,
+                        retries={'mode': 'standard', 'max_attempts': AWS_MAX_ATTEMPTS}
+                    )
+                ).__aenter__()
+                fingerprint = key[0]
+                rate_limiter.instrument_async(client, lambda: (identity_cache.get(fingerprint) or {}).get('account', fingerprint), region)
+                self._loop = asyncio.get_running_loop()
+                evicted = [expired] if expired is not None else []
+                with self._lock:
+                    self._clients[key] = (time.monotonic() + self.ttl, client)
+                    self._clients.move_to_end(key)
+                    while len(self._clients) > self.max_size:
+                        old_key, (_, old_client) = self._clients.popitem(last=False)
+                        self._client_locks.pop(old_key, None)
+                        evicted.append(old_client)
+                await self._close_clients(evicted)
+            elif expired is not None:
+                await self._close_clients([expired])
+        return client
+
+    @staticmethod
+    async def _close_clients(clients: List[Any]):
+        for client in clients:
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as e:
+                logger.warning(f"Error closing aiobotocore client: {str(e)}")
+
+    def evict(self, credentials: AWSCredentials):
+        """Drop and close every client built from a set of credentials; safe to call from any thread"""
+        fingerprint = credentials_fingerprint(credentials)
+        with self._lock:
+            keys = [k for k in self._clients if k[0] == fingerprint]
+            clients = [self._clients.pop(k)[1] for k in keys]
+        for key in keys:
+            self._client_locks.pop(key, None)
+        if not clients or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._loop.create_task(self._close_clients(clients))
+        else:
+            asyncio.run_coroutine_threadsafe(self._close_clients(clients), self._loop)
+
+    async def _pages(self, credentials: AWSCredentials, service: str, region: str, operation: str, **kwargs):
+        """Iterate the pages of a paginated call, holding a concurrency slot per page"""
+        client = await self._client(credentials, service, region)
+        paginator = client.get_paginator(operation).paginate(**kwargs)
+        iterator = paginator.__aiter__()
+        while True:
+            async with self._limit():
+                try:
+                    page = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield page
+
+    async def count_region(self, credentials: AWSCredentials, service: str, region: str) -> Dict[str, Any]:
+        """Async counterpart of SummaryEngine.count_region"""
+        operation, params, projection = SUMMARY_SOURCES[service]
+        counts = Counter()
+        try:
+            async for page in self._pages(credentials, service, region, operation, **params):
+                counts.update(projection.search(page) or [])
+            return region_result(service, counts)
+        except Exception as e:
+            result = region_result(service, Counter())
+            failure = region_failure(region, e)
+            result['error'], result['error_category'] = failure['message'], failure['category']
+            return result
+
+    async def regional_resources(self, credentials: AWSCredentials, service: str, region: str, **params) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, str]]]:
+        """Async counterpart of the regional resource listing; params are passed to the paginator
+
+        Returns the records and the region's failure (if any).
+        """
+        records = []
+        try:
+            if service == 'ec2':
+                async for page in self._pages(credentials, 'ec2', region, 'describe_instances', **params):
+                    for reservation in page.get('Reservations', []):
+                        records.extend(ec2_record(i, region) for i in reservation.get('Instances', []))
+            elif service == 'rds':
+                async for page in self._pages(credentials, 'rds', region, 'describe_db_instances', **params):
+                    records.extend(rds_record(i, region) for i in page.get('DBInstances', []))
+            elif service == 'lambda':
+                async for page in self._pages(credentials, 'lambda', region, 'list_functions'):
+                    records.extend(lambda_record(f, region) for f in page.get('Functions', []))
+        except Exception as e:
+            return [], region_failure(region, e)
+        return records, None
+
+    async def close(self):
+        """Close every open client and its connection pool"""
+        with self._lock:
+            clients = [client for _, client in self._clients.values()]
+            self._clients.clear()
+        self._client_locks.clear()
+        await self._close_clients(clients)
+
+
+# Process-wide collector used when INVENTORY_BACKEND=async
+async_inventory = AsyncInventoryCollector()
@@ -1,11 +1,33 @@
-import boto3
+import os
+import json
 import logging
 import asyncio
-from typing import Dict, List, Any
+from collections import Counter
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Any, Tuple
 from app.schemas.aws import AWSCredentials, ResourceSummary
+from app.services.async_inventory import async_inventory, use_async_backend
+from app.services.client_pool import client_pool
+from app.services.cost_history import (
+    COST_SERVICE_MAP, CostExplorerCollector, cost_movers, cost_trends, derive_period, period_keys, tag_split
+)
+from app.services.cost_warehouse import CostCube
+from app.services.detail_collectors import DETAIL_COLLECTIONS, collect_region
+from app.services.fanout_executor import fanout_executor
+from app.services.iam_collector import IAMCollector
+from app.services.inventory_records import ec2_record, rds_record, lambda_record, s3_bucket_record
+from app.services.region_cache import region_cache
+from app.services.resource_query import ResourceQuery
+from app.services.s3_enrichment import S3BucketEnricher
+from app.services.session_service import get_caller_identity, resolve_scopes
+from app.services.single_flight import single_flight
+from app.services.summary_engine import PARTIAL_CATEGORIES, SummaryEngine, region_failure, region_result
+from app.services.tag_index import SERVICE_RESOURCE_TYPES, ScopeTagIndex, collect_region_tags, tag_index
 
 logger = logging.getLogger(__name__)
 
+# Per-region deadline (seconds) for the streaming summary
+SUMMARY_REGION_TIMEOUT = float(os.getenv("SUMMARY_REGION_TIMEOUT", "10"))
+
 class AWSService:
     """Service for interacting with AWS resources"""
     
@@ -13,571 +35,427 @@ class AWSService:
         """Initialize with AWS credentials"""
         self.credentials = credentials
         self.session = None
+        self._scopes = None
+
+    async def resolve(self) -> 'AWSService':
+        """Resolve the account and caller scopes once, off the event loop; returns the service"""
+        if self._scopes is None:
+            self._scopes = await asyncio.to_thread(resolve_scopes, self.credentials)
+        return self
+
+    @property
+    def account_scope(self) -> str:
+        """Key for per-account caches (see resolve_scopes); available once resolved"""
+        return self._scopes[0]
+
+    @property
+    def scope(self) -> str:
+        """Key for the caller's permission-sensitive caches; available once resolved"""
+        return self._scopes[1]
         
     def _get_session(self):
-        """Create boto3 session with credentials"""
+        """Get the pooled boto3 session for these credentials"""
         if not self.session:
-            self.session = boto3.Session(
-                aws_access_key_id=self.credentials.access_key,
-                aws_secret_access_key=self.credentials.secret_key,
-                region_name=self.credentials.region,
-                aws_session_token=self.credentials.session_token
-            )
+            self.session = client_pool.get_session(self.credentials)
         return self.session
+
+    def _client(self, service: str, region: str = None):
+        """Get a pooled client for a service, in the given region or the session's home region"""
+        return client_pool.client(self.credentials, service, region)
+
+    def _resource(self, service: str, region: str = None):
+        """Build a boto3 resource on the pooled session (resources are never shared)"""
+        return client_pool.resource(self.credentials, service, region)
+
+    def _get_regions(self, force_refresh: bool = False) -> List[str]:
+        """Get enabled regions for these credentials from the shared region cache"""
+        def _describe_regions():
+            ec2_main_client = self._client('ec2')
+            return [region['RegionName'] for region in ec2_main_client.describe_regions()['Regions']]
+
+        try:
+            return region_cache.get_regions(self.account_scope, _describe_regions, force_refresh=force_refresh)
+        except Exception as e:
+            logger.error(f"Failed to describe regions: {e}")
+            return region_cache.allowlist or [self.credentials.region]
         
     async def validate_credentials(self) -> bool:
-        """Validate AWS credentials by making a simple STS call"""
+        """Validate AWS credentials with an STS call, cached per credentials"""
         try:
-            session = self._get_session()
-            sts = session.client('sts')
-            response = sts.get_caller_identity()
+            await asyncio.to_thread(get_caller_identity, self.credentials)
             return True
         except Exception as e:
             logger.error(f"Error validating credentials: {str(e)}")
             return False
             
-    async def get_resource_summary(self) -> Dict[str, Any]:
-        """Get summary of AWS resources across multiple services and regions concurrently."""
-        session = self._get_session()
-        
+    async def _coalesced(self, operation: str, params: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Share one in-flight computation between identical concurrent calls of the same caller"""
+        await self.resolve()
+        return await single_flight.do((self.scope, operation) + params, fn)
+
+    async def get_resource_summary(self, refresh_regions: bool = False) -> Dict[str, Any]:
+        """Get summary of AWS resources across multiple services and regions concurrently.
+
+        Concurrent identical calls for the same account share one fan-out.
+        """
+        return await self._coalesced('summary', (refresh_regions,), lambda: self._resource_summary(refresh_regions))
+
+    async def _resource_summary(self, refresh_regions: bool = False) -> Dict[str, Any]:
+        all_regions = self._get_regions(force_refresh=refresh_regions)
+        services = ['ec2', 'rds', 'lambda']
+
+        if use_async_backend():
+            # Native asyncio path: every paginated call in flight on the event loop
+            tasks = [asyncio.gather(*[async_inventory.count_region(self.credentials, service, r) for r in all_regions]) for service in services]
+        else:
+            # Counts-only calls on the bounded fan-out executor
+            engine = SummaryEngine(lambda service, region: self._client(service, region))
+            lane = fanout_executor.lane()
+            tasks = [asyncio.gather(*[lane.run(service, r, engine.count_region, service, r) for r in all_regions]) for service in services]
+
+        results = await asyncio.gather(*tasks)
+        summary = {service: SummaryEngine.merge(service, all_regions, service_results) for service, service_results in zip(services, results)}
+
         try:
-            ec2_main_client = session.client('ec2')
-            all_regions = [region['RegionName'] for region in ec2_main_client.describe_regions()['Regions']]
+            s3 = self._client('s3')
+            summary['s3'] = {'count': len(s3.list_buckets().get('Buckets', []))}
         except Exception as e:
-            logger.error(f"Failed to describe regions: {e}")
-            all_regions = [session.region_name]
+            logger.error(f"Error getting S3 summary: {str(e)}")
+            summary['s3'] = {'error': str(e)}
 
-        def _get_ec2_summary_sync(region):
-            try:
-                regional_ec2 = boto3.resource('ec2', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
-                instances = list(regional_ec2.instances.all())
-                return {'count': len(instances), 'running': len([i for i in instances if i.state['Name'] == 'running']), 'stopped': len([i for i in instances if i.state['Name'] == 'stopped']), 'error': None}
-            except Exception as e:
-                if 'UnauthorizedOperation' not in str(e) and 'AccessDenied' not in str(e):
-                    return {'count': 0, 'running': 0, 'stopped': 0, 'error': f"{region}: Access denied or region not enabled."}
-                return {'count': 0, 'running': 0, 'stopped': 0, 'error': None}
+        return summary
+        
+    async def stream_resource_summary(self, refresh_regions: bool = False, region_timeout: float = SUMMARY_REGION_TIMEOUT) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each service/region count as soon as it completes, then the merged summary
+
+        Regions that miss the deadline, are throttled or fail are reported as
+        partial instead of holding up the rest of the summary.
+        """
+        await self.resolve()
+        all_regions = self._get_regions(force_refresh=refresh_regions)
+        services = ['ec2', 'rds', 'lambda']
+        engine = SummaryEngine(lambda service, region: self._client(service, region))
+        lane = fanout_executor.lane()
 
-        def _get_rds_summary_sync(region):
-            count = 0
+        async def _count(service, region):
+            if use_async_backend():
+                call = async_inventory.count_region(self.credentials, service, region)
+            else:
+                call = lane.run(service, region, engine.count_region, service, region)
             try:
-                regional_rds = boto3.client('rds', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
-                paginator = regional_rds.get_paginator('describe_db_instances')
-                for page in paginator.paginate():
-                    count += len(page.get('DBInstances', []))
-                return {'count': count, 'error': None}
-            except Exception as e:
-                if 'UnauthorizedOperation' not in str(e) and 'AccessDenied' not in str(e):
-                    return {'count': 0, 'error': f"{region}: Access denied or region not enabled."}
-                return {'count': 0, 'error': None}
+                result = await asyncio.wait_for(call, timeout=region_timeout)
+                result['partial'] = result.get('error_category') in PARTIAL_CATEGORIES
+            except asyncio.TimeoutError:
+                result = region_result(service, Counter())
+                result['error'] = f"{region}: timed out after {region_timeout:g}s"
+                result['error_category'] = 'error'
+                result['partial'] = True
+            return service, region, result
 
-        def _get_lambda_summary_sync(region):
-            count = 0
+        async def _count_s3():
             try:
-                regional_lambda = boto3.client('lambda', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
-                paginator = regional_lambda.get_paginator('list_functions')
-                for page in paginator.paginate():
-                    count += len(page.get('Functions', []))
-                return {'count': count, 'error': None}
+                s3 = self._client('s3')
+                response = await asyncio.wait_for(lane.run('s3', 'global', s3.list_buckets), timeout=region_timeout)
+                return 's3', 'global', {'count': len(response.get('Buckets', [])), 'error': None, 'partial': False}
+            except asyncio.TimeoutError:
+                return 's3', 'global', {'count': 0, 'error': f"s3: timed out after {region_timeout:g}s", 'partial': True}
             except Exception as e:
-                if 'UnauthorizedOperation' not in str(e) and 'AccessDenied' not in str(e):
-                    return {'count': 0, 'error': f"{region}: Access denied or region not enabled."}
-                return {'count': 0, 'error': None}
-
-        # Run blocking boto3 calls in separate threads
-        ec2_tasks = [asyncio.to_thread(_get_ec2_summary_sync, r) for r in all_regions]
-        rds_tasks = [asyncio.to_thread(_get_rds_summary_sync, r) for r in all_regions]
-        lambda_tasks = [asyncio.to_thread(_get_lambda_summary_sync, r) for r in all_regions]
-
-        ec2_results, rds_results, lambda_results = await asyncio.gather(
-            asyncio.gather(*ec2_tasks),
-            asyncio.gather(*rds_tasks),
-            asyncio.gather(*lambda_tasks)
-        )
-
-        # Aggregate results
-        summary_ec2 = {'count': sum(r['count'] for r in ec2_results), 'running': sum(r['running'] for r in ec2_results), 'stopped': sum(r['stopped'] for r in ec2_results)}
-        ec2_errors = [r['error'] for r in ec2_results if r['error']]
-        if ec2_errors: summary_ec2['error'] = "; ".join(ec2_errors)
-
-        summary_rds = {'count': sum(r['count'] for r in rds_results)}
-        rds_errors = [r['error'] for r in rds_results if r['error']]
-        if rds_errors: summary_rds['error'] = "; ".join(rds_errors)
-
-        summary_lambda = {'count': sum(r['count'] for r in lambda_results)}
-        lambda_errors = [r['error'] for r in lambda_results if r['error']]
-        if lambda_errors: summary_lambda['error'] = "; ".join(lambda_errors)
+                logger.error(f"Error getting S3 summary: {str(e)}")
+                return 's3', 'global', {'count': 0, 'error': str(e), 'partial': False}
 
+        tasks = [asyncio.ensure_future(_count(service, r)) for service in services for r in all_regions]
+        tasks.append(asyncio.ensure_future(_count_s3()))
+        collected = {service: {} for service in services}
+        summary = {}
+        partial = []
         try:
-            s3 = session.resource('s3')
-            summary_s3 = {'count': len(list(s3.buckets.all()))}
-        except Exception as e:
-            logger.error(f"Error getting S3 summary: {str(e)}")
-            summary_s3 = {'error': str(e)}
+            for next_done in asyncio.as_completed(tasks):
+                service, region, result = await next_done
+                if result['partial']:
+                    partial.append(f"{service}:{region}")
+                if service == 's3':
+                    summary['s3'] = {'count': result['count']}
+                    if result['error']:
+                        summary['s3']['error'] = result['error']
+                else:
+                    collected[service][region] = result
+                yield {'type': 'region', 'service': service, 'region': region, **result}
+        finally:
+            # The client may disconnect mid-stream
+            for task in tasks:
+                task.cancel()
 
-        return {'ec2': summary_ec2, 'rds': summary_rds, 'lambda': summary_lambda, 's3': summary_s3}
-        
-    async def get_resources(self, service: str) -> Dict[str, Any]:
-        """Get detailed resources for a specific AWS service across all regions concurrently."""
-        session = self._get_session()
-        
-        try:
-            ec2_main_client = session.client('ec2')
-            all_regions = [region['RegionName'] for region in ec2_main_client.describe_regions()['Regions']]
-        except Exception as e:
-            logger.error(f"Failed to describe regions: {e}")
-            all_regions = [session.region_name]
+        for service in services:
+            regions = [r for r in all_regions if r in collected[service]]
+            summary[service] = SummaryEngine.merge(service, regions, [collected[service][r] for r in regions])
+        yield {'type': 'summary', 'summary': summary, 'partial': partial}
+
+    async def get_resources(self, service: str, refresh_regions: bool = False, query: ResourceQuery = None) -> Dict[str, Any]:
+        """Get detailed resources for a specific AWS service across all regions concurrently.
+
+        When a query is given, its region filter narrows the fan-out and the
+        filters the service's API supports are passed down as AWS Filters.
+        Concurrent calls fetching the same records share one fan-out.
+        """
+        fetch_key = (service, refresh_regions)
+        if query is not None:
+            fetch_key += (json.dumps(query.aws_filters(service), sort_keys=True), tuple(query.regions))
+        return await self._coalesced('resources', fetch_key, lambda: self._resources(service, refresh_regions, query))
+
+    async def _resources(self, service: str, refresh_regions: bool = False, query: ResourceQuery = None) -> Dict[str, Any]:
+        params = query.aws_filters(service) if query else {}
 
         def _get_regional_resources_sync(region):
             try:
                 if service == 'ec2':
-                    regional_ec2 = boto3.resource('ec2', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
-                    return [{'id': i.id, 'type': i.instance_type, 'state': i.state['Name'], 'public_ip': i.public_ip_address, 'private_ip': i.private_ip_address, 'launch_time': i.launch_time.isoformat() if hasattr(i, 'launch_time') else None, 'tags': {t['Key']: t['Value'] for t in i.tags or []}, 'region': region} for i in regional_ec2.instances.all()]
+                    regional_ec2 = self._client('ec2', region)
+                    paginator = regional_ec2.get_paginator('describe_instances')
+                    instances = []
+                    for page in paginator.paginate(**params):
+                        for reservation in page.get('Reservations', []):
+                            instances.extend([ec2_record(i, region) for i in reservation.get('Instances', [])])
+                    return instances, None
                 elif service == 'rds':
-                    regional_rds = boto3.client('rds', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
+                    regional_rds = self._client('rds', region)
                     paginator = regional_rds.get_paginator('describe_db_instances')
                     instances = []
-                    for page in paginator.paginate():
-                        instances.extend([{'id': i['DBInstanceIdentifier'], 'engine': i['Engine'], 'status': i['DBInstanceStatus'], 'size': i['DBInstanceClass'], 'storage': i['AllocatedStorage'], 'endpoint': i.get('Endpoint', {}).get('Address') if 'Endpoint' in i else None, 'region': region} for i in page.get('DBInstances', [])])
-                    return instances
+                    for page in paginator.paginate(**params):
+                        instances.extend([rds_record(i, region) for i in page.get('DBInstances', [])])
+                    return instances, None
                 elif service == 'lambda':
-                    regional_lambda = boto3.client('lambda', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
+                    regional_lambda = self._client('lambda', region)
                     paginator = regional_lambda.get_paginator('list_functions')
                     functions = []
                     for page in paginator.paginate():
-                        functions.extend([{'name': f['FunctionName'], 'runtime': f['Runtime'], 'memory': f['MemorySize'], 'timeout': f['Timeout'], 'last_modified': f['LastModified'], 'region': region} for f in page.get('Functions', [])])
-                    return functions
+                        functions.extend([lambda_record(f, region) for f in page.get('Functions', [])])
+                    return functions, None
             except Exception as e:
-                if 'UnauthorizedOperation' not in str(e) and 'AccessDenied' not in str(e):
-                    logger.warning(f"Could not get {service} resources in {region}: {str(e)}")
-            return []
+                return [], region_failure(region, e)
+            return [], None
 
         if service == 's3':
-            s3 = session.resource('s3')
-            return {'buckets': [{'name': b.name, 'creation_date': b.creation_date.isoformat() if hasattr(b, 'creation_date') else None} for b in s3.buckets.all()]}
+            s3 = self._client('s3')
+            return {'buckets': [s3_bucket_record(b) for b in s3.list_buckets().get('Buckets', [])]}
 
         if service in ['ec2', 'rds', 'lambda']:
-            tasks = [asyncio.to_thread(_get_regional_resources_sync, r) for r in all_regions]
+            all_regions = self._get_regions(force_refresh=refresh_regions)
+            if query and query.regions:
+                all_regions = [r for r in all_regions if r in query.regions]
+            if use_async_backend():
+                tasks = [async_inventory.regional_resources(self.credentials, service, r, **params) for r in all_regions]
+            else:
+                lane = fanout_executor.lane()
+                tasks = [lane.run(service, r, _get_regional_resources_sync, r) for r in all_regions]
             results = await asyncio.gather(*tasks)
-            flat_list = [item for sublist in results for item in sublist]
-            return {'instances' if service in ['ec2', 'rds'] else 'functions': flat_list}
+            flat_list = [item for records, _ in results for item in records]
+            result = {'instances' if service in ['ec2', 'rds'] else 'functions': flat_list, 'regions': len(all_regions)}
+            failures = [failure for _, failure in results if failure]
+            if failures:
+                result['errors'] = failures
+                result['partial'] = any(f['category'] in PARTIAL_CATEGORIES for f in failures)
+            return result
 
         return {"error": f"Service {service} not supported"}
         
-    async def get_resource_tags(self, service: str) -> Dict[str, List[str]]:
-        """Get all tags used in a specific service across all regions concurrently."""
-        session = self._get_session()
-        if service != 'ec2':
-            return {}
+    async def refresh_tag_index(self, force: bool = False, refresh_regions: bool = False) -> Tuple[ScopeTagIndex, List[str]]:
+        """Bring the caller's tag index of the account up to date and return it with any region errors
+        
+        Only regions indexed more than TAG_INDEX_TTL seconds ago (or all of
+        them when force is set) are re-read from the Tagging API, concurrently.
+        A throttled, failed or denied region keeps its previous entries; only
+        a region that is not enabled is indexed as empty.
+        """
+        await self.resolve()
+        index = tag_index.scope(self.scope)
+        all_regions = self._get_regions(force_refresh=refresh_regions)
+        regions = all_regions if force else index.stale_regions(all_regions, tag_index.ttl)
+        if not regions:
+            return index, []
 
-        try:
-            ec2_main_client = session.client('ec2')
-            all_regions = [region['RegionName'] for region in ec2_main_client.describe_regions()['Regions']]
-        except Exception as e:
-            logger.error(f"Failed to describe regions for tag collection: {e}")
-            all_regions = [session.region_name]
+        lane = fanout_executor.lane()
+        client_factory = lambda svc, region: self._client(svc, region)
+        results = await asyncio.gather(*[
+            lane.run('resourcegroupstaggingapi', r, collect_region_tags, client_factory, r) for r in regions
+        ])
 
-        def _get_tags_for_region_sync(region):
-            tags = {}
-            try:
-                regional_ec2 = boto3.resource('ec2', aws_access_key_id=self.credentials.access_key, aws_secret_access_key=self.credentials.secret_key, region_name=region, aws_session_token=self.credentials.session_token)
-                for instance in regional_ec2.instances.all():
-                    if instance.tags:
-                        for tag in instance.tags:
-                            key, value = tag['Key'], tag['Value']
-                            if key not in tags:
-                                tags[key] = set()
-                            tags[key].add(value)
-            except Exception as e:
-                if 'UnauthorizedOperation' not in str(e) and 'AccessDenied' not in str(e):
-                    logger.warning(f"Could not get EC2 tags in {region}: {str(e)}")
-            return tags
+        errors = []
+        for region, (resources, failure) in zip(regions, results):
+            if failure:
+                errors.append(failure['message'])
+            if failure is None or failure['category'] == 'disabled':
+                # A caller lacking tag:GetResources must not wipe the region
+                index.replace_region(region, resources)
+        return index, errors
 
-        tasks = [asyncio.to_thread(_get_tags_for_region_sync, r) for r in all_regions]
-        results = await asyncio.gather(*tasks)
-        
-        # Aggregate tags
-        final_tags = {}
-        for regional_tags in results:
-            for key, value_set in regional_tags.items():
-                if key not in final_tags:
-                    final_tags[key] = set()
-                final_tags[key].update(value_set)
-        
-        return {key: list(value_set) for key, value_set in final_tags.items()}
+    async def get_resource_tags(self, service: str, refresh_regions: bool = False) -> Dict[str, List[str]]:
+        """Get all tag keys and their values used by a service, from the tag index"""
+        if service not in SERVICE_RESOURCE_TYPES:
+            return {}
+        index, _ = await self.refresh_tag_index(refresh_regions=refresh_regions)
+        resource_type_filter = SERVICE_RESOURCE_TYPES[service]
+        return {
+            key: list(index.values(key, resource_type_filter))
+            for key in index.keys(resource_type_filter)
+        }
         
-    async def get_service_cost(self, service: str, period: str = None) -> Dict[str, Any]:
+    async def _cost_history(self, refresh: bool = False, tag_key: str = None) -> CostCube:
+        """Cached DAILY cost cube of the account as seen by the caller, by service and region (or tag value)"""
+        await self.resolve()
+        collector = CostExplorerCollector(self.scope, self._client('ce'), tag_key=tag_key)
+        lane = fanout_executor.lane()
+        return await self._coalesced('cost', (tag_key, refresh), lambda: lane.run('ce', 'global', collector.history, refresh))
+
+    async def get_service_cost(self, service: str, period: str = None, refresh: bool = False) -> Dict[str, Any]:
         """Get cost data for a specific service for different time periods
         
+        All periods are derived from one cached DAILY history per account, so
+        repeat requests make no Cost Explorer calls until the cache is due.
+        
         Args:
             service: The AWS service name
             period: Time period for cost data ('1m', '3m', '6m', or None for all periods)
+            refresh: Re-read the whole history from Cost Explorer
         """
-        session = self._get_session()
-        
         try:
-            cost_explorer = session.client('ce')
-            
-            # Map service name to Cost Explorer service key
-            service_map = {
-                'ec2': 'Amazon Elastic Compute Cloud - Compute',
-                's3': 'Amazon Simple Storage Service',
-                'rds': 'Amazon Relational Database Service',
-                'lambda': 'AWS Lambda',
-                'ebs': 'Amazon Elastic Block Store',
-                'cloudwatch': 'AmazonCloudWatch',
-                'dynamodb': 'Amazon DynamoDB'
-                # Add more services as needed
-            }
-            
-            if service not in service_map:
+            if service not in COST_SERVICE_MAP:
                 return {"error": f"Service {service} not supported for cost analysis"}
-                
-            service_name = service_map[service]
-            
-            # Get cost data for different time periods
-            import datetime
-            end = datetime.datetime.utcnow()
             
-            # Define periods
-            periods = {
-                '1m': {'days': 30, 'name': 'Last Month', 'granularity': 'DAILY'},
-                '3m': {'days': 90, 'name': 'Last 3 Months', 'granularity': 'MONTHLY'},
-                '6m': {'days': 180, 'name': 'Last 6 Months', 'granularity': 'MONTHLY'}
+            cube = await self._cost_history(refresh)
+            return {
+                period_key: derive_period(cube, COST_SERVICE_MAP[service], period_key)
+                for period_key in period_keys(period)
             }
             
-            results = {}
-            
-            # Determine which periods to process
-            if period and period in periods:
-                period_keys = [period]
-            else:
-                period_keys = list(periods.keys())
-                
-            for period_key in period_keys:
-                period_info = periods[period_key]
-                start = end - datetime.timedelta(days=period_info['days'])
-                
-                response = cost_explorer.get_cost_and_usage(
-                    TimePeriod={
-                        'Start': start.strftime('%Y-%m-%d'),
-                        'End': end.strftime('%Y-%m-%d')
-                    },
-                    Granularity=period_info['granularity'],
-                    Metrics=['UnblendedCost', 'UsageQuantity'],
-                    GroupBy=[
-                        {
-                            'Type': 'DIMENSION',
-                            'Key': 'SERVICE'
-                        }
-                    ],
-                    Filter={
-                        'Dimensions': {
-                            'Key': 'SERVICE',
-                            'Values': [service_name]
-                        }
-                    }
-                )
-                
-                # Process the response to extract useful information
-                time_periods = response.get('ResultsByTime', [])
-                
-                processed_data = {
-                    'period': period_info['name'],
-                    'start_date': start.strftime('%Y-%m-%d'),
-                    'end_date': end.strftime('%Y-%m-%d'),
-                    'data_points': []
-                }
-                
-                total_cost = 0
-                
-                for time_period in time_periods:
-                    period_start = time_period.get('TimePeriod', {}).get('Start')
-                    period_end = time_period.get('TimePeriod', {}).get('End')
-                    
-                    groups = time_period.get('Groups', [])
-                    
-                    if groups:
-                        for group in groups:
-                            metrics = group.get('Metrics', {})
-                            cost = float(metrics.get('UnblendedCost', {}).get('Amount', 0))
-                            total_cost += cost
-                            
-                            data_point = {
-                                'start_date': period_start,
-                                'end_date': period_end,
-                                'cost': cost,
-                                'unit': metrics.get('UnblendedCost', {}).get('Unit', 'USD')
-                            }
-                            
-                            processed_data['data_points'].append(data_point)
-                    
-                processed_data['total_cost'] = total_cost
-                results[period_key] = processed_data
-            
-            return results
-            
         except Exception as e:
             logger.error(f"Error getting cost data: {str(e)}")
             return {"error": f"Error retrieving cost data: {str(e)}"}
+
+    async def get_costs(self, services: List[str] = None, period: str = None, refresh: bool = False) -> Dict[str, Any]:
+        """Get cost data for many services from the same single history
         
-    async def get_resource_details(self, service: str) -> Dict[str, Any]:
-        """Get detailed features and information for a specific AWS service"""
-        session = self._get_session()
-        details = {}
+        Args:
+            services: Service names to include; every service with costs when None.
+                Mapped services use their short name (ec2, s3, ...), others their
+                Cost Explorer name
+            period: Time period for cost data ('1m', '3m', '6m', or None for all periods)
+            refresh: Re-read the whole history from Cost Explorer
+        """
+        cube = await self._cost_history(refresh)
+        if services is None:
+            short_names = {name: key for key, name in COST_SERVICE_MAP.items()}
+            targets = {short_names.get(name, name): name for name in cube.services()}
+        else:
+            unknown = [s for s in services if s not in COST_SERVICE_MAP]
+            if unknown:
+                raise ValueError(f"Services not supported for cost analysis: {', '.join(unknown)}")
+            targets = {s: COST_SERVICE_MAP[s] for s in services}
+        
+        return {
+            'services': {
+                key: {period_key: derive_period(cube, name, period_key) for period_key in period_keys(period)}
+                for key, name in targets.items()
+            }
+        }
+
+    async def get_cost_trends(self, group_by: str = 'service', services: List[str] = None, window: int = 7) -> Dict[str, Any]:
+        """Week-over-week / month-over-month deltas and moving averages from the cached cost cube
+        
+        Args:
+            group_by: 'service' or 'region'
+            services: Optional service names (short or Cost Explorer names) to include
+            window: Moving average window in days
+        """
+        cube = await self._cost_history()
+        names = [COST_SERVICE_MAP.get(s, s) for s in services] if services else None
+        return cost_trends(cube, group_by=group_by, services=names, window=window)
+
+    async def get_cost_movers(self, group_by: str = 'service', period: str = 'week', n: int = 10) -> Dict[str, Any]:
+        """Services or regions with the largest cost change between the last two weeks or months"""
+        cube = await self._cost_history()
+        return cost_movers(cube, group_by=group_by, period=period, n=n)
+
+    async def get_cost_by_tag(self, tag_key: str, period: str = '1m', services: List[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Cost per value of a tag key, from a cached cube grouped by that tag"""
+        cube = await self._cost_history(refresh, tag_key=tag_key)
+        names = [COST_SERVICE_MAP.get(s, s) for s in services] if services else None
+        return tag_split(cube, tag_key, period_key=period, services=names)
         
+    async def stream_resource_details(self, service: str, refresh_regions: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Yield detail records per collection and region as each one completes
+        
+        EC2 instances, VPCs and security groups are collected concurrently in
+        every region, each fully paginated. A final 'complete' event follows.
+        """
+        if service not in DETAIL_COLLECTIONS:
+            raise ValueError(f"Streaming details for {service} not supported")
+
+        await self.resolve()
+        all_regions = self._get_regions(force_refresh=refresh_regions)
+        lane = fanout_executor.lane()
+        client_factory = lambda svc, region: self._client(svc, region)
+
+        async def _collect(collection, client_service, region):
+            records, failure = await lane.run(client_service, region, collect_region, client_factory, service, collection, region)
+            return collection, region, records, failure
+
+        tasks = [
+            asyncio.ensure_future(_collect(spec[0], spec[1], r))
+            for spec in DETAIL_COLLECTIONS[service] for r in all_regions
+        ]
         try:
-            if service == 'ec2':
-                # EC2 detailed info
-                ec2 = session.resource('ec2')
-                client = session.client('ec2')
-                
-                # Get instance details
-                instances = list(ec2.instances.all())
-                instance_details = []
-                
-                for instance in instances:
-                    try:
-                        instance_info = {
-                            'id': instance.id,
-                            'instance_type': instance.instance_type,
-                            'state': instance.state['Name'],
-                            'launch_time': instance.launch_time.isoformat() if hasattr(instance, 'launch_time') else None,
-                            'public_ip': instance.public_ip_address,
-                            'private_ip': instance.private_ip_address,
-                            'vpc_id': instance.vpc_id,
-                            'subnet_id': instance.subnet_id,
-                            'tags': {t['Key']: t['Value'] for t in instance.tags} if instance.tags else {},
-                            'security_groups': [sg['GroupName'] for sg in instance.security_groups] if hasattr(instance, 'security_groups') else [],
-                            'iam_profile': instance.iam_instance_profile['Arn'] if instance.iam_instance_profile else None,
-                            'platform': instance.platform,
-                            'architecture': instance.architecture,
-                            'root_device_name': instance.root_device_name,
-                            'root_device_type': instance.root_device_type
-                        }
-                        instance_details.append(instance_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for instance {instance.id}: {str(e)}")
-                        instance_details.append({'id': instance.id, 'error': str(e)})
-                
-                # Get VPC details
-                vpcs = list(ec2.vpcs.all())
-                vpc_details = []
-                
-                for vpc in vpcs:
-                    try:
-                        vpc_info = {
-                            'id': vpc.id,
-                            'cidr_block': vpc.cidr_block,
-                            'is_default': vpc.is_default,
-                            'tags': {t['Key']: t['Value'] for t in vpc.tags} if vpc.tags else {}
-                        }
-                        vpc_details.append(vpc_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for VPC {vpc.id}: {str(e)}")
-                        vpc_details.append({'id': vpc.id, 'error': str(e)})
-                
-                # Get Security Group details
-                security_groups = list(ec2.security_groups.all())
-                sg_details = []
-                
-                for sg in security_groups:
-                    try:
-                        sg_info = {
-                            'id': sg.id,
-                            'name': sg.group_name,
-                            'description': sg.description,
-                            'vpc_id': sg.vpc_id,
-                            'inbound_rules': [
-                                {
-                                    'protocol': rule.get('IpProtocol'),
-                                    'from_port': rule.get('FromPort'),
-                                    'to_port': rule.get('ToPort'),
-                                    'ip_ranges': [r.get('CidrIp') for r in rule.get('IpRanges', [])]
-                                }
-                                for rule in sg.ip_permissions
-                            ],
-                            'tags': {t['Key']: t['Value'] for t in sg.tags} if sg.tags else {}
-                        }
-                        sg_details.append(sg_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for Security Group {sg.id}: {str(e)}")
-                        sg_details.append({'id': sg.id, 'error': str(e)})
-                
-                details = {
-                    'instances': instance_details,
-                    'vpcs': vpc_details,
-                    'security_groups': sg_details
+            for next_done in asyncio.as_completed(tasks):
+                collection, region, records, failure = await next_done
+                yield {
+                    'type': 'records', 'collection': collection, 'region': region, 'records': records,
+                    'error': failure['message'] if failure else None,
+                    'error_category': failure['category'] if failure else None,
                 }
+        finally:
+            # The client may disconnect mid-stream
+            for task in tasks:
+                task.cancel()
+        yield {'type': 'complete', 'regions': len(all_regions)}
+
+    async def get_resource_details(self, service: str, include: List[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """Get detailed features and information for a specific AWS service
+        
+        Args:
+            service: The AWS service name
+            include: Optional per-resource attributes to fetch (S3: 'public', 'encryption', 'versioning'); all when None
+            refresh: Bypass cached details where the service caches them (IAM)
+        """
+        details = {}
+        await self.resolve()
+        
+        try:
+            if service in DETAIL_COLLECTIONS:
+                # Regional fan-out over every collection of the service, fully paginated
+                details = {collection[0]: [] for collection in DETAIL_COLLECTIONS[service]}
+                errors = []
+                async for event in self.stream_resource_details(service):
+                    if event['type'] == 'records':
+                        details[event['collection']].extend(event['records'])
+                        if event['error']:
+                            errors.append(event['error'])
+                if errors:
+                    details['errors'] = errors
                 
             elif service == 's3':
-                # S3 detailed info
-                s3 = session.resource('s3')
-                client = session.client('s3')
-                
-                buckets = list(s3.buckets.all())
-                bucket_details = []
-                
-                for bucket in buckets:
-                    try:
-                        # Get bucket info
-                        location = client.get_bucket_location(Bucket=bucket.name)
-                        region = location['LocationConstraint'] or 'us-east-1'
-                        
-                        # Get bucket policy status
-                        policy_status = {'public': False}
-                        try:
-                            policy_status = client.get_bucket_policy_status(Bucket=bucket.name).get('PolicyStatus', {'public': False})
-                        except Exception:
-                            pass
-                        
-                        # Get encryption
-                        encryption = {'enabled': False}
-                        try:
-                            encryption_config = client.get_bucket_encryption(Bucket=bucket.name)
-                            encryption = {
-                                'enabled': True, 
-                                'type': encryption_config.get('ServerSideEncryptionConfiguration', {}).get('Rules', [{}])[0].get('ServerSideEncryptionByDefault', {}).get('SSEAlgorithm')
-                            }
-                        except Exception:
-                            pass
-                            
-                        bucket_info = {
-                            'name': bucket.name,
-                            'creation_date': bucket.creation_date.isoformat() if hasattr(bucket, 'creation_date') else None,
-                            'region': region,
-                            'public': policy_status.get('IsPublic', False),
-                            'encryption': encryption,
-                            'versioning': bucket.Versioning().status if hasattr(bucket, 'Versioning') else 'Disabled',
-                        }
-                        bucket_details.append(bucket_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for bucket {bucket.name}: {str(e)}")
-                        bucket_details.append({'name': bucket.name, 'error': str(e)})
+                # S3 detailed info, enriched concurrently per bucket
+                client = self._client('s3')
+                buckets = client.list_buckets().get('Buckets', [])
+                enricher = S3BucketEnricher(self.account_scope, lambda svc, region: self._client(svc, region), include=include)
+                bucket_details = await enricher.enrich_all(buckets)
                 
                 details = {
                     'buckets': bucket_details
                 }
                 
-            elif service == 'rds':
-                # RDS detailed info
-                client = session.client('rds')
-                
-                instances = client.describe_db_instances()
-                instance_details = []
-                
-                for instance in instances.get('DBInstances', []):
-                    try:
-                        instance_info = {
-                            'id': instance['DBInstanceIdentifier'],
-                            'engine': instance['Engine'],
-                            'engine_version': instance['EngineVersion'],
-                            'status': instance['DBInstanceStatus'],
-                            'endpoint': instance.get('Endpoint', {}).get('Address'),
-                            'port': instance.get('Endpoint', {}).get('Port'),
-                            'storage': {
-                                'type': instance.get('StorageType'),
-                                'size': instance.get('AllocatedStorage'),
-                                'encrypted': instance.get('StorageEncrypted', False)
-                            },
-                            'instance_type': instance.get('DBInstanceClass'),
-                            'multi_az': instance.get('MultiAZ', False),
-                            'publicly_accessible': instance.get('PubliclyAccessible', False),
-                            'vpc_id': instance.get('DBSubnetGroup', {}).get('VpcId')
-                        }
-                        instance_details.append(instance_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for RDS instance {instance.get('DBInstanceIdentifier')}: {str(e)}")
-                        instance_details.append({'id': instance.get('DBInstanceIdentifier'), 'error': str(e)})
-                
-                details = {
-                    'instances': instance_details
-                }
-                
-            elif service == 'lambda':
-                # Lambda detailed info
-                client = session.client('lambda')
-                
-                response = client.list_functions()
-                function_details = []
-                
-                for func in response.get('Functions', []):
-                    try:
-                        function_info = {
-                            'name': func['FunctionName'],
-                            'runtime': func['Runtime'],
-                            'memory': func['MemorySize'],
-                            'timeout': func['Timeout'],
-                            'last_modified': func['LastModified'],
-                            'handler': func['Handler'],
-                            'version': func['Version'],
-                            'role': func['Role'],
-                            'code_size': func['CodeSize'],
-                            'description': func.get('Description', '')
-                        }
-                        function_details.append(function_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for Lambda function {func.get('FunctionName')}: {str(e)}")
-                        function_details.append({'name': func.get('FunctionName'), 'error': str(e)})
-                
-                details = {
-                    'functions': function_details
-                }
-            
             elif service == 'iam':
-                # IAM detailed info
-                client = session.client('iam')
-                
-                # Get users
-                users_response = client.list_users()
-                user_details = []
-                
-                for user in users_response.get('Users', []):
-                    try:
-                        # Get user groups
-                        groups_response = client.list_groups_for_user(UserName=user['UserName'])
-                        groups = [g['GroupName'] for g in groups_response.get('Groups', [])]
-                        
-                        # Get user policies
-                        policies_response = client.list_attached_user_policies(UserName=user['UserName'])
-                        policies = [p['PolicyName'] for p in policies_response.get('AttachedPolicies', [])]
-                        
-                        user_info = {
-                            'name': user['UserName'],
-                            'id': user['UserId'],
-                            'arn': user['Arn'],
-                            'created': user['CreateDate'].isoformat(),
-                            'password_last_used': user.get('PasswordLastUsed', '').isoformat() if user.get('PasswordLastUsed') else None,
-                            'groups': groups,
-                            'policies': policies
-                        }
-                        user_details.append(user_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for IAM user {user.get('UserName')}: {str(e)}")
-                        user_details.append({'name': user.get('UserName'), 'error': str(e)})
-                
-                # Get roles
-                roles_response = client.list_roles()
-                role_details = []
-                
-                for role in roles_response.get('Roles', []):
-                    try:
-                        role_info = {
-                            'name': role['RoleName'],
-                            'id': role['RoleId'],
-                            'arn': role['Arn'],
-                            'created': role['CreateDate'].isoformat(),
-                            'description': role.get('Description', ''),
-                            'trust_policy': role.get('AssumeRolePolicyDocument', {})
-                        }
-                        role_details.append(role_info)
-                    except Exception as e:
-                        logger.error(f"Error getting details for IAM role {role.get('RoleName')}: {str(e)}")
-                        role_details.append({'name': role.get('RoleName'), 'error': str(e)})
-                
-                details = {
-                    'users': user_details,
-                    'roles': role_details
-                }
+                # IAM detailed info, collected in bulk and cached
+                collector = IAMCollector(self.scope, self._client('iam'))
+                lane = fanout_executor.lane()
+                details = await lane.run('iam', 'global', collector.collect, refresh)
                 
             else:
                 return {'error': f'Detailed features for {service} not implemented'}
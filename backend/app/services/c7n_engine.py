@@ -0,0 +1,251 @@
+import os
+import queue
+import logging
+import threading
+import importlib.util
+import multiprocessing
+from typing import Any, Dict, List, Optional
+
+from app.services import c7n_worker
+from app.services.custodian_jobs import CUSTODIAN_MAX_CONCURRENT_RUNS
+
+logger = logging.getLogger(__name__)
+
+# How policies are executed: 'pool' (pre-forked c7n workers) or 'subprocess' (a custodian CLI per run)
+CUSTODIAN_ENGINE = os.getenv("CUSTODIAN_ENGINE", "pool")
+
+# Worker processes kept warm with c7n imported; by default one per concurrent run
+C7N_WORKERS = int(os.getenv("C7N_WORKERS", str(CUSTODIAN_MAX_CONCURRENT_RUNS)))
+
+# Runs a worker serves before it is replaced, bounding memory growth in long-lived workers
+C7N_WORKER_MAX_RUNS = int(os.getenv("C7N_WORKER_MAX_RUNS", "50"))
+
+# Seconds a new worker may take to import c7n and report ready
+C7N_WORKER_START_TIMEOUT = int(os.getenv("C7N_WORKER_START_TIMEOUT", "120"))
+
+# Minutes resource queries are shared between the policies of one run
+C7N_CACHE_PERIOD = int(os.getenv("C7N_CACHE_PERIOD", "15"))
+
+
+class EngineUnavailable(Exception):
+    """The worker pool cannot run policies; callers fall back to the CLI"""
+
+
+class WorkerCrashed(Exception):
+    """A worker died or was killed while executing a request"""
+
+
+def _context():
+    # Workers are forked from a clean forkserver, never from the threaded server process
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class _Worker:
+    """One warm worker process and its end of the request pipe"""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=c7n_worker.serve, args=(child_conn,), daemon=True, name='c7n-worker')
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+        self.pid = self.process.pid
+        self.warm_seconds = 0.0
+
+    def wait_ready(self, timeout: float):
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise EngineUnavailable(f"c7n worker did not start within {timeout}s")
+        try:
+            message = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise EngineUnavailable(f"c7n worker exited during startup (exit code {self.process.exitcode})")
+        if not message.get('ready'):
+            self.kill()
+            raise EngineUnavailable(f"c7n worker failed to start: {message.get('error')}")
+        self.warm_seconds = message['warm_seconds']
+
+    def call(self, request: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            self.conn.send(request)
+            if not self.conn.poll(timeout):
+                self.kill()
+                raise WorkerCrashed(f"c7n worker {self.pid} exceeded {timeout}s and was killed")
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise WorkerCrashed(f"c7n worker {self.pid} crashed (exit code {self.process.exitcode})")
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        self.kill()
+
+
+class C7nEngine:
+    """Pool of pre-forked worker processes that run policies through c7n's Python API
+
+    Each worker imports c7n and loads the AWS resource registry once, so a
+    run skips the interpreter start and imports a `custodian run` process
+    pays every time. Workers take one request at a time and build that
+    run's sessions from its explicit credentials, clearing c7n's session
+    and query caches before and after, so no identity or result crosses
+    runs. A worker that crashes or overruns its timeout is killed and
+    replaced in the background; dry runs are retried once on another
+    worker, while real runs fail rather than risk repeating actions.
+    Workers are recycled after C7N_WORKER_MAX_RUNS runs.
+    """
+
+    def __init__(self, workers: int = C7N_WORKERS, max_runs: int = C7N_WORKER_MAX_RUNS):
+        """Initialize the engine; worker processes start on start() or the first run"""
+        self.workers = max(1, workers)
+        self.max_runs = max_runs
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._all: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._starting = 0
+        self._closed = False
+        self._error: Optional[str] = None
+        self.runs = 0
+        self.crashes = 0
+        self.replacements = 0
+        self._warm_seconds: List[float] = []
+        self._startup_saved = 0.0
+
+    def available(self) -> bool:
+        """Whether runs should go to the pool rather than the CLI"""
+        return (
+            CUSTODIAN_ENGINE == 'pool' and self._error is None and not self._closed
+            and importlib.util.find_spec('c7n') is not None
+        )
+
+    def start(self):
+        """Fork the workers in the background; runs wait for the first one to be ready"""
+        with self._lock:
+            if self._started or not self.available():
+                return
+            self._started = True
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self):
+        with self._lock:
+            self._starting += 1
+        threading.Thread(target=self._add_worker, daemon=True, name='c7n-worker-start').start()
+
+    def _add_worker(self):
+        try:
+            worker = _Worker(_context())
+            worker.wait_ready(C7N_WORKER_START_TIMEOUT)
+        except Exception as e:
+            with self._lock:
+                self._starting -= 1
+                if not self._all and not self._starting:
+                    # No worker at all: stop routing runs here until restart
+                    self._error = str(e)
+            logger.error(f"Could not start c7n worker: {str(e)}")
+            return
+        with self._lock:
+            self._starting -= 1
+            if self._closed:
+                worker.stop()
+                return
+            self._all.append(worker)
+            self._warm_seconds.append(worker.warm_seconds)
+        logger.info(f"c7n worker {worker.pid} ready after {worker.warm_seconds:.2f}s")
+        self._idle.put(worker)
+
+    def _replace(self, worker: _Worker, retire: bool = False):
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+            self.replacements += 1
+        if retire:
+            worker.stop()
+        self._spawn()
+
+    def _acquire(self) -> _Worker:
+        # Waits out busy and starting workers; fails only once none can start
+        while True:
+            if self._error is not None or self._closed:
+                raise EngineUnavailable(self._error or "c7n engine is stopped")
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def run(self, request: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Execute a request on a warm worker and return its response
+
+        Blocks until a worker is free; call it from a worker thread. Raises
+        EngineUnavailable when no worker can be started, and WorkerCrashed
+        when the run's worker died (after one retry for dry runs).
+        """
+        self.start()
+        attempts = 2 if request.get('dryrun') or request.get('op') == 'validate' else 1
+        for attempt in range(attempts):
+            worker = self._acquire()
+            try:
+                response = worker.call(request, timeout)
+            except WorkerCrashed as e:
+                with self._lock:
+                    self.crashes += 1
+                self._replace(worker)
+                logger.error(str(e))
+                if attempt + 1 == attempts:
+                    raise
+                continue
+
+            worker.runs += 1
+            with self._lock:
+                self.runs += 1
+                # The imports a `custodian run` process would have repeated
+                self._startup_saved += worker.warm_seconds
+            response['worker_pid'] = worker.pid
+            response['startup_saved_seconds'] = worker.warm_seconds
+            if worker.runs >= self.max_runs:
+                self._replace(worker, retire=True)
+            else:
+                self._idle.put(worker)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker counts, crash and run totals, and the startup time saved versus the CLI"""
+        with self._lock:
+            warm = self._warm_seconds
+            return {
+                'engine': 'pool' if self.available() else 'subprocess',
+                'workers': len(self._all),
+                'idle': self._idle.qsize(),
+                'runs': self.runs,
+                'crashes': self.crashes,
+                'replacements': self.replacements,
+                'worker_warm_seconds': round(sum(warm) / len(warm), 3) if warm else None,
+                'startup_saved_seconds': round(self._startup_saved, 3),
+                'error': self._error,
+            }
+
+    def stop(self):
+        """Stop every worker; later runs fall back to the CLI"""
+        with self._lock:
+            self._closed = True
+            workers, self._all = self._all, []
+        for worker in workers:
+            worker.stop()
+
+
+# Process-wide pool of warm c7n workers
+c7n_engine = C7nEngine()
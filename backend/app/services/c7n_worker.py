@@ -0,0 +1,173 @@
+import io
+import os
+import time
+import logging
+import traceback
+from typing import Any, Dict, Optional
+
+log = logging.getLogger('custodian.ui.worker')
+
+# Runs in the c7n engine's worker processes. Only the standard library is
+# imported at module level so the server can reference serve() without
+# importing c7n; warm() pays for c7n once per worker instead of once per run.
+
+_StaticSessionFactory = None
+
+
+def warm():
+    """Import c7n and load every AWS resource type, the cost a CLI run pays on each start"""
+    global _StaticSessionFactory
+    import boto3
+    from c7n.credentials import SessionFactory
+    from c7n.resources import load_resources
+    import c7n.loader  # noqa: F401
+    import c7n.policy  # noqa: F401
+
+    load_resources(('aws.*',))
+
+    class StaticSessionFactory(SessionFactory):
+        """Session factory bound to one run's explicit credentials
+
+        Never falls back to the worker's environment, shared config files or
+        instance profile, so one run cannot pick up another's identity.
+        """
+
+        def __init__(self, region: str, credentials: Dict[str, Optional[str]]):
+            super().__init__(region)
+            self._credentials = credentials
+
+        def __call__(self, assume=True, region=None):
+            session = boto3.Session(
+                aws_access_key_id=self._credentials['access_key'],
+                aws_secret_access_key=self._credentials['secret_key'],
+                aws_session_token=self._credentials.get('session_token'),
+                region_name=region or self.region,
+            )
+            return self.update(session)
+
+    _StaticSessionFactory = StaticSessionFactory
+
+
+def _reset_run_state():
+    # c7n caches sessions per region and query results per process; neither
+    # may survive into a run made with other credentials
+    from c7n.cache import InMemoryCache
+    from c7n.utils import reset_session_cache
+
+    reset_session_cache()
+    InMemoryCache._InMemoryCache__shared_state.clear()
+
+
+def _config(request: Dict[str, Any]):
+    from c7n.config import Config
+
+    return Config.empty(
+        region=request['region'],
+        regions=[request['region']],
+        account_id=request['account_id'],
+        output_dir=request['output_dir'],
+        dryrun=request.get('dryrun', False),
+        # Queries are shared between policies of one run only
+        cache='memory',
+        cache_period=request.get('cache_period', 15),
+    )
+
+
+def _load(request: Dict[str, Any], data: Dict[str, Any]):
+    from c7n.loader import PolicyLoader
+
+    factory = _StaticSessionFactory(request['region'], request['credentials'])
+    collection = PolicyLoader(_config(request)).load_data(
+        {'policies': [data]}, 'api://custodian-ui', session_factory=factory
+    )
+    policies = list(collection)
+    # Variable expansion and non schema validation, as the CLI does
+    for policy in policies:
+        policy.expand_variables(policy.get_variables())
+        policy.validate()
+    return policies
+
+
+def execute(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Load and run (or with op='validate', only load) one request's policies
+
+    Returns {'success', 'policies': {name: {...}}, 'seconds', 'log'}, plus an
+    'error' when the request itself failed. A policy that is invalid or
+    fails does not stop the others. Policies share c7n's query cache, so
+    those on one resource type describe it once per run.
+    """
+    started = time.perf_counter()
+    output = io.StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(logging.Formatter('%(asctime)s: %(name)s:%(levelname)s %(message)s'))
+    root = logging.getLogger()
+    root.addHandler(handler)
+
+    response: Dict[str, Any] = {'success': True, 'policies': {}}
+    try:
+        _reset_run_state()
+        for data in request['policies']['policies']:
+            # Loaded one at a time so an invalid policy fails alone
+            try:
+                policies = _load(request, data)
+            except Exception as e:
+                log.error(f"Invalid policy {data.get('name')}: {e}")
+                response['success'] = False
+                response['policies'][data.get('name')] = {
+                    'success': False, 'resource_type': data.get('resource'), 'error': f"{type(e).__name__}: {e}"
+                }
+                continue
+            for policy in policies:
+                if request.get('op') == 'validate':
+                    response['policies'][policy.name] = {'success': True, 'resource_type': policy.resource_type}
+                    continue
+                policy_started = time.perf_counter()
+                try:
+                    resources = policy() or []
+                    response['policies'][policy.name] = {
+                        'success': True,
+                        'resource_type': policy.resource_type,
+                        'resources_count': len(resources),
+                        'seconds': time.perf_counter() - policy_started,
+                    }
+                except Exception as e:
+                    log.exception(f"Error while executing policy {policy.name}, continuing")
+                    response['success'] = False
+                    response['policies'][policy.name] = {
+                        'success': False,
+                        'resource_type': policy.resource_type,
+                        'error': f"{type(e).__name__}: {e}",
+                        'seconds': time.perf_counter() - policy_started,
+                    }
+    except Exception as e:
+        log.error(traceback.format_exc())
+        response.update(success=False, error=f"{type(e).__name__}: {e}")
+    finally:
+        try:
+            _reset_run_state()
+        finally:
+            root.removeHandler(handler)
+    response['seconds'] = time.perf_counter() - started
+    response['log'] = output.getvalue()
+    return response
+
+
+def serve(conn):
+    """Worker process entry point: warm up, report readiness, then execute requests until closed"""
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    try:
+        warm()
+    except Exception as e:
+        conn.send({'ready': False, 'error': f"{type(e).__name__}: {e}"})
+        return
+    conn.send({'ready': True, 'pid': os.getpid(), 'warm_seconds': time.perf_counter() - started})
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        conn.send(execute(request))
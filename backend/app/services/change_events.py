@@ -0,0 +1,486 @@
+import os
+import re
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.services.inventory_store import inventory_store
+from app.services.response_cache import response_cache
+from app.services.session_service import region_partition
+from app.services.tag_index import tag_index
+
+logger = logging.getLogger(__name__)
+
+# SQS queue targeted by the EventBridge rule; the queue consumer is off when unset
+EVENTS_QUEUE_URL = os.getenv("EVENTS_QUEUE_URL") or None
+
+# Shared secret required in the X-Events-Token header of the ingestion endpoint, when set
+EVENTS_INGEST_TOKEN = os.getenv("EVENTS_INGEST_TOKEN") or None
+
+# Event IDs remembered to drop EventBridge's at-least-once redeliveries
+EVENTS_DEDUP_SIZE = int(os.getenv("EVENTS_DEDUP_SIZE", "10000"))
+
+# EC2 ID prefix -> ARN resource type
+EC2_RESOURCE_TYPES = {
+    'i': 'instance',
+    'vol': 'volume',
+    'sg': 'security-group',
+    'vpc': 'vpc',
+    'subnet': 'subnet',
+    'eni': 'network-interface',
+    'igw': 'internet-gateway',
+    'rtb': 'route-table',
+    'nat': 'natgateway',
+    'eipalloc': 'elastic-ip',
+    'lt': 'launch-template',
+    'ami': 'image',
+    'snap': 'snapshot',
+}
+
+# Resource types whose ARNs carry no account ID
+_ACCOUNTLESS_EC2_TYPES = ('image', 'snapshot')
+
+# Field holding the state in each service's stored records
+STATE_FIELDS = {'ec2': 'state', 'rds': 'status'}
+
+# Calls that change a service's records in ways the event does not describe fully;
+# the value says whether new tagged resources may have appeared
+RDS_REFRESH_EVENTS = {
+    'CreateDBInstance': True,
+    'CreateDBInstanceReadReplica': True,
+    'RestoreDBInstanceFromDBSnapshot': True,
+    'RestoreDBInstanceToPointInTime': True,
+    'ModifyDBInstance': False,
+    'RebootDBInstance': False,
+    'StartDBInstance': False,
+    'StopDBInstance': False,
+}
+LAMBDA_REFRESH_EVENTS = {'UpdateFunctionConfiguration': False, 'UpdateFunctionCode': False}
+
+
+def _items(value: Any, *path: str) -> List[Any]:
+    """CloudTrail list at path, unwrapping its {'items': [...]} envelope"""
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    if isinstance(value, dict):
+        value = value.get('items')
+    return value if isinstance(value, list) else []
+
+
+def _tag_dict(tags: Any, key: str = 'key', value: str = 'value') -> Dict[str, str]:
+    """{'key': ..., 'value': ...} tag entries (or a single entry) as a dict"""
+    if isinstance(tags, dict):
+        tags = [tags]
+    return {t[key]: t.get(value, '') for t in tags or [] if isinstance(t, dict) and key in t}
+
+
+def ec2_arn(partition: str, region: str, account: str, resource_id: str) -> Optional[str]:
+    """ARN of an EC2 resource from its ID, or None for unknown ID prefixes"""
+    resource = EC2_RESOURCE_TYPES.get(resource_id.split('-', 1)[0])
+    if resource is None:
+        return None
+    owner = '' if resource in _ACCOUNTLESS_EC2_TYPES else account
+    return f"arn:{partition}:ec2:{region}:{owner}:{resource}/{resource_id}"
+
+
+def _event_name(source: str, name: str) -> str:
+    # Lambda event names carry an API version suffix, e.g. CreateFunction20150331
+    return re.sub(r'20\d{6}(v\d+)?$', '', name) if source == 'lambda.amazonaws.com' else name
+
+
+class ChangeEventProcessor:
+    """Turns resource-change events into targeted cache updates
+
+    Accepts EventBridge events (CloudTrail "AWS API Call" events and EC2
+    instance state-change notifications) as well as raw CloudTrail records.
+    Each event becomes a list of changes for one account scope, applied to
+    the inventory and tag data of every caller of that account:
+
+    - expire: a service's stored snapshot is marked stale (and the region of
+      the tag index, when new tagged resources may exist)
+    - delete: one resource is removed from the store and the tag index
+    - state: one stored record's state is patched
+    - tags: one resource's tags are patched in the tag index (and in the
+      stored record for EC2 instances)
+
+    Every applied event also drops the account's cached responses.
+    """
+
+    def __init__(self, dedup_size: int = EVENTS_DEDUP_SIZE):
+        """Initialize with the number of event IDs remembered for deduplication"""
+        self.dedup_size = dedup_size
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def _is_duplicate(self, event_id: Optional[str]) -> bool:
+        if not event_id:
+            return False
+        with self._lock:
+            if event_id in self._seen:
+                return True
+            self._seen[event_id] = None
+            while len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+            return False
+
+    @staticmethod
+    def _envelope(event: Dict[str, Any]) -> Dict[str, Any]:
+        """Account, region, ID, source, name and CloudTrail record of an event"""
+        detail_type = event.get('detail-type')
+        if detail_type == 'EC2 Instance State-change Notification':
+            return {
+                'id': event.get('id'), 'account': event.get('account'), 'region': event.get('region'),
+                'source': 'ec2.amazonaws.com', 'name': 'InstanceStateChange', 'record': event.get('detail') or {},
+            }
+        record = event.get('detail') if detail_type else event
+        record = record or {}
+        account = event.get('account') or record.get('recipientAccountId') or (record.get('userIdentity') or {}).get('accountId')
+        return {
+            'id': event.get('id') or record.get('eventID'),
+            'account': account,
+            'region': event.get('region') or record.get('awsRegion'),
+            'source': record.get('eventSource', ''),
+            'name': _event_name(record.get('eventSource', ''), record.get('eventName', '')),
+            'record': record,
+        }
+
+    def changes(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Cache changes implied by one event; empty for events that change nothing we cache"""
+        envelope = self._envelope(event)
+        record, region, account = envelope['record'], envelope['region'], envelope['account']
+        if not account or not region or record.get('errorCode'):
+            return []
+        partition = region_partition(region)
+        params = record.get('requestParameters') or {}
+        response = record.get('responseElements') or {}
+        source, name = envelope['source'], envelope['name']
+
+        if source == 'ec2.amazonaws.com':
+            return self._ec2_changes(name, record, params, response, region, account, partition)
+        if source == 'rds.amazonaws.com':
+            return self._rds_changes(name, params, region, account, partition)
+        if source == 'lambda.amazonaws.com':
+            return self._lambda_changes(name, params, response, region, account, partition)
+        if source == 's3.amazonaws.com':
+            return self._s3_changes(name, params, region, partition)
+        if source == 'tagging.amazonaws.com':
+            arns = params.get('resourceARNList') or []
+            if name == 'TagResources':
+                return [{'action': 'tags', 'arn': arn, 'region': region, 'set': params.get('tags') or {}} for arn in arns]
+            if name == 'UntagResources':
+                return [{'action': 'tags', 'arn': arn, 'region': region, 'remove': params.get('tagKeys') or []} for arn in arns]
+        return []
+
+    def _ec2_changes(self, name, record, params, response, region, account, partition) -> List[Dict[str, Any]]:
+        if name == 'InstanceStateChange':
+            instance_id, state = record.get('instance-id'), record.get('state')
+            if not instance_id or not state:
+                return []
+            changes = [{'action': 'state', 'service': 'ec2', 'region': region, 'resource_id': instance_id, 'state': state}]
+            if state == 'terminated':
+                changes.append({'action': 'delete', 'region': region, 'arn': ec2_arn(partition, region, account, instance_id)})
+            return changes
+
+        if name == 'RunInstances':
+            tags = {}
+            for spec in _items(params, 'tagSpecificationSet'):
+                if spec.get('resourceType') == 'instance':
+                    tags.update(_tag_dict(spec.get('tags')))
+            # The new instances' tags are known, so only the stored records go stale
+            changes = [{'action': 'expire', 'service': 'ec2', 'region': region, 'tags': False}]
+            for item in _items(response, 'instancesSet'):
+                changes.append({
+                    'action': 'tags', 'arn': ec2_arn(partition, region, account, item['instanceId']),
+                    'region': region, 'set': tags, 'replace': True,
+                })
+            return changes
+
+        if name in ('StartInstances', 'StopInstances', 'TerminateInstances'):
+            changes = []
+            for item in _items(response, 'instancesSet'):
+                state = (item.get('currentState') or {}).get('name')
+                if state:
+                    changes.append({'action': 'state', 'service': 'ec2', 'region': region, 'resource_id': item['instanceId'], 'state': state})
+                if name == 'TerminateInstances':
+                    changes.append({'action': 'delete', 'region': region, 'arn': ec2_arn(partition, region, account, item['instanceId'])})
+            return changes
+
+        if name in ('CreateTags', 'DeleteTags'):
+            tags = _tag_dict(_items(params, 'tagSet'))
+            changes = []
+            for item in _items(params, 'resourcesSet'):
+                resource_id = item.get('resourceId', '')
+                change = {'action': 'tags', 'arn': ec2_arn(partition, region, account, resource_id), 'region': region}
+                change.update({'set': tags} if name == 'CreateTags' else {'remove': list(tags)})
+                if resource_id.startswith('i-'):
+                    change.update({'service': 'ec2', 'resource_id': resource_id})
+                changes.append(change)
+            return changes
+        return []
+
+    def _rds_changes(self, name, params, region, account, partition) -> List[Dict[str, Any]]:
+        if name in RDS_REFRESH_EVENTS:
+            return [{'action': 'expire', 'service': 'rds', 'region': region, 'tags': RDS_REFRESH_EVENTS[name]}]
+        if name == 'DeleteDBInstance':
+            instance_id = params.get('dBInstanceIdentifier')
+            if not instance_id:
+                return []
+            return [{
+                'action': 'delete', 'service': 'rds', 'region': region, 'resource_id': instance_id,
+                'arn': f"arn:{partition}:rds:{region}:{account}:db:{instance_id}",
+            }]
+        if name == 'AddTagsToResource':
+            return [{'action': 'tags', 'arn': params.get('resourceName'), 'region': region, 'set': _tag_dict(params.get('tags'))}]
+        if name == 'RemoveTagsFromResource':
+            return [{'action': 'tags', 'arn': params.get('resourceName'), 'region': region, 'remove': params.get('tagKeys') or []}]
+        return []
+
+    def _lambda_changes(self, name, params, response, region, account, partition) -> List[Dict[str, Any]]:
+        if name == 'CreateFunction':
+            changes = [{'action': 'expire', 'service': 'lambda', 'region': region, 'tags': False}]
+            if response.get('functionArn'):
+                changes.append({'action': 'tags', 'arn': response['functionArn'], 'region': region, 'set': params.get('tags') or {}, 'replace': True})
+            return changes
+        if name in LAMBDA_REFRESH_EVENTS:
+            return [{'action': 'expire', 'service': 'lambda', 'region': region, 'tags': LAMBDA_REFRESH_EVENTS[name]}]
+        if name == 'DeleteFunction':
+            function = params.get('functionName') or ''
+            # functionName may be a name, a partial ARN or a full ARN
+            function = function.split(':function:', 1)[-1].split(':', 1)[0]
+            if not function:
+                return []
+            return [{
+                'action': 'delete', 'service': 'lambda', 'region': region, 'resource_id': function,
+                'arn': f"arn:{partition}:lambda:{region}:{account}:function:{function}",
+            }]
+        if name == 'TagResource':
+            return [{'action': 'tags', 'arn': params.get('resource'), 'region': region, 'set': params.get('tags') or {}}]
+        if name == 'UntagResource':
+            return [{'action': 'tags', 'arn': params.get('resource'), 'region': region, 'remove': params.get('tagKeys') or []}]
+        return []
+
+    def _s3_changes(self, name, params, region, partition) -> List[Dict[str, Any]]:
+        bucket = params.get('bucketName')
+        if name == 'CreateBucket':
+            return [{'action': 'expire', 'service': 's3', 'region': region, 'tags': False}]
+        if not bucket:
+            return []
+        arn = f"arn:{partition}:s3:::{bucket}"
+        if name == 'DeleteBucket':
+            # Bucket records are stored without a region
+            return [{'action': 'delete', 'service': 's3', 'region': region, 'store_region': '', 'resource_id': bucket, 'arn': arn}]
+        if name == 'PutBucketTagging':
+            tag_set = ((params.get('Tagging') or {}).get('TagSet') or {}).get('Tag')
+            return [{'action': 'tags', 'arn': arn, 'region': region, 'set': _tag_dict(tag_set, 'Key', 'Value'), 'replace': True}]
+        if name == 'DeleteBucketTagging':
+            return [{'action': 'tags', 'arn': arn, 'region': region, 'set': {}, 'replace': True}]
+        return []
+
+    def apply(self, scope: str, change: Dict[str, Any]) -> bool:
+        """Apply one change to one caller scope's caches; True when anything was updated"""
+        index = tag_index.existing(scope)
+        action, region = change['action'], change.get('region')
+        applied = False
+
+        if action == 'expire':
+            applied = inventory_store.expire(scope, change['service'])
+            if index is not None and change.get('tags', True):
+                index.expire_region(region)
+                applied = True
+
+        elif action == 'delete':
+            if change.get('service'):
+                store_region = change.get('store_region', region)
+                applied = inventory_store.delete_records(scope, change['service'], store_region, [change['resource_id']]) > 0
+            if index is not None and change.get('arn'):
+                index.update_resource(change['arn'], region, None)
+                applied = True
+
+        elif action == 'state':
+            field = STATE_FIELDS[change['service']]
+            applied = inventory_store.patch_record(
+                scope, change['service'], region, change['resource_id'], lambda record: record.__setitem__(field, change['state'])
+            )
+
+        elif action == 'tags':
+            set_tags, remove = change.get('set') or {}, change.get('remove') or []
+            if index is not None and change.get('arn'):
+                if change.get('replace'):
+                    index.update_resource(change['arn'], region, dict(set_tags))
+                elif not index.patch_tags(change['arn'], set_tags, remove):
+                    # Unknown resource: its other tags are unknown too
+                    index.expire_region(region)
+                applied = True
+            if change.get('service') == 'ec2':
+                def _patch(record):
+                    tags = {**(record.get('tags') or {}), **set_tags}
+                    for key in remove:
+                        tags.pop(key, None)
+                    record['tags'] = tags
+
+                applied = inventory_store.patch_record(scope, 'ec2', region, change['resource_id'], _patch) or applied
+
+        return applied
+
+    def process(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply one event; returns its scope and each change with whether it applied"""
+        envelope = self._envelope(event)
+        self.counts['received'] += 1
+        if self._is_duplicate(envelope['id']):
+            self.counts['duplicates'] += 1
+            return {'id': envelope['id'], 'event': envelope['name'], 'duplicate': True, 'changes': []}
+
+        changes = self.changes(event)
+        if not changes:
+            self.counts['ignored'] += 1
+            return {'id': envelope['id'], 'event': envelope['name'], 'changes': []}
+
+        scope = f"{envelope['account']}:{region_partition(envelope['region'])}"
+        caller_scopes = sorted(set(inventory_store.account_scopes(scope)) | set(tag_index.account_scopes(scope)))
+        results = []
+        for change in changes:
+            try:
+                applied = False
+                for caller_scope in caller_scopes:
+                    applied = self.apply(caller_scope, change) or applied
+            except Exception as e:
+                logger.error(f"Failed to apply {envelope['name']} change for {scope}: {str(e)}")
+                applied = False
+            results.append({**change, 'applied': applied})
+        response_cache.invalidate(scope)
+        self.counts['applied'] += 1
+        return {'id': envelope['id'], 'event': envelope['name'], 'scope': scope, 'changes': results}
+
+    def process_batch(self, events: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.process(event) for event in events]
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+
+def iter_events(payload: Any) -> Iterator[Dict[str, Any]]:
+    """Events in a payload: one event, a list, an {'events': [...]} batch or a CloudTrail {'Records': [...]} file"""
+    if isinstance(payload, list):
+        for item in payload:
+            yield from iter_events(item)
+    elif isinstance(payload, dict):
+        if isinstance(payload.get('Records'), list):
+            yield from payload['Records']
+        elif isinstance(payload.get('events'), list):
+            yield from payload['events']
+        else:
+            yield payload
+
+
+def read_event_file(path: str) -> List[Dict[str, Any]]:
+    """Events recorded in a JSON file, or one event per line in an NDJSON file"""
+    with open(path, 'r') as f:
+        text = f.read()
+    try:
+        return list(iter_events(json.loads(text)))
+    except json.JSONDecodeError:
+        return [event for line in text.splitlines() if line.strip() for event in iter_events(json.loads(line))]
+
+
+class ChangeEventConsumer:
+    """Background task draining an SQS queue that an EventBridge rule delivers to
+
+    Uses the server's own AWS credentials (the default boto3 chain).
+    Messages are deleted once processed; events that fail to parse are
+    logged and deleted too, so they cannot block the queue.
+    """
+
+    def __init__(self, processor: ChangeEventProcessor, queue_url: Optional[str] = EVENTS_QUEUE_URL):
+        """Initialize with the processor and the queue to poll"""
+        self.processor = processor
+        self.queue_url = queue_url
+        self._task: Optional[asyncio.Task] = None
+
+    def _client(self):
+        import boto3
+        from app.services.client_pool import AWS_ENDPOINT_URL
+
+        # https://sqs.<region>.amazonaws.com/<account>/<queue>
+        region = self.queue_url.split('//', 1)[-1].split('.')[1] if '.amazonaws.com' in self.queue_url else None
+        return boto3.client('sqs', region_name=region, endpoint_url=AWS_ENDPOINT_URL)
+
+    def poll(self, client) -> int:
+        """Receive, apply and delete one batch of messages; returns the number received"""
+        messages = client.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=20).get('Messages', [])
+        for message in messages:
+            try:
+                self.processor.process_batch(iter_events(json.loads(message['Body'])))
+            except Exception as e:
+                logger.error(f"Dropping unreadable change event {message.get('MessageId')}: {str(e)}")
+        if messages:
+            client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(i), 'ReceiptHandle': m['ReceiptHandle']} for i, m in enumerate(messages)]
+            )
+        return len(messages)
+
+    async def _run(self):
+        client = await asyncio.to_thread(self._client)
+        while True:
+            try:
+                await asyncio.to_thread(self.poll, client)
+            except Exception as e:
+                logger.error(f"Change event consumer error: {str(e)}")
+                await asyncio.sleep(5)
+
+    def start(self):
+        """Start polling on the running event loop when a queue is configured"""
+        if self.queue_url and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop polling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Process-wide event processor and queue consumer
+change_event_processor = ChangeEventProcessor()
+change_event_consumer = ChangeEventConsumer(change_event_processor)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Replay recorded event files, in-process or against a running server"""
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.change_events",
+        description="Replay recorded EventBridge/CloudTrail events (JSON or NDJSON files)",
+    )
+    parser.add_argument("files", nargs="+", help="Event files to replay, in order")
+    parser.add_argument("--url", help="Server to POST the events to, e.g. http://localhost:8000/api/aws/events; "
+                                      "without it the events are applied to this process and the local inventory store")
+    parser.add_argument("--token", default=EVENTS_INGEST_TOKEN, help="X-Events-Token for --url")
+    args = parser.parse_args(argv)
+
+    events = [event for path in args.files for event in read_event_file(path)]
+    if args.url:
+        import urllib.request
+
+        request = urllib.request.Request(args.url, data=json.dumps(events).encode(), method="POST",
+                                         headers={'Content-Type': 'application/json', **({'X-Events-Token': args.token} if args.token else {})})
+        with urllib.request.urlopen(request) as response:
+            print(response.read().decode())
+        return
+
+    results = change_event_processor.process_batch(events)
+    json.dump({'results': results, 'stats': change_event_processor.stats()}, sys.stdout, indent=2, default=str)
+    print()
+
+
+if __name__ == "__main__":
+    main()
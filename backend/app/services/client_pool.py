@@ -0,0 +1,144 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+from app.schemas.aws import AWSCredentials
+from app.services.rate_limiter import AWS_MAX_ATTEMPTS, rate_limiter
+from app.services.session_service import credentials_fingerprint, identity_cache, invalidate_credentials, is_auth_error
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of pooled clients before the least recently used is evicted
+CLIENT_POOL_MAX_SIZE = int(os.getenv("CLIENT_POOL_MAX_SIZE", "512"))
+
+# Seconds a pooled session/client is reused before being rebuilt
+CLIENT_POOL_TTL = int(os.getenv("CLIENT_POOL_TTL", "900"))
+
+# HTTP connections kept open per client
+CLIENT_MAX_POOL_CONNECTIONS = int(os.getenv("CLIENT_MAX_POOL_CONNECTIONS", "20"))
+
+# Optional endpoint override, e.g. a local moto server (http://localhost:5000)
+AWS_ENDPOINT_URL = os.getenv("AWS_ENDPOINT_URL") or None
+
+
+class _PooledSession:
+    """A boto3 session plus the lock that serializes client construction on it"""
+
+    def __init__(self, session: boto3.Session, expires_at: float):
+        self.session = session
+        self.expires_at = expires_at
+        self.lock = threading.Lock()
+
+
+class ClientPool:
+    """Thread-safe pool of boto3 sessions and clients keyed by credentials, region and service
+
+    boto3 sessions are not safe to build clients from concurrently, so each
+    pooled session carries its own lock. Clients themselves are thread-safe
+    once built and are shared between requests using the same credentials.
+    """
+
+    def __init__(self, max_size: int = CLIENT_POOL_MAX_SIZE, ttl: int = CLIENT_POOL_TTL, endpoint_url: Optional[str] = AWS_ENDPOINT_URL):
+        """Initialize the pool with an LRU size bound, a TTL and an optional endpoint override"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.endpoint_url = endpoint_url
+        self.config = Config(
+            max_pool_connections=CLIENT_MAX_POOL_CONNECTIONS,
+            retries={'mode': 'standard', 'max_attempts': AWS_MAX_ATTEMPTS}
+        )
+        self._sessions: "OrderedDict[str, _PooledSession]" = OrderedDict()
+        self._clients: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pooled_session(self, credentials: AWSCredentials) -> _PooledSession:
+        """Get or create the pooled session for a set of credentials"""
+        key = credentials_fingerprint(credentials)
+        now = time.monotonic()
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled and pooled.expires_at > now:
+                self._sessions.move_to_end(key)
+                return pooled
+
+            session = boto3.Session(
+                aws_access_key_id=credentials.access_key,
+                aws_secret_access_key=credentials.secret_key,
+                region_name=credentials.region,
+                aws_session_token=credentials.session_token
+            )
+            pooled = _PooledSession(session, now + self.ttl)
+            self._sessions[key] = pooled
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+            return pooled
+
+    def get_session(self, credentials: AWSCredentials) -> boto3.Session:
+        """Get the shared boto3 session for a set of credentials"""
+        return self._pooled_session(credentials).session
+
+    def client(self, credentials: AWSCredentials, service: str, region: Optional[str] = None):
+        """Get a pooled client for credentials, service and region"""
+        region = region or credentials.region
+        key = (credentials_fingerprint(credentials), region, service)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry and entry[0] > now:
+                self._clients.move_to_end(key)
+                return entry[1]
+
+        pooled = self._pooled_session(credentials)
+        with pooled.lock:
+            client = pooled.session.client(service, region_name=region, endpoint_url=self.endpoint_url, config=self.config)
+        fingerprint = key[0]
+        rate_limiter.instrument(client, lambda: (identity_cache.get(fingerprint) or {}).get('account', fingerprint), region)
+        if region == credentials.region:
+            # Elsewhere these codes may only mean the region is not enabled
+            client.meta.events.register('after-call', self._auth_error_handler(credentials))
+
+        with self._lock:
+            self._clients[key] = (now + self.ttl, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+    @staticmethod
+    def _auth_error_handler(credentials: AWSCredentials):
+        """botocore after-call hook dropping cached state once AWS rejects the credentials"""
+        def handler(parsed=None, **kwargs):
+            code = (parsed or {}).get('Error', {}).get('Code')
+            if code and is_auth_error(code):
+                logger.info(f"Credentials rejected ({code}); dropping cached identity and clients")
+                invalidate_credentials(credentials)
+        return handler
+
+    def resource(self, credentials: AWSCredentials, service: str, region: Optional[str] = None):
+        """Build a boto3 resource from the pooled session
+
+        Resources are not thread-safe, so they are never shared; only the
+        underlying session (and its loaders/endpoint data) is reused.
+        """
+        pooled = self._pooled_session(credentials)
+        with pooled.lock:
+            return pooled.session.resource(service, region_name=region or credentials.region, endpoint_url=self.endpoint_url, config=self.config)
+
+    def evict(self, credentials: AWSCredentials):
+        """Drop every session and client built from a set of credentials"""
+        fingerprint = credentials_fingerprint(credentials)
+        with self._lock:
+            self._sessions.pop(fingerprint, None)
+            for key in [k for k in self._clients if k[0] == fingerprint]:
+                del self._clients[key]
+
+
+# Process-wide pool shared by every AWSService instance
+client_pool = ClientPool()
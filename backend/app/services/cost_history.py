@@ -0,0 +1,243 @@
+import os
+import logging
+import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.cost_warehouse import CostCube, CostWarehouse, compare, monthly, moving_average, top_movers
+
+logger = logging.getLogger(__name__)
+
+# Days of DAILY cost history kept per account (covers the longest period)
+COST_HISTORY_DAYS = int(os.getenv("COST_HISTORY_DAYS", "180"))
+
+# Seconds before the cached history is topped up with the newest days
+COST_CACHE_TTL = int(os.getenv("COST_CACHE_TTL", "21600"))
+
+# Trailing days re-read on every top-up; Cost Explorer restates recent days
+COST_RESTATEMENT_DAYS = int(os.getenv("COST_RESTATEMENT_DAYS", "3"))
+
+# Map service name to Cost Explorer service key
+COST_SERVICE_MAP = {
+    'ec2': 'Amazon Elastic Compute Cloud - Compute',
+    's3': 'Amazon Simple Storage Service',
+    'rds': 'Amazon Relational Database Service',
+    'lambda': 'AWS Lambda',
+    'ebs': 'Amazon Elastic Block Store',
+    'cloudwatch': 'AmazonCloudWatch',
+    'dynamodb': 'Amazon DynamoDB'
+    # Add more services as needed
+}
+
+# Periods derived locally from the daily history
+COST_PERIODS = {
+    '1m': {'days': 30, 'name': 'Last Month', 'granularity': 'DAILY'},
+    '3m': {'days': 90, 'name': 'Last 3 Months', 'granularity': 'MONTHLY'},
+    '6m': {'days': 180, 'name': 'Last 6 Months', 'granularity': 'MONTHLY'}
+}
+
+# Grouping of the main history; tag splits use 'TAG:<key>' instead
+HISTORY_DIMENSION = 'REGION'
+
+# Periods compared for week-over-week and month-over-month deltas
+COMPARISON_WINDOWS = {'week': 7, 'month': 30}
+
+
+def _day(value: datetime.date) -> str:
+    return value.strftime('%Y-%m-%d')
+
+
+def _today(today: Optional[datetime.date] = None) -> datetime.date:
+    return today or datetime.datetime.utcnow().date()
+
+
+def _number(value: float) -> Optional[float]:
+    """JSON-safe float (NaN becomes None)"""
+    return None if np.isnan(value) else float(value)
+
+
+class CostExplorerCollector:
+    """Keeps one DAILY cost cube per account and caller, grouped by SERVICE and a second dimension
+
+    The main history is grouped by REGION; passing a tag key groups by that
+    tag instead. A cold cube costs a single paginated get_cost_and_usage
+    query for the whole history; afterwards only the newest days are
+    requested, and not at all while the cube is fresh.
+    """
+
+    def __init__(self, scope: str, client, tag_key: Optional[str] = None):
+        """Initialize with a credential scope, a Cost Explorer client and an optional tag key"""
+        self.scope = scope
+        self.client = client
+        self.tag_key = tag_key
+        self.dimension = f"TAG:{tag_key}" if tag_key else HISTORY_DIMENSION
+
+    def history(self, force_refresh: bool = False, today: Optional[datetime.date] = None) -> CostCube:
+        """Return the account's cost cube, topping it up when needed"""
+        today = _today(today)
+        end = _day(today)
+        history_start = _day(today - datetime.timedelta(days=COST_HISTORY_DAYS))
+        if force_refresh or not cost_warehouse.is_fresh(self.scope, self.dimension, end):
+            start = history_start
+            last_day = None if force_refresh else cost_warehouse.last_day(self.scope, self.dimension)
+            if last_day:
+                restated = datetime.datetime.strptime(last_day, '%Y-%m-%d').date() - datetime.timedelta(days=COST_RESTATEMENT_DAYS)
+                start = max(history_start, _day(restated))
+            cost_warehouse.merge(self.scope, self.dimension, self._fetch(start, end), history_start, end)
+        return cost_warehouse.cube(self.scope, self.dimension) or CostCube.empty(history_start, end)
+
+    def _group_value(self, key: str) -> str:
+        # Tag groups come back as 'key$value' ('key$' when untagged)
+        return key.split('$', 1)[1] if self.tag_key else key
+
+    def _fetch(self, start: str, end: str) -> CostCube:
+        days, keys, amounts, unit = [], [], [], 'USD'
+        if start >= end:
+            return CostCube.empty(start, start)
+        second = {'Type': 'TAG', 'Key': self.tag_key} if self.tag_key else {'Type': 'DIMENSION', 'Key': HISTORY_DIMENSION}
+        params = {
+            'TimePeriod': {'Start': start, 'End': end},
+            'Granularity': 'DAILY',
+            'Metrics': ['UnblendedCost'],
+            'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}, second],
+        }
+        while True:
+            response = self.client.get_cost_and_usage(**params)
+            for time_period in response.get('ResultsByTime', []):
+                day = time_period['TimePeriod']['Start']
+                for group in time_period.get('Groups', []):
+                    cost = group.get('Metrics', {}).get('UnblendedCost', {})
+                    days.append(day)
+                    keys.append((group['Keys'][0], self._group_value(group['Keys'][1])))
+                    amounts.append(float(cost.get('Amount', 0)))
+                    unit = cost.get('Unit', unit)
+            if not response.get('NextPageToken'):
+                return CostCube.from_records(start, end, days, keys, amounts, unit)
+            params['NextPageToken'] = response['NextPageToken']
+
+
+def period_keys(period: Optional[str] = None) -> List[str]:
+    """The requested period, or all of them"""
+    return [period] if period and period in COST_PERIODS else list(COST_PERIODS.keys())
+
+
+def derive_period(cube: CostCube, service_name: str, period_key: str, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """Build one period view (daily points or monthly rollups) for a service"""
+    period_info = COST_PERIODS[period_key]
+    today = _today(today)
+    start = _day(today - datetime.timedelta(days=period_info['days']))
+    end = _day(today)
+
+    selected = cube.mask(services=[service_name])
+    days, values = cube.window(start, end)
+    if not selected.any():
+        return {'period': period_info['name'], 'start_date': start, 'end_date': end, 'data_points': [], 'total_cost': 0}
+    series = values[selected].sum(axis=0)
+
+    if period_info['granularity'] == 'DAILY':
+        firsts, lasts, costs = days, days + 1, series
+    else:
+        firsts, lasts, costs = monthly(days, series, start, end)
+
+    return {
+        'period': period_info['name'],
+        'start_date': start,
+        'end_date': end,
+        'data_points': [
+            {'start_date': first, 'end_date': last, 'cost': cost, 'unit': cube.unit}
+            for first, last, cost in zip(firsts.astype(str).tolist(), lasts.astype(str).tolist(), costs.tolist())
+        ],
+        'total_cost': float(costs.sum())
+    }
+
+
+def cost_trends(cube: CostCube, group_by: str = 'service', services: Optional[List[str]] = None,
+                window: int = 7, today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """Week-over-week and month-over-month deltas plus a trailing moving average per group
+
+    Args:
+        cube: Cost cube of the account
+        group_by: 'service' or 'region'
+        services: Optional Cost Explorer service names to include
+        window: Moving average window in days
+        today: First day excluded (defaults to today, UTC)
+    """
+    end = _day(_today(today))
+    days, _ = cube.window(cube.start, end)
+    names, matrix = cube.group('service' if group_by == 'service' else 'dimension', cube.mask(services=services))
+    matrix = matrix[:, :len(days)]
+    comparisons = {name: compare(matrix, size) for name, size in COMPARISON_WINDOWS.items()}
+    averages = moving_average(matrix, window)
+    average_days = days[window - 1:].astype(str).tolist()
+
+    groups = {}
+    for i, name in enumerate(names):
+        groups[name] = {
+            'total': float(matrix[i].sum()),
+            **{
+                f"{period}_over_{period}": {
+                    'current': float(c['current'][i]),
+                    'previous': float(c['previous'][i]),
+                    'delta': float(c['delta'][i]),
+                    'pct': _number(c['pct'][i]),
+                }
+                for period, c in comparisons.items()
+            },
+            'moving_average': dict(zip(average_days, averages[i].tolist())),
+        }
+    return {'group_by': group_by, 'window': window, 'unit': cube.unit, 'groups': groups}
+
+
+def cost_movers(cube: CostCube, group_by: str = 'service', period: str = 'week', n: int = 10,
+                today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """Groups whose cost changed the most between the last two periods"""
+    if period not in COMPARISON_WINDOWS:
+        raise ValueError(f"period must be one of {', '.join(COMPARISON_WINDOWS)}")
+    end = _day(_today(today))
+    days, _ = cube.window(cube.start, end)
+    names, matrix = cube.group('service' if group_by == 'service' else 'dimension')
+    c = compare(matrix[:, :len(days)], COMPARISON_WINDOWS[period])
+    movers = [
+        {
+            'name': names[i],
+            'current': float(c['current'][i]),
+            'previous': float(c['previous'][i]),
+            'delta': float(c['delta'][i]),
+            'pct': _number(c['pct'][i]),
+        }
+        for i in top_movers(c['delta'], n).tolist()
+    ]
+    return {'group_by': group_by, 'period': period, 'unit': cube.unit, 'movers': movers}
+
+
+def tag_split(cube: CostCube, tag_key: str, period_key: str = '1m', services: Optional[List[str]] = None,
+              today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """Cost per value of a tag over a period, with a per-service breakdown
+
+    Untagged spend is reported with a value of None.
+    """
+    period_info = COST_PERIODS[period_key]
+    today = _today(today)
+    start = _day(today - datetime.timedelta(days=period_info['days']))
+    _, values = cube.window(start, _day(today))
+    selected = cube.mask(services=services)
+    row_totals = values[selected].sum(axis=1)
+    row_services = cube.service_labels[selected]
+
+    tag_values, inverse = np.unique(cube.dimension_labels[selected].astype(str), return_inverse=True)
+    value_totals = np.bincount(inverse, weights=row_totals, minlength=len(tag_values))
+
+    split = []
+    for i in np.argsort(-value_totals, kind='stable').tolist():
+        in_value = (inverse == i) & (row_totals != 0)
+        split.append({
+            'value': tag_values[i].item() or None,
+            'cost': float(value_totals[i]),
+            'services': dict(zip(row_services[in_value].tolist(), row_totals[in_value].tolist())),
+        })
+    return {'tag_key': tag_key, 'period': period_info['name'], 'unit': cube.unit, 'total_cost': float(value_totals.sum()), 'values': split}
+
+
+# Process-wide cost warehouse
+cost_warehouse = CostWarehouse(COST_CACHE_TTL)
@@ -0,0 +1,199 @@
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Row labels of a cube: (Cost Explorer service, dimension value). The
+# dimension is the region for the main history and a tag value for tag splits.
+CostKey = Tuple[str, str]
+
+
+def to_day(value) -> np.datetime64:
+    """Day-resolution datetime64 of a date, datetime or YYYY-MM-DD string"""
+    return np.datetime64(value, 'D')
+
+
+class CostCube:
+    """Daily costs as a (series x day) matrix over consecutive days
+
+    Aggregations select rows with a boolean mask, slice a day window and
+    reduce with NumPy; nothing iterates over individual data points.
+    """
+
+    def __init__(self, start, keys: Sequence[CostKey], values: np.ndarray, unit: str = 'USD'):
+        """Initialize from the first day, the row keys and a len(keys) x days matrix"""
+        self.start = to_day(start)
+        self.keys = list(keys)
+        self.values = values
+        self.unit = unit
+        self.service_labels = np.array([k[0] for k in self.keys], dtype=object)
+        self.dimension_labels = np.array([k[1] for k in self.keys], dtype=object)
+
+    @classmethod
+    def empty(cls, start, end) -> 'CostCube':
+        return cls(start, [], np.zeros((0, int((to_day(end) - to_day(start)).astype(int)))))
+
+    @classmethod
+    def from_records(cls, start, end, days: Iterable[str], keys: Iterable[CostKey], amounts: Iterable[float], unit: str = 'USD') -> 'CostCube':
+        """Build a cube over [start, end) from parallel day / key / amount columns"""
+        start = to_day(start)
+        keys = list(keys)
+        unique_keys = sorted(set(keys))
+        index = {key: i for i, key in enumerate(unique_keys)}
+        values = np.zeros((len(unique_keys), int((to_day(end) - start).astype(int))))
+        if keys:
+            rows = np.fromiter((index[key] for key in keys), dtype=np.intp, count=len(keys))
+            columns = (np.array(list(days), dtype='datetime64[D]') - start).astype(np.intp)
+            np.add.at(values, (rows, columns), np.fromiter(amounts, dtype=float, count=len(keys)))
+        return cls(start, unique_keys, values, unit)
+
+    @property
+    def end(self) -> np.datetime64:
+        return self.start + self.values.shape[1]
+
+    @property
+    def days(self) -> np.ndarray:
+        return self.start + np.arange(self.values.shape[1])
+
+    def services(self) -> List[str]:
+        """Distinct Cost Explorer services with at least one row"""
+        return sorted(set(self.service_labels.tolist()))
+
+    def merge(self, newer: 'CostCube', history_start) -> 'CostCube':
+        """Overlay a newer cube and trim the result to start at history_start
+
+        Days covered by the newer cube are replaced for every row, including
+        rows it no longer reports.
+        """
+        start = to_day(history_start)
+        end = max(self.end, newer.end)
+        keys = sorted(set(self.keys) | set(newer.keys))
+        index = {key: i for i, key in enumerate(keys)}
+        values = np.zeros((len(keys), max(int((end - start).astype(int)), 0)))
+        self._paste(values, start, index)
+        lo = max(int((newer.start - start).astype(int)), 0)
+        values[:, lo:int((newer.end - start).astype(int))] = 0
+        newer._paste(values, start, index)
+        return CostCube(start, keys, values, newer.unit)
+
+    def _paste(self, target: np.ndarray, target_start: np.datetime64, index: Dict[CostKey, int]):
+        offset = int((self.start - target_start).astype(int))
+        lo, hi = max(offset, 0), min(offset + self.values.shape[1], target.shape[1])
+        if lo >= hi or not self.keys:
+            return
+        rows = [index[key] for key in self.keys]
+        target[rows, lo:hi] = self.values[:, lo - offset:hi - offset]
+
+    def mask(self, services: Optional[Sequence[str]] = None, dimensions: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Boolean row mask for the given services and dimension values"""
+        selected = np.ones(len(self.keys), dtype=bool)
+        if services is not None:
+            selected &= np.isin(self.service_labels, list(services))
+        if dimensions is not None:
+            selected &= np.isin(self.dimension_labels, list(dimensions))
+        return selected
+
+    def window(self, start, end) -> Tuple[np.ndarray, np.ndarray]:
+        """(days, values) clipped to [start, end)"""
+        lo = max(int((to_day(start) - self.start).astype(int)), 0)
+        hi = max(min(int((to_day(end) - self.start).astype(int)), self.values.shape[1]), lo)
+        return self.days[lo:hi], self.values[:, lo:hi]
+
+    def group(self, by: str, selected: Optional[np.ndarray] = None) -> Tuple[List[str], np.ndarray]:
+        """Sum rows by 'service' or 'dimension'; returns labels and a labels x days matrix"""
+        labels = self.service_labels if by == 'service' else self.dimension_labels
+        if selected is None:
+            selected = np.ones(len(self.keys), dtype=bool)
+        if not selected.any():
+            return [], np.zeros((0, self.values.shape[1]))
+        names, inverse = np.unique(labels[selected].astype(str), return_inverse=True)
+        grouped = np.zeros((len(names), self.values.shape[1]))
+        np.add.at(grouped, inverse, self.values[selected])
+        return names.tolist(), grouped
+
+
+def monthly(days: np.ndarray, series: np.ndarray, start, end) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Roll a daily series up to calendar months clipped to [start, end)
+
+    Returns each month's first day, end day (exclusive) and total.
+    """
+    months, inverse = np.unique(days.astype('datetime64[M]'), return_inverse=True)
+    totals = np.bincount(inverse, weights=series, minlength=len(months))
+    firsts = np.maximum(months.astype('datetime64[D]'), to_day(start))
+    lasts = np.minimum((months + 1).astype('datetime64[D]'), to_day(end))
+    return firsts, lasts, totals
+
+
+def moving_average(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Trailing moving average of each row; the first window - 1 days are dropped"""
+    if matrix.shape[1] < window:
+        return np.zeros((matrix.shape[0], 0))
+    cumulative = np.cumsum(np.pad(matrix, ((0, 0), (1, 0))), axis=1)
+    return (cumulative[:, window:] - cumulative[:, :-window]) / window
+
+
+def compare(matrix: np.ndarray, window: int) -> Dict[str, np.ndarray]:
+    """Totals of the last window days against the window before, per row"""
+    current = matrix[:, -window:].sum(axis=1)
+    previous = matrix[:, -2 * window:-window].sum(axis=1) if matrix.shape[1] > window else np.zeros(matrix.shape[0])
+    delta = current - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(previous > 0, delta / np.where(previous > 0, previous, 1) * 100, np.nan)
+    return {'current': current, 'previous': previous, 'delta': delta, 'pct': pct}
+
+
+def top_movers(delta: np.ndarray, n: int) -> np.ndarray:
+    """Row indices of the n largest absolute changes, largest first"""
+    order = np.argsort(-np.abs(delta), kind='stable')
+    return order[:n]
+
+
+class CostWarehouse:
+    """Columnar cost cubes keyed by caller scope and grouping dimension
+
+    Cubes are topped up rather than replaced: a refresh only asks Cost
+    Explorer for the days after the last fetch plus a short restatement
+    window, and days before the history window are dropped.
+    """
+
+    def __init__(self, ttl: int):
+        """Initialize the warehouse with a TTL"""
+        self.ttl = ttl
+        self._cubes: Dict[Tuple[str, str], CostCube] = {}
+        self._fetched: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def cube(self, scope: str, dimension: str) -> Optional[CostCube]:
+        with self._lock:
+            return self._cubes.get((scope, dimension))
+
+    def is_fresh(self, scope: str, dimension: str, today: str) -> bool:
+        """True when the cube was fetched today and within the TTL"""
+        with self._lock:
+            fetched = self._fetched.get((scope, dimension))
+        return bool(fetched) and fetched[1] == today and time.monotonic() - fetched[0] < self.ttl
+
+    def last_day(self, scope: str, dimension: str) -> Optional[str]:
+        """Last day held for a cube, or None when nothing is cached"""
+        cube = self.cube(scope, dimension)
+        if cube is None or not cube.values.shape[1]:
+            return None
+        return str(cube.end - 1)
+
+    def merge(self, scope: str, dimension: str, newer: CostCube, history_start: str, fetched_on: str):
+        """Overlay freshly fetched days onto a cube"""
+        with self._lock:
+            current = self._cubes.get((scope, dimension))
+            self._cubes[(scope, dimension)] = current.merge(newer, history_start) if current is not None else newer
+            self._fetched[(scope, dimension)] = (time.monotonic(), fetched_on)
+
+    def invalidate(self, scope: Optional[str] = None):
+        """Drop every cube of one scope, or everything when no scope is given"""
+        with self._lock:
+            for key in [k for k in self._cubes if scope is None or k[0] == scope]:
+                self._cubes.pop(key, None)
+                self._fetched.pop(key, None)
@@ -0,0 +1,178 @@
+import os
+import json
+import asyncio
+import logging
+import datetime
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Custodian runs executing at once; further jobs wait in the queued state
+CUSTODIAN_MAX_CONCURRENT_RUNS = int(os.getenv("CUSTODIAN_MAX_CONCURRENT_RUNS", "2"))
+
+# Finished jobs kept in memory; older ones are still read back from their job.json
+CUSTODIAN_JOB_HISTORY = int(os.getenv("CUSTODIAN_JOB_HISTORY", "500"))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+JOB_FILE = 'job.json'
+RESULT_FILE = 'result.json'
+
+_run_slots: Optional[asyncio.Semaphore] = None
+
+
+def _slots() -> asyncio.Semaphore:
+    # Created on first use so it binds to the serving event loop
+    global _run_slots
+    if _run_slots is None:
+        _run_slots = asyncio.Semaphore(CUSTODIAN_MAX_CONCURRENT_RUNS)
+    return _run_slots
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _write_json(path: str, content: Any):
+    # Written to a sibling file and renamed so pollers never read a partial file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(content, f, indent=2, default=str)
+    os.replace(temp_path, path)
+
+
+class CustodianJobs:
+    """Registry of background custodian runs and their lifecycle
+
+    A submitted job is recorded as queued and returned at once; its runner
+    executes in an event-loop task once one of CUSTODIAN_MAX_CONCURRENT_RUNS
+    slots is free. Each transition (queued, running, succeeded, failed) is
+    timestamped and written to outputs/{job_id}/job.json, and the runner's
+    result to outputs/{job_id}/result.json, so status and results remain
+    readable after the job leaves memory or the server restarts. Credentials
+    live only in the runner's closure and are never written out.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None):
+        """Initialize the registry over the custodian output directory"""
+        self.output_dir = output_dir or os.path.join(os.getcwd(), "outputs")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.output_dir, job_id)
+
+    def _save(self, job: Dict[str, Any]):
+        _write_json(os.path.join(self._job_dir(job['job_id']), JOB_FILE), job)
+
+    def _transition(self, job_id: str, status: str, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields, status=status)
+            if status == RUNNING:
+                job['started_at'] = _now()
+            elif status in FINISHED_STATES:
+                job['finished_at'] = _now()
+            snapshot = dict(job)
+        self._save(snapshot)
+
+    def submit(self, job_id: str, runner: Callable[[], Awaitable[Dict[str, Any]]], **fields) -> Dict[str, Any]:
+        """Queue runner as job_id and return the job record without waiting
+
+        runner returns the job's result dict; a truthy 'success' marks the
+        job succeeded, anything else (or an exception) failed. Extra fields
+        are stored on the record (policy_id, dryrun, ...).
+        """
+        os.makedirs(self._job_dir(job_id), exist_ok=True)
+        job = {
+            'job_id': job_id,
+            **fields,
+            'status': QUEUED,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'message': None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            snapshot = dict(job)
+        self._save(snapshot)
+
+        task = asyncio.get_running_loop().create_task(self._run(job_id, runner))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return snapshot
+
+    async def _run(self, job_id: str, runner: Callable[[], Awaitable[Dict[str, Any]]]):
+        try:
+            async with _slots():
+                self._transition(job_id, RUNNING)
+                try:
+                    result = await runner()
+                except Exception as e:
+                    logger.error(f"Custodian job {job_id} failed: {str(e)}")
+                    result = {'success': False, 'message': f"Error executing policy: {str(e)}", 'errors': [str(e)]}
+        except asyncio.CancelledError:
+            self._transition(job_id, FAILED, message="Job was cancelled")
+            raise
+
+        await asyncio.to_thread(_write_json, os.path.join(self._job_dir(job_id), RESULT_FILE), result)
+        status = SUCCEEDED if result.get('success') else FAILED
+        self._transition(job_id, status, message=result.get('message'))
+        self._trim()
+
+    def _trim(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINISHED_STATES]
+            for job_id in finished[:max(0, len(finished) - CUSTODIAN_JOB_HISTORY)]:
+                del self._jobs[job_id]
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current record of a job, or None when it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        job_file = os.path.join(self._job_dir(os.path.basename(job_id)), JOB_FILE)
+        if not os.path.exists(job_file):
+            return None
+        with open(job_file, 'r') as f:
+            job = json.load(f)
+        if job.get('status') not in FINISHED_STATES:
+            # Recorded as pending by a process that is no longer running it
+            job.update(status=FAILED, message="Job was interrupted by a server restart")
+        return job
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Result of a finished job, or None when it has none (yet)"""
+        result_file = os.path.join(self._job_dir(os.path.basename(job_id)), RESULT_FILE)
+        if not os.path.exists(result_file):
+            return None
+        with open(result_file, 'r') as f:
+            return json.load(f)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of in-memory jobs per status"""
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+        return counts
+
+    async def shutdown(self):
+        """Cancel pending and running jobs; their subprocesses are killed"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Process-wide registry of custodian jobs
+custodian_jobs = CustodianJobs()
@@ -3,17 +3,24 @@ import json
 import yaml
 import uuid
 import logging
+import time
+import asyncio
 import tempfile
-import subprocess
 import shutil
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from app.schemas.aws import AWSCredentials
-from app.schemas.policies import PolicyResult, Policy
+from app.schemas.policies import PolicyBatchResult, PolicyResult, Policy
+from app.services.c7n_engine import C7N_CACHE_PERIOD, EngineUnavailable, c7n_engine
+from app.services.custodian_jobs import custodian_jobs
 from app.services.policy_service import PolicyService
+from app.services.session_service import get_caller_identity
 
 logger = logging.getLogger(__name__)
 
+# Seconds a custodian run may take before its process is killed and the job fails
+CUSTODIAN_RUN_TIMEOUT = int(os.getenv("CUSTODIAN_RUN_TIMEOUT", "3600"))
+
 class CustodianService:
     """Service for executing Cloud Custodian policies"""
     
@@ -25,8 +32,27 @@ class CustodianService:
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
         
+    async def submit_policy(self, policy_id: str, credentials: AWSCredentials, dryrun: bool = False) -> Optional[Dict[str, Any]]:
+        """Queue a Cloud Custodian policy run and return its job record, or None if the policy does not exist
+        
+        The run happens in the background; poll custodian_jobs.status(job_id)
+        and read custodian_jobs.result(job_id) once it has finished.
+        """
+        policy = await self.policy_service.get_policy(policy_id)
+        if not policy:
+            return None
+            
+        # Generate a unique job ID
+        job_id = f"{policy_id}_{uuid.uuid4().hex}"
+        
+        async def runner():
+            result = await self.execute_policy(job_id, policy, credentials, dryrun)
+            return result.model_dump()
+            
+        return custodian_jobs.submit(job_id, runner, policy_id=policy_id, dryrun=dryrun)
+        
     async def run_policy(self, policy_id: str, credentials: AWSCredentials, dryrun: bool = False) -> PolicyResult:
-        """Run a Cloud Custodian policy with given AWS credentials"""
+        """Run a Cloud Custodian policy with given AWS credentials and wait for its result"""
         # Get the policy
         policy = await self.policy_service.get_policy(policy_id)
         if not policy:
@@ -39,72 +65,200 @@ class CustodianService:
                 errors=["Policy not found"]
             )
             
-        # Generate a unique job ID
-        job_id = f"{policy_id}_{uuid.uuid4().hex}"
+        return await self.execute_policy(f"{policy_id}_{uuid.uuid4().hex}", policy, credentials, dryrun)
+        
+    async def select_policies(self, policy_ids: Optional[List[str]] = None, category: Optional[str] = None) -> List[Policy]:
+        """Policies for a batch: the given IDs, every policy in a category, or every policy
+        
+        Raises ValueError when an ID is unknown or nothing is selected.
+        """
+        policies = await self.policy_service.get_all_policies()
+        if policy_ids:
+            by_id = {policy.id: policy for policy in policies}
+            missing = [policy_id for policy_id in policy_ids if policy_id not in by_id]
+            if missing:
+                raise ValueError(f"Policies not found: {', '.join(missing)}")
+            policies = [by_id[policy_id] for policy_id in dict.fromkeys(policy_ids)]
+        elif category:
+            policies = [policy for policy in policies if policy.category == category]
+        if not policies:
+            raise ValueError(f"No policies found in category {category}" if category else "No policies found")
+        return policies
+        
+    @staticmethod
+    def merge_policies(policies: List[Policy]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """One policy file holding every given policy, and the policy ID behind each c7n policy name
+        
+        Policies are ordered by resource type so policies that share queries
+        run back to back. c7n rejects duplicate names in one run, so a name
+        already taken is prefixed with its policy's category.
+        """
+        merged, names = [], {}
+        for policy in sorted(policies, key=lambda policy: policy.resource_type):
+            for data in yaml.safe_load(policy.content)['policies']:
+                name = data['name']
+                if name in names:
+                    name = base = f"{policy.category}-{data['name']}"
+                    suffix = 2
+                    while name in names:
+                        name = f"{base}-{suffix}"
+                        suffix += 1
+                names[name] = policy.id
+                merged.append({**data, 'name': name})
+        return {'policies': merged}, names
+        
+    async def submit_batch(self, credentials: AWSCredentials, dryrun: bool = False,
+                           policy_ids: Optional[List[str]] = None, category: Optional[str] = None) -> Dict[str, Any]:
+        """Queue one job that runs several policies in a single custodian execution
+        
+        Raises ValueError when the selection is empty or names unknown policies.
+        """
+        policies = await self.select_policies(policy_ids, category)
+        job_id = f"batch_{uuid.uuid4().hex}"
+        
+        async def runner():
+            result = await self.execute_batch(job_id, policies, credentials, dryrun)
+            return result.model_dump()
+            
+        return custodian_jobs.submit(
+            job_id, runner, policy_id='batch', policy_ids=[policy.id for policy in policies], dryrun=dryrun
+        )
+        
+    async def execute_batch(self, job_id: str, policies: List[Policy], credentials: AWSCredentials, dryrun: bool = False) -> PolicyBatchResult:
+        """Execute several policies in one run, writing each one's outputs under outputs/{job_id}/{name}
+        
+        c7n caches resource queries for the length of the run, so policies
+        on the same resource type describe those resources once between them.
+        """
         job_output_dir = os.path.join(self.output_dir, job_id)
         os.makedirs(job_output_dir, exist_ok=True)
-        
-        # Create a temporary policy file
-        with tempfile.NamedTemporaryFile(suffix='.yml', delete=False) as temp_file:
-            temp_file.write(policy.content.encode())
-            policy_file = temp_file.name
+        policy_data, names = self.merge_policies(policies)
+        resource_types: Dict[str, List[str]] = {}
+        for policy in policies:
+            resource_types.setdefault(policy.resource_type, []).append(policy.id)
             
         try:
-            # Prepare the environment variables for AWS credentials
-            env = os.environ.copy()
-            env['AWS_ACCESS_KEY_ID'] = credentials.access_key
-            env['AWS_SECRET_ACCESS_KEY'] = credentials.secret_key
-            env['AWS_DEFAULT_REGION'] = credentials.region
+            outcome = None
+            if c7n_engine.available():
+                try:
+                    outcome = await self._run_engine(policy_data, credentials, job_output_dir, dryrun)
+                except EngineUnavailable as e:
+                    logger.warning(f"c7n engine unavailable, running the custodian CLI instead: {str(e)}")
+            if outcome is None:
+                outcome = await self._run_cli(yaml.dump(policy_data), credentials, job_output_dir, dryrun)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error executing policy batch: {str(e)}")
+            return PolicyBatchResult(
+                success=False,
+                message=f"Error executing policies: {str(e)}",
+                policies=[
+                    PolicyResult(policy_id=policy.id, success=False, message=str(e), resources_count=0, resources=[], errors=[str(e)])
+                    for policy in policies
+                ],
+                resource_types=resource_types
+            )
             
-            if credentials.session_token:
-                env['AWS_SESSION_TOKEN'] = credentials.session_token
-                
-            # Build the command
-            cmd = ['custodian', 'run']
+        results = await asyncio.to_thread(self._batch_results, job_output_dir, names, outcome)
+        succeeded = sum(1 for result in results if result.success)
+        
+        metadata = {
+            'policy_id': 'batch',
+            'policy_ids': [policy.id for policy in policies],
+            'timestamp': datetime.now().isoformat(),
+            'dryrun': dryrun,
+            'resource_count': sum(result.resources_count or 0 for result in results),
+            'policies': {name: {'policy_id': policy_id, 'resource_count': result.resources_count}
+                         for (name, policy_id), result in zip(names.items(), results)},
+            'resource_types': resource_types,
+            'command_output': outcome['output'],
+            'command_error': outcome['error'],
+            'command': outcome['command'],
+            **outcome['engine']
+        }
+        with open(os.path.join(job_output_dir, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2)
             
-            if dryrun:
-                cmd.append('--dryrun')
+        return PolicyBatchResult(
+            success=succeeded == len(results),
+            message=f"Ran {len(results)} policies over {len(resource_types)} resource types: {succeeded} succeeded, {len(results) - succeeded} failed.",
+            policies=results,
+            resource_types=resource_types
+        )
+        
+    @staticmethod
+    def _batch_results(job_output_dir: str, names: Dict[str, str], outcome: Dict[str, Any]) -> List[PolicyResult]:
+        """Per-policy results of a batch run from its output directories"""
+        results = []
+        for name, policy_id in names.items():
+            resources_file = os.path.join(job_output_dir, name, 'resources.json')
+            if 'policies' in outcome:
+                # The engine reports each policy's outcome
+                reported = outcome['policies'].get(name, {'success': False, 'error': outcome['error']})
+                error = None if reported['success'] else reported['error']
+            else:
+                # The CLI only has an exit status; a policy that ran wrote its resources
+                error = None if os.path.exists(resources_file) else (outcome['error'] or "Policy produced no output")
+                
+            if error is not None:
+                results.append(PolicyResult(
+                    policy_id=policy_id, success=False, message=f"Error running policy: {error}",
+                    resources_count=0, resources=[], errors=[error]
+                ))
+                continue
+                
+            resources = []
+            if os.path.exists(resources_file):
+                with open(resources_file, 'r') as f:
+                    resources = json.load(f)
+            results.append(PolicyResult(
+                policy_id=policy_id,
+                success=True,
+                message=f"Policy executed successfully. Found {len(resources)} resources.",
+                resources_count=len(resources),
+                resources=resources[:100],  # Limit to first 100 resources for API response
+                errors=None
+            ))
+        return results
+        
+    async def execute_policy(self, job_id: str, policy: Policy, credentials: AWSCredentials, dryrun: bool = False) -> PolicyResult:
+        """Execute a policy, writing its outputs under outputs/{job_id}
+        
+        Runs on a warm c7n worker when the engine is available, otherwise
+        (or when no worker can start) with the custodian CLI as an asyncio
+        subprocess. Either way the event loop keeps serving other requests
+        for the length of the run.
+        """
+        policy_id = policy.id
+        job_output_dir = os.path.join(self.output_dir, job_id)
+        os.makedirs(job_output_dir, exist_ok=True)
+        
+        try:
+            outcome = None
+            if c7n_engine.available():
+                try:
+                    outcome = await self._run_engine(yaml.safe_load(policy.content), credentials, job_output_dir, dryrun)
+                except EngineUnavailable as e:
+                    logger.warning(f"c7n engine unavailable, running the custodian CLI instead: {str(e)}")
+            if outcome is None:
+                outcome = await self._run_cli(policy.content, credentials, job_output_dir, dryrun)
                 
-            cmd.extend(['-s', job_output_dir, policy_file])
-            
-            # Execute the command
-            logger.info(f"Running custodian command: {' '.join(cmd)}")
-            result = subprocess.run(
-                cmd,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
-            
             # Check for errors
-            if result.returncode != 0:
-                logger.error(f"Error running custodian: {result.stderr}")
+            if not outcome['success']:
+                logger.error(f"Error running custodian: {outcome['error']}")
                 return PolicyResult(
                     policy_id=policy_id,
                     success=False,
-                    message=f"Error running policy: {result.stderr}",
+                    message=f"Error running policy: {outcome['error']}",
                     resources_count=0,
                     resources=[],
-                    errors=[result.stderr]
+                    errors=[outcome['error']]
                 )
                 
             # Parse the output to get resources
-            resources_file = None
-            for root, _, files in os.walk(job_output_dir):
-                for file in files:
-                    if file.endswith('resources.json'):
-                        resources_file = os.path.join(root, file)
-                        break
-                        
-            resources = []
-            resources_count = 0
-            
-            if resources_file and os.path.exists(resources_file):
-                with open(resources_file, 'r') as f:
-                    resources = json.load(f)
-                    resources_count = len(resources)
+            resources = await asyncio.to_thread(self._read_resources, job_output_dir)
+            resources_count = len(resources)
             
             # Create a metadata file
             metadata = {
@@ -113,9 +267,10 @@ class CustodianService:
                 'timestamp': datetime.now().isoformat(),
                 'dryrun': dryrun,
                 'resource_count': resources_count,
-                'command_output': result.stdout,
-                'command_error': result.stderr,
-                'command': ' '.join(cmd)
+                'command_output': outcome['output'],
+                'command_error': outcome['error'],
+                'command': outcome['command'],
+                **outcome['engine']
             }
             
             with open(os.path.join(job_output_dir, 'metadata.json'), 'w') as f:
@@ -130,6 +285,9 @@ class CustodianService:
                 errors=None
             )
             
+        except asyncio.CancelledError:
+            raise
+            
         except Exception as e:
             logger.error(f"Error executing policy: {str(e)}")
             return PolicyResult(
@@ -141,11 +299,122 @@ class CustodianService:
                 errors=[str(e)]
             )
             
+    async def _run_engine(self, policy_data: Dict[str, Any], credentials: AWSCredentials, job_output_dir: str, dryrun: bool) -> Dict[str, Any]:
+        """Run a policy file's policies on a warm c7n worker"""
+        # c7n's CLI looks the account up with STS on every run; the identity cache usually has it
+        identity = await asyncio.to_thread(get_caller_identity, credentials)
+        request = {
+            'policies': policy_data,
+            'credentials': {
+                'access_key': credentials.access_key,
+                'secret_key': credentials.secret_key,
+                'session_token': credentials.session_token,
+            },
+            'region': credentials.region,
+            'account_id': identity['account'],
+            'output_dir': job_output_dir,
+            'dryrun': dryrun,
+            'cache_period': C7N_CACHE_PERIOD,
+        }
+        logger.info(f"Running {len(policy_data['policies'])} policies on the c7n engine")
+        response = await asyncio.to_thread(c7n_engine.run, request, CUSTODIAN_RUN_TIMEOUT)
+        
+        errors = [f"{name}: {result['error']}" for name, result in response['policies'].items() if not result['success']]
+        if response.get('error'):
+            errors.insert(0, response['error'])
+        return {
+            'success': response['success'],
+            'policies': response['policies'],
+            'output': response['log'],
+            'error': '\n'.join(errors),
+            'command': f"c7n engine (worker {response['worker_pid']})",
+            'engine': {
+                'engine': 'pool',
+                'worker_pid': response['worker_pid'],
+                'run_seconds': round(response['seconds'], 3),
+                'startup_saved_seconds': round(response['startup_saved_seconds'], 3),
+            },
+        }
+        
+    async def _run_cli(self, content: str, credentials: AWSCredentials, job_output_dir: str, dryrun: bool) -> Dict[str, Any]:
+        """Run a policy file with the custodian CLI as an asyncio subprocess"""
+        # Create a temporary policy file
+        with tempfile.NamedTemporaryFile(suffix='.yml', delete=False) as temp_file:
+            temp_file.write(content.encode())
+            policy_file = temp_file.name
+            
+        try:
+            # Prepare the environment variables for AWS credentials
+            env = os.environ.copy()
+            env['AWS_ACCESS_KEY_ID'] = credentials.access_key
+            env['AWS_SECRET_ACCESS_KEY'] = credentials.secret_key
+            env['AWS_DEFAULT_REGION'] = credentials.region
+            
+            if credentials.session_token:
+                env['AWS_SESSION_TOKEN'] = credentials.session_token
+                
+            # Build the command
+            cmd = ['custodian', 'run']
+            
+            if dryrun:
+                cmd.append('--dryrun')
+                
+            # Queries are shared between the file's policies, but not with other runs
+            cmd.extend(['--cache', 'memory', '--cache-period', str(C7N_CACHE_PERIOD)])
+            cmd.extend(['-s', job_output_dir, policy_file])
+            
+            # Execute the command
+            logger.info(f"Running custodian command: {' '.join(cmd)}")
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                env=env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), CUSTODIAN_RUN_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                process.kill()
+                await process.wait()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise RuntimeError(f"custodian run exceeded {CUSTODIAN_RUN_TIMEOUT}s and was killed")
+                
+            return {
+                'success': process.returncode == 0,
+                'output': stdout.decode(errors='replace'),
+                'error': stderr.decode(errors='replace'),
+                'command': ' '.join(cmd),
+                'engine': {
+                    'engine': 'subprocess',
+                    'run_seconds': round(time.perf_counter() - started, 3),
+                },
+            }
+            
         finally:
             # Clean up the temporary file
             if os.path.exists(policy_file):
                 os.unlink(policy_file)
                 
+    @staticmethod
+    def _read_resources(job_output_dir: str) -> List[Dict[str, Any]]:
+        """Resources recorded in a job's first resources.json, or an empty list"""
+        for root, _, files in os.walk(job_output_dir):
+            for file in files:
+                if file.endswith('resources.json'):
+                    with open(os.path.join(root, file), 'r') as f:
+                        return json.load(f)
+        return []
+        
+    def output_revision(self, job_id: str) -> int:
+        """Modification time (ns) of a job's metadata, or 0 while it has none"""
+        metadata_file = os.path.join(self.output_dir, job_id, 'metadata.json')
+        try:
+            return os.stat(metadata_file).st_mtime_ns
+        except OSError:
+            return 0
+            
     async def get_output(self, job_id: str) -> Dict[str, Any]:
         """Get the output of a previously executed policy"""
         job_output_dir = os.path.join(self.output_dir, job_id)
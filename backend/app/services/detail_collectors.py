@@ -0,0 +1,197 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.inventory_records import Record, tags_to_dict
+from app.services.summary_engine import region_failure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class EC2InstanceDetail(Record):
+    id: str
+    instance_type: str
+    state: str
+    launch_time: Optional[str]
+    public_ip: Optional[str]
+    private_ip: Optional[str]
+    vpc_id: Optional[str]
+    subnet_id: Optional[str]
+    tags: Dict[str, str]
+    security_groups: List[str]
+    iam_profile: Optional[str]
+    platform: Optional[str]
+    architecture: Optional[str]
+    root_device_name: Optional[str]
+    root_device_type: Optional[str]
+    region: str
+
+
+@dataclass(slots=True)
+class RDSInstanceDetail(Record):
+    id: str
+    engine: str
+    engine_version: str
+    status: str
+    endpoint: Optional[str]
+    port: Optional[int]
+    storage: Dict[str, Any]
+    instance_type: Optional[str]
+    multi_az: bool
+    publicly_accessible: bool
+    vpc_id: Optional[str]
+    region: str
+
+
+@dataclass(slots=True)
+class LambdaFunctionDetail(Record):
+    name: str
+    runtime: Optional[str]
+    memory: int
+    timeout: int
+    last_modified: str
+    handler: Optional[str]
+    version: str
+    role: str
+    code_size: int
+    description: str
+    region: str
+
+
+def ec2_instance_detail(instance: Dict[str, Any], region: str) -> EC2InstanceDetail:
+    """Normalize a describe_instances instance for the details view"""
+    return EC2InstanceDetail(
+        id=instance['InstanceId'],
+        instance_type=instance['InstanceType'],
+        state=instance['State']['Name'],
+        launch_time=instance['LaunchTime'].isoformat() if instance.get('LaunchTime') else None,
+        public_ip=instance.get('PublicIpAddress'),
+        private_ip=instance.get('PrivateIpAddress'),
+        vpc_id=instance.get('VpcId'),
+        subnet_id=instance.get('SubnetId'),
+        tags=tags_to_dict(instance.get('Tags')),
+        security_groups=[sg['GroupName'] for sg in instance.get('SecurityGroups', [])],
+        iam_profile=instance['IamInstanceProfile']['Arn'] if instance.get('IamInstanceProfile') else None,
+        platform=instance.get('Platform'),
+        architecture=instance.get('Architecture'),
+        root_device_name=instance.get('RootDeviceName'),
+        root_device_type=instance.get('RootDeviceType'),
+        region=region
+    )
+
+
+def vpc_detail(vpc: Dict[str, Any], region: str) -> Dict[str, Any]:
+    """Normalize a describe_vpcs VPC"""
+    return {
+        'id': vpc['VpcId'],
+        'cidr_block': vpc.get('CidrBlock'),
+        'is_default': vpc.get('IsDefault', False),
+        'tags': tags_to_dict(vpc.get('Tags')),
+        'region': region
+    }
+
+
+def security_group_detail(sg: Dict[str, Any], region: str) -> Dict[str, Any]:
+    """Normalize a describe_security_groups group"""
+    return {
+        'id': sg['GroupId'],
+        'name': sg.get('GroupName'),
+        'description': sg.get('Description'),
+        'vpc_id': sg.get('VpcId'),
+        'inbound_rules': [
+            {
+                'protocol': rule.get('IpProtocol'),
+                'from_port': rule.get('FromPort'),
+                'to_port': rule.get('ToPort'),
+                'ip_ranges': [r.get('CidrIp') for r in rule.get('IpRanges', [])]
+            }
+            for rule in sg.get('IpPermissions', [])
+        ],
+        'tags': tags_to_dict(sg.get('Tags')),
+        'region': region
+    }
+
+
+def rds_instance_detail(instance: Dict[str, Any], region: str) -> RDSInstanceDetail:
+    """Normalize a describe_db_instances instance for the details view"""
+    return RDSInstanceDetail(
+        id=instance['DBInstanceIdentifier'],
+        engine=instance['Engine'],
+        engine_version=instance['EngineVersion'],
+        status=instance['DBInstanceStatus'],
+        endpoint=instance.get('Endpoint', {}).get('Address'),
+        port=instance.get('Endpoint', {}).get('Port'),
+        storage={
+            'type': instance.get('StorageType'),
+            'size': instance.get('AllocatedStorage'),
+            'encrypted': instance.get('StorageEncrypted', False)
+        },
+        instance_type=instance.get('DBInstanceClass'),
+        multi_az=instance.get('MultiAZ', False),
+        publicly_accessible=instance.get('PubliclyAccessible', False),
+        vpc_id=instance.get('DBSubnetGroup', {}).get('VpcId'),
+        region=region
+    )
+
+
+def lambda_function_detail(func: Dict[str, Any], region: str) -> LambdaFunctionDetail:
+    """Normalize a list_functions function for the details view"""
+    return LambdaFunctionDetail(
+        name=func['FunctionName'],
+        runtime=func.get('Runtime'),
+        memory=func['MemorySize'],
+        timeout=func['Timeout'],
+        last_modified=func['LastModified'],
+        handler=func.get('Handler'),
+        version=func['Version'],
+        role=func['Role'],
+        code_size=func['CodeSize'],
+        description=func.get('Description', ''),
+        region=region
+    )
+
+
+def _reservation_instances(page: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [i for r in page.get('Reservations', []) for i in r.get('Instances', [])]
+
+
+# service -> [(collection, client service, paginated operation, page items, normalizer, id field)]
+DETAIL_COLLECTIONS: Dict[str, List[Tuple[str, str, str, Callable, Callable, str]]] = {
+    'ec2': [
+        ('instances', 'ec2', 'describe_instances', _reservation_instances, ec2_instance_detail, 'InstanceId'),
+        ('vpcs', 'ec2', 'describe_vpcs', lambda page: page.get('Vpcs', []), vpc_detail, 'VpcId'),
+        ('security_groups', 'ec2', 'describe_security_groups', lambda page: page.get('SecurityGroups', []), security_group_detail, 'GroupId'),
+    ],
+    'rds': [
+        ('instances', 'rds', 'describe_db_instances', lambda page: page.get('DBInstances', []), rds_instance_detail, 'DBInstanceIdentifier'),
+    ],
+    'lambda': [
+        ('functions', 'lambda', 'list_functions', lambda page: page.get('Functions', []), lambda_function_detail, 'FunctionName'),
+    ],
+}
+
+
+def collect_region(client_factory: Callable[[str, str], Any], service: str, collection: str, region: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, str]]]:
+    """Fully paginate one detail collection in one region
+
+    Returns the normalized records and the region's failure (if any).
+    Records that fail to normalize are kept as {'id', 'error'} entries.
+    """
+    _, client_service, operation, items, normalize, id_field = next(
+        spec for spec in DETAIL_COLLECTIONS[service] if spec[0] == collection
+    )
+    records = []
+    try:
+        paginator = client_factory(client_service, region).get_paginator(operation)
+        for page in paginator.paginate():
+            for item in items(page):
+                try:
+                    records.append(normalize(item, region))
+                except Exception as e:
+                    logger.error(f"Error getting details for {service} {collection} {item.get(id_field)}: {str(e)}")
+                    key = 'name' if id_field == 'FunctionName' else 'id'
+                    records.append({key: item.get(id_field), 'region': region, 'error': str(e)})
+    except Exception as e:
+        return records, region_failure(region, e)
+    return records, None
@@ -0,0 +1,229 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+import contextvars
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Threads dedicated to regional AWS fan-out (separate from the default executor)
+FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", "32"))
+
+# Maximum in-flight calls per AWS service across all regions
+FANOUT_PER_SERVICE_LIMIT = int(os.getenv("FANOUT_PER_SERVICE_LIMIT", "16"))
+
+# Maximum in-flight calls per service within a single region
+FANOUT_PER_REGION_LIMIT = int(os.getenv("FANOUT_PER_REGION_LIMIT", "4"))
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    """Parse per-service overrides such as "ec2=16,rds=8" """
+    limits = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        service, limit = item.split("=", 1)
+        try:
+            limits[service.strip()] = int(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid fan-out limit '{item}'")
+    return limits
+
+
+# Optional per-service overrides of FANOUT_PER_SERVICE_LIMIT
+FANOUT_SERVICE_LIMITS = _parse_limits(os.getenv("FANOUT_SERVICE_LIMITS", ""))
+
+
+class _Job:
+    """A queued call waiting for a worker slot"""
+    __slots__ = ("service", "region", "fn", "args", "future", "context", "enqueued_at")
+
+    def __init__(self, service: str, region: str, fn: Callable, args: Tuple, future: asyncio.Future):
+        self.service = service
+        self.region = region
+        self.fn = fn
+        self.args = args
+        self.future = future
+        # Context of the submitting request (e.g. its retry budget), restored on the worker
+        self.context = contextvars.copy_context()
+        self.enqueued_at = time.monotonic()
+
+
+class FanoutLane:
+    """Handle used by one request to submit its regional calls
+
+    Each lane is queued separately and the executor serves lanes round-robin,
+    so a request fanning out to every region cannot starve another request.
+    """
+
+    def __init__(self, executor: "FanoutExecutor", lane_id: int):
+        self._executor = executor
+        self._lane_id = lane_id
+
+    async def run(self, service: str, region: str, fn: Callable, *args) -> Any:
+        """Run a blocking call on the fan-out pool under the service/region caps"""
+        return await self._executor._submit(self._lane_id, service, region, fn, args)
+
+
+class FanoutExecutor:
+    """Bounded thread pool for regional AWS fan-out with fair queuing and concurrency caps
+
+    Scheduling state is only touched from the event loop thread; worker
+    threads hand completions back with call_soon_threadsafe.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = FANOUT_MAX_WORKERS,
+        per_service_limit: int = FANOUT_PER_SERVICE_LIMIT,
+        per_region_limit: int = FANOUT_PER_REGION_LIMIT,
+        service_limits: Optional[Dict[str, int]] = None,
+    ):
+        """Initialize the executor with global, per-service and per-region caps"""
+        self.max_workers = max_workers
+        self.per_service_limit = per_service_limit
+        self.per_region_limit = per_region_limit
+        self.service_limits = dict(service_limits if service_limits is not None else FANOUT_SERVICE_LIMITS)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aws-fanout")
+        self._lanes: "OrderedDict[int, Deque[_Job]]" = OrderedDict()
+        self._lane_ids = itertools.count()
+        self._running = 0
+        self._running_by_service: Dict[str, int] = {}
+        self._running_by_region: Dict[Tuple[str, str], int] = {}
+
+        # Saturation metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._queued_jobs = 0
+        self._peak_running = 0
+        self._peak_queued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def lane(self) -> FanoutLane:
+        """Create a lane for one request's fan-out"""
+        return FanoutLane(self, next(self._lane_ids))
+
+    def _service_limit(self, service: str) -> int:
+        return self.service_limits.get(service, self.per_service_limit)
+
+    def _can_start(self, job: _Job) -> bool:
+        """Check the per-service and per-region caps for a job"""
+        if self._running_by_service.get(job.service, 0) >= self._service_limit(job.service):
+            return False
+        return self._running_by_region.get((job.service, job.region), 0) < self.per_region_limit
+
+    async def _submit(self, lane_id: int, service: str, region: str, fn: Callable, args: Tuple) -> Any:
+        loop = asyncio.get_running_loop()
+        job = _Job(service, region, fn, args, loop.create_future())
+        self._lanes.setdefault(lane_id, deque()).append(job)
+        self._submitted += 1
+        self._queued_jobs += 1
+        self._peak_queued = max(self._peak_queued, self._queued_jobs)
+        self._dispatch(loop)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            self._discard(lane_id, job)
+            raise
+
+    def _discard(self, lane_id: int, job: _Job):
+        """Remove a cancelled job that never started"""
+        queue = self._lanes.get(lane_id)
+        if queue and job in queue:
+            queue.remove(job)
+            self._queued_jobs -= 1
+            if not queue:
+                del self._lanes[lane_id]
+
+    def _pop_runnable(self, queue: Deque[_Job]) -> Optional[_Job]:
+        """Pop the first job in a lane whose caps allow it to start"""
+        for job in list(queue):
+            if job.future.done():
+                queue.remove(job)
+                self._queued_jobs -= 1
+                continue
+            if self._can_start(job):
+                queue.remove(job)
+                self._queued_jobs -= 1
+                return job
+        return None
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        """Start queued jobs, serving lanes round-robin, until a cap is hit"""
+        while self._running < self.max_workers and self._lanes:
+            started = False
+            for lane_id in list(self._lanes):
+                queue = self._lanes[lane_id]
+                job = self._pop_runnable(queue)
+                if not queue:
+                    del self._lanes[lane_id]
+                elif job is not None:
+                    # Served lanes go to the back of the line
+                    self._lanes.move_to_end(lane_id)
+                if job is not None:
+                    self._start(job, loop)
+                    started = True
+                    break
+            if not started:
+                break
+
+    def _start(self, job: _Job, loop: asyncio.AbstractEventLoop):
+        wait = time.monotonic() - job.enqueued_at
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._running += 1
+        self._peak_running = max(self._peak_running, self._running)
+        self._running_by_service[job.service] = self._running_by_service.get(job.service, 0) + 1
+        region_key = (job.service, job.region)
+        self._running_by_region[region_key] = self._running_by_region.get(region_key, 0) + 1
+
+        future = self._pool.submit(job.context.run, job.fn, *job.args)
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._finish, job, f, loop))
+
+    def _finish(self, job: _Job, future, loop: asyncio.AbstractEventLoop):
+        self._running -= 1
+        self._running_by_service[job.service] -= 1
+        region_key = (job.service, job.region)
+        self._running_by_region[region_key] -= 1
+        if not self._running_by_region[region_key]:
+            del self._running_by_region[region_key]
+
+        error = future.exception()
+        if error is not None:
+            self._failed += 1
+            if not job.future.done():
+                job.future.set_exception(error)
+        else:
+            self._completed += 1
+            if not job.future.done():
+                job.future.set_result(future.result())
+        self._dispatch(loop)
+
+    def stats(self) -> Dict[str, Any]:
+        """Saturation metrics for monitoring"""
+        started = self._completed + self._failed + self._running
+        return {
+            'max_workers': self.max_workers,
+            'running': self._running,
+            'queued': self._queued_jobs,
+            'active_lanes': len(self._lanes),
+            'utilization': self._running / self.max_workers if self.max_workers else 0,
+            'peak_running': self._peak_running,
+            'peak_queued': self._peak_queued,
+            'submitted': self._submitted,
+            'completed': self._completed,
+            'failed': self._failed,
+            'avg_queue_wait_ms': (self._total_wait / started * 1000) if started else 0,
+            'max_queue_wait_ms': self._max_wait * 1000,
+            'running_by_service': {k: v for k, v in self._running_by_service.items() if v},
+        }
+
+
+# Process-wide executor shared by every AWSService instance
+fanout_executor = FanoutExecutor()
@@ -0,0 +1,154 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds collected IAM details are reused before being fetched again
+IAM_CACHE_TTL = int(os.getenv("IAM_CACHE_TTL", "900"))
+
+# Entity types fetched in bulk; AWS managed policies are referenced by
+# name from each principal instead of being downloaded in full
+AUTHORIZATION_FILTER = ['User', 'Role', 'Group', 'LocalManagedPolicy']
+
+
+def _iso(value) -> Any:
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class IAMCollector:
+    """Collects IAM users, groups, roles and policies in a few bulk pages
+
+    Built on paginated get_account_authorization_details rather than per-user
+    calls. list_users / list_roles are paged once as well, only for the
+    fields (password last used, role description) the bulk call omits.
+    """
+
+    def __init__(self, scope: str, client):
+        """Initialize with a credential scope and an IAM client"""
+        self.scope = scope
+        self.client = client
+
+    def collect(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """Return IAM details for the scope, from cache while younger than IAM_CACHE_TTL"""
+        if not force_refresh:
+            cached = iam_cache.get(self.scope)
+            if cached is not None:
+                return cached
+        details = self._fetch()
+        iam_cache.set(self.scope, details)
+        return details
+
+    def _fetch(self) -> Dict[str, Any]:
+        users, roles, groups, policies = [], [], [], []
+        paginator = self.client.get_paginator('get_account_authorization_details')
+        for page in paginator.paginate(Filter=AUTHORIZATION_FILTER):
+            users.extend(page.get('UserDetailList', []))
+            roles.extend(page.get('RoleDetailList', []))
+            groups.extend(page.get('GroupDetailList', []))
+            policies.extend(page.get('Policies', []))
+
+        password_last_used = {}
+        for page in self.client.get_paginator('list_users').paginate():
+            for user in page.get('Users', []):
+                if user.get('PasswordLastUsed'):
+                    password_last_used[user['UserName']] = user['PasswordLastUsed'].isoformat()
+
+        role_descriptions = {}
+        for page in self.client.get_paginator('list_roles').paginate():
+            for role in page.get('Roles', []):
+                role_descriptions[role['RoleName']] = role.get('Description', '')
+
+        user_details = []
+        for user in users:
+            try:
+                user_details.append({
+                    'name': user['UserName'],
+                    'id': user['UserId'],
+                    'arn': user['Arn'],
+                    'created': _iso(user['CreateDate']),
+                    'password_last_used': password_last_used.get(user['UserName']),
+                    'groups': user.get('GroupList', []),
+                    'policies': [p['PolicyName'] for p in user.get('AttachedManagedPolicies', [])],
+                    'inline_policies': [p['PolicyName'] for p in user.get('UserPolicyList', [])]
+                })
+            except Exception as e:
+                logger.error(f"Error getting details for IAM user {user.get('UserName')}: {str(e)}")
+                user_details.append({'name': user.get('UserName'), 'error': str(e)})
+
+        role_details = []
+        for role in roles:
+            try:
+                role_details.append({
+                    'name': role['RoleName'],
+                    'id': role['RoleId'],
+                    'arn': role['Arn'],
+                    'created': _iso(role['CreateDate']),
+                    'description': role_descriptions.get(role['RoleName'], ''),
+                    'trust_policy': role.get('AssumeRolePolicyDocument', {}),
+                    'policies': [p['PolicyName'] for p in role.get('AttachedManagedPolicies', [])],
+                    'inline_policies': [p['PolicyName'] for p in role.get('RolePolicyList', [])]
+                })
+            except Exception as e:
+                logger.error(f"Error getting details for IAM role {role.get('RoleName')}: {str(e)}")
+                role_details.append({'name': role.get('RoleName'), 'error': str(e)})
+
+        group_details = [{
+            'name': group['GroupName'],
+            'id': group['GroupId'],
+            'arn': group['Arn'],
+            'created': _iso(group['CreateDate']),
+            'policies': [p['PolicyName'] for p in group.get('AttachedManagedPolicies', [])],
+            'inline_policies': [p['PolicyName'] for p in group.get('GroupPolicyList', [])]
+        } for group in groups]
+
+        policy_details = [{
+            'name': policy['PolicyName'],
+            'id': policy['PolicyId'],
+            'arn': policy['Arn'],
+            'attachment_count': policy.get('AttachmentCount', 0),
+            'created': _iso(policy.get('CreateDate')),
+            'updated': _iso(policy.get('UpdateDate'))
+        } for policy in policies]
+
+        return {
+            'users': user_details,
+            'roles': role_details,
+            'groups': group_details,
+            'policies': policy_details
+        }
+
+
+class IAMDetailsCache:
+    """TTL cache of collected IAM details per caller scope (account and caller ARN)"""
+
+    def __init__(self, ttl: int = IAM_CACHE_TTL):
+        """Initialize the cache with a TTL"""
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str):
+        with self._lock:
+            entry = self._entries.get(scope)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, scope: str, details: Dict[str, Any]):
+        with self._lock:
+            self._entries[scope] = (time.monotonic() + self.ttl, details)
+
+    def invalidate(self, scope: str = None):
+        """Drop one scope, or everything when no scope is given"""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(scope, None)
+
+
+# Process-wide IAM details cache
+iam_cache = IAMDetailsCache()
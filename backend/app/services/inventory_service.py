@@ -0,0 +1,255 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.schemas.aws import AWSCredentials
+from app.services.aws_service import AWSService
+from app.services.inventory_store import RESULT_KEYS, inventory_store
+from app.services.resource_query import ResourceQuery
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_intervals(value: str) -> Dict[str, int]:
+    """Parse per-service intervals such as "ec2=120,s3=1800" """
+    intervals = {}
+    for item in value.split(","):
+        if "=" in item:
+            service, seconds = item.split("=", 1)
+            try:
+                intervals[service.strip()] = int(seconds)
+            except ValueError:
+                logger.warning(f"Ignoring invalid refresh interval '{item}'")
+    return intervals
+
+
+# Default maximum snapshot age (seconds) served by the inventory endpoints
+INVENTORY_MAX_AGE = int(os.getenv("INVENTORY_MAX_AGE", "300"))
+
+# Background refresh interval per service (seconds)
+INVENTORY_REFRESH_INTERVALS = {
+    'ec2': 300,
+    'rds': 600,
+    'lambda': 600,
+    's3': 900,
+    **_parse_intervals(os.getenv("INVENTORY_REFRESH_INTERVALS", "")),
+}
+
+# Stop refreshing a caller's inventory after this long without an API request (seconds)
+INVENTORY_REFRESH_IDLE_TIMEOUT = int(os.getenv("INVENTORY_REFRESH_IDLE_TIMEOUT", "3600"))
+
+# Set to "false" to disable the background refresher
+INVENTORY_REFRESH_ENABLED = os.getenv("INVENTORY_REFRESH_ENABLED", "true").lower() == "true"
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp else None
+
+
+def _incomplete(result: Dict[str, Any]) -> bool:
+    # Throttled or failed regions would make a snapshot undercount; a denied
+    # region or a caller failing everywhere would store an empty one
+    failures = result.get('errors', [])
+    return bool(failures) and (
+        result.get('partial')
+        or any(f['category'] == 'denied' for f in failures)
+        or len(failures) >= result.get('regions', len(failures))
+    )
+
+
+class InventoryService:
+    """Serves inventory from the snapshot store, refreshing stale services from AWS
+
+    Snapshots are kept per caller scope, so a principal only reads records
+    fetched with its own permissions.
+    """
+
+    def __init__(self, credentials: AWSCredentials):
+        """Initialize with AWS credentials"""
+        self.credentials = credentials
+        self.aws_service = AWSService(credentials)
+
+    async def resolve(self) -> 'InventoryService':
+        """Resolve the account and caller scopes once, off the event loop; returns the service"""
+        await self.aws_service.resolve()
+        return self
+
+    @property
+    def account_scope(self) -> str:
+        """Scope of the account's cached responses; available once resolved"""
+        return self.aws_service.account_scope
+
+    @property
+    def scope(self) -> str:
+        """Scope of the caller's snapshots; available once resolved"""
+        return self.aws_service.scope
+
+    async def refresh(self, service: str, refresh_regions: bool = False) -> Tuple[List[Dict[str, Any]], float]:
+        """Re-enumerate one service live and replace its snapshot"""
+        await self.resolve()
+        result = await self.aws_service.get_resources(service, refresh_regions=refresh_regions)
+        if 'error' in result:
+            raise ValueError(result['error'])
+        records = result.get(RESULT_KEYS[service], [])
+        if _incomplete(result):
+            logger.warning(f"Not storing incomplete {service} snapshot: {[e['message'] for e in result['errors']]}")
+            return records, time.time()
+        as_of = await asyncio.to_thread(inventory_store.save, self.scope, service, records)
+        # Cached summaries and listings of the account now predate the store
+        response_cache.invalidate(self.account_scope)
+        return records, as_of
+
+    async def _is_fresh(self, service: str, max_age: int) -> bool:
+        as_of = await asyncio.to_thread(inventory_store.snapshot_time, self.scope, service)
+        return as_of is not None and time.time() - as_of <= max_age
+
+    async def get_resources(self, service: str, max_age: int = INVENTORY_MAX_AGE, refresh_regions: bool = False, query: ResourceQuery = None) -> Dict[str, Any]:
+        """Get a service's records, from the store when younger than max_age"""
+        if service not in RESULT_KEYS:
+            return {"error": f"Service {service} not supported"}
+
+        await self.resolve()
+        inventory_refresher.register(self.scope, self.credentials)
+        if query is not None and not query.is_empty():
+            return await self._query_resources(service, max_age, refresh_regions, query)
+
+        if await self._is_fresh(service, max_age):
+            records, as_of = await asyncio.to_thread(inventory_store.load, self.scope, service)
+        else:
+            records, as_of = await self.refresh(service, refresh_regions=refresh_regions)
+        return {RESULT_KEYS[service]: records, 'as_of': _iso(as_of)}
+
+    async def _query_resources(self, service: str, max_age: int, refresh_regions: bool, query: ResourceQuery) -> Dict[str, Any]:
+        """Serve one filtered, sorted page of a service's records
+
+        A fresh store is streamed through the query; otherwise the filters are
+        pushed down to a live AWS call and the full snapshot is refreshed in
+        the background. Cursors are keyset-based, so they stay valid across
+        both paths.
+        """
+        if await self._is_fresh(service, max_age):
+            def _from_store():
+                records = inventory_store.iter_records(self.scope, service, query.regions, query.states)
+                return query.page(records), inventory_store.snapshot_time(self.scope, service)
+
+            (items, next_cursor), as_of = await asyncio.to_thread(_from_store)
+        else:
+            result = await self.aws_service.get_resources(service, refresh_regions=refresh_regions, query=query)
+            if 'error' in result:
+                raise ValueError(result['error'])
+            items, next_cursor = query.page(result.get(RESULT_KEYS[service], []))
+            as_of = time.time()
+            inventory_refresher.schedule(self.scope, self.credentials, [service])
+        return {RESULT_KEYS[service]: items, 'as_of': _iso(as_of), 'next_cursor': next_cursor}
+
+    async def get_summary(self, max_age: int = INVENTORY_MAX_AGE, refresh_regions: bool = False) -> Dict[str, Any]:
+        """Get resource counts from the store, or from the counts-only live path when stale
+
+        A stale store is not re-enumerated inline: the summary only needs
+        counts, so it comes from AWSService.get_resource_summary and the
+        stale record snapshots are refreshed in the background.
+        """
+        await self.resolve()
+        inventory_refresher.register(self.scope, self.credentials)
+        stale = [service for service in RESULT_KEYS if not await self._is_fresh(service, max_age)]
+        if stale:
+            # Copied: the live summary may be shared with coalesced callers
+            summary = dict(await self.aws_service.get_resource_summary(refresh_regions=refresh_regions))
+            inventory_refresher.schedule(self.scope, self.credentials, stale)
+            summary['as_of'] = _iso(time.time())
+            return summary
+
+        summary = await asyncio.to_thread(inventory_store.summary, self.scope)
+        snapshot_times = [await asyncio.to_thread(inventory_store.snapshot_time, self.scope, service) for service in RESULT_KEYS]
+        summary['as_of'] = _iso(min(snapshot_times))
+        return summary
+
+
+class InventoryRefresher:
+    """Background task refreshing stale snapshots for recently active callers
+
+    Registrations are kept per principal, so each one's snapshots are
+    refreshed with its own credentials rather than the latest caller's.
+    Credentials are only held in memory, and only until the principal has
+    been idle for INVENTORY_REFRESH_IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, intervals: Dict[str, int] = None, idle_timeout: int = INVENTORY_REFRESH_IDLE_TIMEOUT, tick: int = 30):
+        """Initialize with per-service refresh intervals"""
+        self.intervals = dict(intervals or INVENTORY_REFRESH_INTERVALS)
+        self.idle_timeout = idle_timeout
+        self.tick = tick
+        self._callers: Dict[str, Tuple[AWSCredentials, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[Tuple[str, Tuple[str, ...]], asyncio.Task] = {}
+
+    def register(self, scope: str, credentials: AWSCredentials):
+        """Mark a principal, by caller scope, as active so its snapshots keep being refreshed"""
+        self._callers[scope] = (credentials, time.monotonic())
+
+    def schedule(self, scope: str, credentials: AWSCredentials, services: List[str]):
+        """Refresh some services for a principal, by caller scope, in the background, right away"""
+        if not INVENTORY_REFRESH_ENABLED:
+            return
+        key = (scope, tuple(services))
+        if key in self._pending:
+            return
+
+        async def _refresh():
+            service = InventoryService(credentials)
+            for name in services:
+                try:
+                    await service.refresh(name)
+                except Exception as e:
+                    logger.warning(f"Background refresh of {name} failed: {str(e)}")
+
+        task = asyncio.get_running_loop().create_task(_refresh())
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def refresh_due(self):
+        """Refresh every service whose snapshot is older than its interval"""
+        now = time.monotonic()
+        for scope, (credentials, last_seen) in list(self._callers.items()):
+            if now - last_seen > self.idle_timeout:
+                del self._callers[scope]
+                continue
+            service = await InventoryService(credentials).resolve()
+            for name, interval in self.intervals.items():
+                if name not in RESULT_KEYS or await service._is_fresh(name, interval):
+                    continue
+                try:
+                    await service.refresh(name)
+                except Exception as e:
+                    logger.warning(f"Background refresh of {name} failed: {str(e)}")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error(f"Inventory refresher error: {str(e)}")
+            await asyncio.sleep(self.tick)
+
+    def start(self):
+        """Start the background refresh loop on the running event loop"""
+        if INVENTORY_REFRESH_ENABLED and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refresh loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Process-wide refresher started with the application
+inventory_refresher = InventoryRefresher()
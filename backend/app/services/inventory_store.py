@@ -0,0 +1,205 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.services.json_encoding import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding normalized inventory snapshots
+INVENTORY_DB_PATH = os.getenv("INVENTORY_DB_PATH", os.path.join(os.getcwd(), "inventory.db"))
+
+# Key under which each service's records appear in API responses
+RESULT_KEYS = {
+    'ec2': 'instances',
+    'rds': 'instances',
+    'lambda': 'functions',
+    's3': 'buckets',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    scope TEXT NOT NULL,
+    service TEXT NOT NULL,
+    region TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    state TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scope, service, region, resource_id)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    scope TEXT NOT NULL,
+    service TEXT NOT NULL,
+    as_of REAL NOT NULL,
+    PRIMARY KEY (scope, service)
+);
+"""
+
+
+def _resource_key(record: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """Extract (region, resource id, state) from a normalized record"""
+    resource_id = record.get('id') or record.get('name') or ''
+    state = record.get('state') or record.get('status')
+    return record.get('region') or '', resource_id, state
+
+
+class InventoryStore:
+    """SQLite store of normalized inventory records per caller scope and service
+
+    Each call opens its own connection, so the store can be used from worker
+    threads; callers on the event loop should go through asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = INVENTORY_DB_PATH):
+        """Initialize the store and create the schema if needed"""
+        self.path = path
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, scope: str, service: str, records: List[Dict[str, Any]], as_of: Optional[float] = None) -> float:
+        """Replace the snapshot of one service for a scope"""
+        as_of = as_of or time.time()
+        rows = []
+        for record in records:
+            region, resource_id, state = _resource_key(record)
+            rows.append((scope, service, region, resource_id, state, dumps(record).decode('utf-8')))
+
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM resources WHERE scope = ? AND service = ?", (scope, service))
+            conn.executemany(
+                "INSERT OR REPLACE INTO resources (scope, service, region, resource_id, state, data) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (scope, service, as_of) VALUES (?, ?, ?)",
+                (scope, service, as_of)
+            )
+        return as_of
+
+    def snapshot_time(self, scope: str, service: str) -> Optional[float]:
+        """When a service was last refreshed for a scope, or None if never"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT as_of FROM snapshots WHERE scope = ? AND service = ?", (scope, service)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load(self, scope: str, service: str) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """Load the stored records and snapshot time for one service"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM resources WHERE scope = ? AND service = ? ORDER BY region, resource_id",
+                (scope, service)
+            ).fetchall()
+        return [loads(row[0]) for row in rows], self.snapshot_time(scope, service)
+
+    def iter_records(self, scope: str, service: str, regions: Optional[List[str]] = None, states: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream stored records one row at a time, pre-filtered on the indexed columns"""
+        sql = "SELECT data FROM resources WHERE scope = ? AND service = ?"
+        params: List[Any] = [scope, service]
+        if regions:
+            sql += f" AND region IN ({', '.join('?' for _ in regions)})"
+            params.extend(regions)
+        if states:
+            sql += f" AND state IN ({', '.join('?' for _ in states)})"
+            params.extend(states)
+        with self._connect() as conn:
+            for row in conn.execute(sql, params):
+                yield loads(row[0])
+
+    def summary(self, scope: str) -> Dict[str, Any]:
+        """Compute per-service counts with per-state and per-region breakdowns from the store"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT service, region, state, COUNT(*) FROM resources WHERE scope = ? GROUP BY service, region, state",
+                (scope,)
+            ).fetchall()
+
+        summary = {
+            'ec2': {'count': 0, 'running': 0, 'stopped': 0, 'states': {}, 'regions': {}},
+            'rds': {'count': 0, 'states': {}, 'regions': {}},
+            'lambda': {'count': 0, 'regions': {}},
+            's3': {'count': 0},
+        }
+        for service, region, state, count in rows:
+            if service not in summary:
+                continue
+            entry = summary[service]
+            entry['count'] += count
+            if 'regions' in entry and region:
+                entry['regions'][region] = entry['regions'].get(region, 0) + count
+            if 'states' in entry and state:
+                entry['states'][state] = entry['states'].get(state, 0) + count
+            if service == 'ec2' and state in ('running', 'stopped'):
+                entry[state] += count
+        return summary
+
+    def expire(self, scope: str, service: str) -> bool:
+        """Mark a snapshot stale so the next read refreshes it; records are kept until then"""
+        with self._write_lock, self._connect() as conn:
+            cursor = conn.execute("UPDATE snapshots SET as_of = 0 WHERE scope = ? AND service = ?", (scope, service))
+        return cursor.rowcount > 0
+
+    def delete_records(self, scope: str, service: str, region: str, resource_ids: List[str]) -> int:
+        """Remove individual records from a snapshot"""
+        if not resource_ids:
+            return 0
+        with self._write_lock, self._connect() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM resources WHERE scope = ? AND service = ? AND region = ? AND resource_id IN ({', '.join('?' for _ in resource_ids)})",
+                [scope, service, region, *resource_ids]
+            )
+        return cursor.rowcount
+
+    def patch_record(self, scope: str, service: str, region: str, resource_id: str, patch: Callable[[Dict[str, Any]], None]) -> bool:
+        """Apply patch(record) to one stored record in place; False when it is not stored"""
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM resources WHERE scope = ? AND service = ? AND region = ? AND resource_id = ?",
+                (scope, service, region, resource_id)
+            ).fetchone()
+            if row is None:
+                return False
+            record = loads(row[0])
+            patch(record)
+            _, _, state = _resource_key(record)
+            conn.execute(
+                "UPDATE resources SET state = ?, data = ? WHERE scope = ? AND service = ? AND region = ? AND resource_id = ?",
+                (state, dumps(record).decode('utf-8'), scope, service, region, resource_id)
+            )
+        return True
+
+    def account_scopes(self, account_scope: str) -> List[str]:
+        """Stored scopes belonging to an account scope: the account's own and its callers'"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT scope FROM snapshots WHERE scope = ? OR scope LIKE ?",
+                (account_scope, f"{account_scope}:%")
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_scope(self, scope: str):
+        """Remove every snapshot for a scope"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM resources WHERE scope = ?", (scope,))
+            conn.execute("DELETE FROM snapshots WHERE scope = ?", (scope,))
+
+
+# Process-wide store shared by the inventory endpoints and the refresher
+inventory_store = InventoryStore()
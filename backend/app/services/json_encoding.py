@@ -0,0 +1,48 @@
+import json
+import datetime
+import logging
+from typing import Any
+
+from app.services.inventory_records import Record
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _default(value: Any) -> Any:
+    """Fallback for values neither encoder handles natively"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if hasattr(value, 'model_dump'):
+        # Pydantic models
+        return value.model_dump()
+    if hasattr(value, 'tolist'):
+        # NumPy scalars and arrays
+        return value.tolist()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes
+
+    Uses orjson when installed, which writes slotted records, datetimes and
+    dicts straight to bytes; otherwise falls back to the stdlib encoder.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON bytes or text"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
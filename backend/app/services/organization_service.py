@@ -0,0 +1,159 @@
+import os
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.schemas.aws import AWSCredentials
+from app.services.assume_role_pool import assume_role_pool, role_account
+from app.services.aws_service import AWSService
+from app.services.client_pool import client_pool
+from app.services.fanout_executor import fanout_executor
+from app.services.inventory_store import RESULT_KEYS
+from app.services.rate_limiter import RetryBudget, current_retry_budget, error_category
+from app.services.resource_query import ResourceQuery
+from app.services.session_service import credential_partition, get_caller_identity, is_auth_error
+from app.services.summary_engine import PARTIAL_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# Accounts processed at once across every organization request
+ORG_MAX_CONCURRENT_ACCOUNTS = int(os.getenv("ORG_MAX_CONCURRENT_ACCOUNTS", "8"))
+
+# Role assumed in each member account when accounts are discovered
+ORG_ROLE_NAME = os.getenv("ORG_ROLE_NAME", "OrganizationAccountAccessRole")
+
+_account_slots: Optional[asyncio.Semaphore] = None
+
+
+def _slots() -> asyncio.Semaphore:
+    # Created on first use so it binds to the serving event loop
+    global _account_slots
+    if _account_slots is None:
+        _account_slots = asyncio.Semaphore(ORG_MAX_CONCURRENT_ACCOUNTS)
+    return _account_slots
+
+
+class OrganizationService:
+    """Inventory across many accounts from one hub credential
+
+    Member accounts are reached by assuming a role in each of them, either
+    from an explicit list of role ARNs or by listing the organization's
+    active accounts and assuming role_name in each. Accounts run under a
+    process-wide cap of ORG_MAX_CONCURRENT_ACCOUNTS, each with its own retry
+    budget so one throttled account cannot exhaust the others'. Results are
+    merged with an account_id on every record, and per-account failures are
+    reported alongside rather than failing the whole request.
+    """
+
+    def __init__(self, hub_credentials: AWSCredentials, role_arns: Optional[List[str]] = None,
+                 role_name: Optional[str] = None, external_id: Optional[str] = None):
+        """Initialize with hub credentials and either role ARNs or a role name to assume"""
+        self.hub_credentials = hub_credentials
+        self.role_arns = list(role_arns or [])
+        self.role_name = role_name or ORG_ROLE_NAME
+        self.external_id = external_id
+
+    def _discover_accounts(self) -> List[Dict[str, Optional[str]]]:
+        """Active organization accounts; the hub's own account uses the hub credentials"""
+        hub_account = get_caller_identity(self.hub_credentials)['account']
+        partition = credential_partition(self.hub_credentials)
+        targets = []
+        paginator = client_pool.client(self.hub_credentials, 'organizations').get_paginator('list_accounts')
+        for page in paginator.paginate():
+            for account in page.get('Accounts', []):
+                if account.get('Status') != 'ACTIVE':
+                    continue
+                role_arn = None if account['Id'] == hub_account else f"arn:{partition}:iam::{account['Id']}:role/{self.role_name}"
+                targets.append({'account_id': account['Id'], 'name': account.get('Name'), 'role_arn': role_arn})
+        return targets
+
+    async def accounts(self) -> List[Dict[str, Optional[str]]]:
+        """Accounts to inventory: the given role ARNs, or the organization's active accounts"""
+        if self.role_arns:
+            return [{'account_id': role_account(arn), 'name': None, 'role_arn': arn} for arn in self.role_arns]
+        return await fanout_executor.lane().run('organizations', self.hub_credentials.region, self._discover_accounts)
+
+    async def _account_credentials(self, target: Dict[str, Optional[str]]) -> AWSCredentials:
+        if not target['role_arn']:
+            return self.hub_credentials
+        return await fanout_executor.lane().run(
+            'sts', self.hub_credentials.region, assume_role_pool.credentials,
+            self.hub_credentials, target['role_arn'], self.external_id
+        )
+
+    async def _run_account(self, target: Dict[str, Optional[str]], fn: Callable[[AWSService], Awaitable[Any]]) -> Any:
+        """Run fn for one account under the global cap; returns a failure dict on error"""
+        async with _slots():
+            # Runs in its own task, so this budget only covers this account
+            current_retry_budget.set(RetryBudget())
+            try:
+                credentials = await self._account_credentials(target)
+                return await fn(AWSService(credentials))
+            except Exception as e:
+                if target['role_arn'] and is_auth_error(e):
+                    assume_role_pool.invalidate(self.hub_credentials, target['role_arn'])
+                logger.error(f"Organization inventory failed for account {target['account_id']}: {str(e)}")
+                return {'account_id': target['account_id'], 'category': error_category(e), 'message': str(e)}
+
+    async def _fan_out(self, fn: Callable[[AWSService], Awaitable[Any]]):
+        targets = await self.accounts()
+        results = await asyncio.gather(*[self._run_account(target, fn) for target in targets])
+        return targets, results
+
+    @staticmethod
+    def _is_failure(result: Any) -> bool:
+        return isinstance(result, dict) and 'category' in result and 'account_id' in result
+
+    async def get_resource_summary(self, refresh_regions: bool = False) -> Dict[str, Any]:
+        """Per-account resource summaries plus organization-wide totals"""
+        targets, results = await self._fan_out(lambda aws: aws.get_resource_summary(refresh_regions))
+
+        accounts, totals, failures = {}, Counter(), []
+        partial = False
+        for target, result in zip(targets, results):
+            if self._is_failure(result):
+                failures.append(result)
+                continue
+            accounts[target['account_id']] = {'name': target['name'], **result}
+            for service, summary in result.items():
+                totals[service] += summary.get('count', 0)
+                partial = partial or summary.get('partial', False)
+
+        response = {'accounts': accounts, 'totals': dict(totals)}
+        if failures:
+            response['errors'] = failures
+        if failures or partial:
+            response['partial'] = partial or any(f['category'] in PARTIAL_CATEGORIES for f in failures)
+        return response
+
+    async def get_resources(self, service: str, refresh_regions: bool = False, query: ResourceQuery = None) -> Dict[str, Any]:
+        """A service's records across accounts, each tagged with its account_id
+
+        With a non-empty query, one page of the merged listing is returned
+        along with a `next_cursor`.
+        """
+        if service not in RESULT_KEYS:
+            return {"error": f"Service {service} not supported"}
+        result_key = RESULT_KEYS[service]
+        targets, results = await self._fan_out(lambda aws: aws.get_resources(service, refresh_regions, query))
+
+        records, failures = [], []
+        partial = False
+        for target, result in zip(targets, results):
+            if self._is_failure(result):
+                failures.append(result)
+                continue
+            account_id = target['account_id']
+            # Copied: the per-account results may be shared with coalesced callers
+            records.extend({**record, 'account_id': account_id} for record in result.get(result_key, []))
+            failures.extend({**failure, 'account_id': account_id} for failure in result.get('errors', []))
+            partial = partial or result.get('partial', False)
+
+        response = {result_key: records}
+        if query is not None and not query.is_empty():
+            response[result_key], response['next_cursor'] = query.page(records)
+        if failures:
+            response['errors'] = failures
+            response['partial'] = partial or any(f['category'] in PARTIAL_CATEGORIES for f in failures)
+        return response
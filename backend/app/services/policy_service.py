@@ -2,6 +2,7 @@ import os
 import yaml
 import json
 import uuid
+import hashlib
 import logging
 from typing import List, Dict, Any, Optional
 from app.schemas.policies import Policy
@@ -63,6 +64,20 @@ class PolicyService:
                         
         return policies
         
+    def revision(self) -> str:
+        """Fingerprint of the policy files (paths, sizes and modification times)
+
+        Changes whenever a policy file is added, removed or edited, without
+        parsing any YAML.
+        """
+        entries = []
+        for root, _, files in os.walk(self.policy_dir):
+            for file in files:
+                if file.endswith('.yml') or file.endswith('.yaml'):
+                    stat = os.stat(os.path.join(root, file))
+                    entries.append(f"{os.path.join(root, file)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha256("\n".join(sorted(entries)).encode()).hexdigest()
+        
     async def get_policy(self, policy_id: str) -> Optional[Policy]:
         """Get a specific policy by ID"""
         policies = await self.get_all_policies()
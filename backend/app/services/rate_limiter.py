@@ -0,0 +1,227 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Starting and ceiling call rate (calls/second) per account, region and API
+AWS_RATE_LIMIT = float(os.getenv("AWS_RATE_LIMIT", "20"))
+
+# Floor the adaptive rate backs off to under sustained throttling
+AWS_RATE_LIMIT_MIN = float(os.getenv("AWS_RATE_LIMIT_MIN", "0.5"))
+
+# Calls that may be made back to back before the rate applies
+AWS_RATE_LIMIT_BURST = int(os.getenv("AWS_RATE_LIMIT_BURST", "10"))
+
+# botocore attempts per call (first try included)
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+
+# Retries one API request may spend across all the AWS calls it makes
+AWS_RETRY_BUDGET = int(os.getenv("AWS_RETRY_BUDGET", "50"))
+
+THROTTLING_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+    'SlowDown',
+    'ProvisionedThroughputExceededException',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+}
+
+DENIED_CODES = {
+    'AccessDenied',
+    'AccessDeniedException',
+    'UnauthorizedOperation',
+    'UnauthorizedException',
+    'AuthorizationError',
+}
+
+# Opt-in regions that are not enabled reject the credentials themselves
+DISABLED_CODES = {
+    'OptInRequired',
+    'AuthFailure',
+    'InvalidClientTokenId',
+    'UnrecognizedClientException',
+}
+
+ERROR_CATEGORIES = ('throttled', 'denied', 'disabled', 'error')
+
+
+class RetryBudgetExhausted(Exception):
+    """Raised instead of retrying once a request has spent its retry budget"""
+
+    def __init__(self, code: str):
+        super().__init__(f"Retry budget exhausted ({code or 'retryable error'})")
+        self.code = code
+
+
+def error_code(error: Exception) -> str:
+    """botocore error code of an exception, or '' when it has none"""
+    return getattr(error, 'response', {}).get('Error', {}).get('Code', '') or ''
+
+
+def error_category(error: Exception) -> str:
+    """Classify a failed call as 'throttled', 'denied', 'disabled' or 'error'"""
+    code = error_code(error)
+    if isinstance(error, RetryBudgetExhausted) or code in THROTTLING_CODES:
+        return 'throttled'
+    if code in DENIED_CODES:
+        return 'denied'
+    if code in DISABLED_CODES or type(error).__name__ == 'EndpointConnectionError':
+        return 'disabled'
+    return 'error'
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate halves on throttling and creeps back on success"""
+
+    def __init__(self, rate: float = AWS_RATE_LIMIT, min_rate: float = AWS_RATE_LIMIT_MIN, burst: int = AWS_RATE_LIMIT_BURST):
+        """Initialize a full bucket at the maximum rate"""
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RetryBudget:
+    """Retries one API request may spend; shared by every call it makes"""
+
+    def __init__(self, retries: int = AWS_RETRY_BUDGET):
+        """Initialize with a number of retries"""
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def consume(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+# Budget of the API request currently being served; None outside requests
+# (background refreshes), which are bounded by AWS_MAX_ATTEMPTS only
+current_retry_budget: ContextVar[Optional[RetryBudget]] = ContextVar('current_retry_budget', default=None)
+
+
+class RateLimiter:
+    """Adaptive token buckets keyed by account, region, service and operation
+
+    Buckets are attached to clients through botocore events: every attempt
+    (retries included) takes a token before it is sent, and every response
+    feeds the bucket's rate. Retryable failures also draw on the current
+    request's retry budget.
+    """
+
+    def __init__(self):
+        """Initialize with no buckets"""
+        self._buckets: Dict[Tuple[str, str, str, str], AdaptiveTokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: Tuple[str, str, str, str]) -> AdaptiveTokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = AdaptiveTokenBucket()
+            return bucket
+
+    def _handlers(self, account: Callable[[], str], region: str, service: str):
+        def _bucket(operation: str) -> AdaptiveTokenBucket:
+            return self.bucket((account(), region, service, operation))
+
+        def before_send(event_name: str = '', **kwargs):
+            return _bucket(event_name.split('.')[-1]).reserve()
+
+        def needs_retry(response=None, caught_exception=None, operation=None, attempts=1, **kwargs):
+            code = (response[1] or {}).get('Error', {}).get('Code', '') if response else ''
+            status = getattr(response[0], 'status_code', 0) if response else 0
+            bucket = _bucket(operation.name if operation is not None else '')
+            if code in THROTTLING_CODES or status == 429:
+                bucket.on_throttle()
+            elif caught_exception is None and status < 500:
+                if not code:
+                    bucket.on_success()
+                return None
+            if attempts < AWS_MAX_ATTEMPTS:
+                budget = current_retry_budget.get()
+                if budget is not None and not budget.consume():
+                    raise RetryBudgetExhausted(code)
+            return None
+
+        return before_send, needs_retry
+
+    def instrument(self, client, account: Callable[[], str], region: str):
+        """Rate-limit a boto3 client; waits block the calling worker thread"""
+        before_send, needs_retry = self._handlers(account, region, client.meta.service_model.service_name)
+
+        def blocking_before_send(**kwargs):
+            wait = before_send(**kwargs)
+            if wait > 0:
+                time.sleep(wait)
+
+        client.meta.events.register('before-send', blocking_before_send)
+        client.meta.events.register('needs-retry', needs_retry)
+
+    def instrument_async(self, client, account: Callable[[], str], region: str):
+        """Rate-limit an aiobotocore client; waits yield to the event loop"""
+        before_send, needs_retry = self._handlers(account, region, client.meta.service_model.service_name)
+
+        async def async_before_send(**kwargs):
+            wait = before_send(**kwargs)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        client.meta.events.register('before-send', async_before_send)
+        client.meta.events.register('needs-retry', needs_retry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Buckets currently below their maximum rate or that have been throttled"""
+        with self._lock:
+            buckets = list(self._buckets.items())
+        return {
+            'buckets': len(buckets),
+            'throttled': [
+                {'region': key[1], 'service': key[2], 'operation': key[3], 'rate': round(bucket.rate, 2), 'throttle_count': bucket.throttled}
+                for key, bucket in buckets if bucket.throttled
+            ],
+        }
+
+
+# Process-wide rate limiter shared by every pooled client
+rate_limiter = RateLimiter()
@@ -0,0 +1,66 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long a discovered region list stays valid (seconds)
+REGION_CACHE_TTL = int(os.getenv("REGION_CACHE_TTL", "3600"))
+
+# Optional comma-separated allow-list of regions, e.g. "us-east-1,eu-west-1"
+REGION_ALLOWLIST = [
+    region.strip()
+    for region in os.getenv("AWS_REGION_ALLOWLIST", "").split(",")
+    if region.strip()
+]
+
+
+class RegionCache:
+    """Shared cache of enabled regions keyed by account and credential scope"""
+
+    def __init__(self, ttl: int = REGION_CACHE_TTL, allowlist: Optional[List[str]] = None):
+        """Initialize the cache with a TTL and an optional region allow-list"""
+        self.ttl = ttl
+        self.allowlist = list(allowlist) if allowlist is not None else list(REGION_ALLOWLIST)
+        self._entries: Dict[str, Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _apply_allowlist(self, regions: List[str]) -> List[str]:
+        """Restrict discovered regions to the configured allow-list"""
+        if not self.allowlist:
+            return regions
+        return [region for region in regions if region in self.allowlist]
+
+    def get_regions(self, scope_key: str, loader: Callable[[], List[str]], force_refresh: bool = False) -> List[str]:
+        """Return the cached regions for a scope, calling the loader on a miss
+
+        Args:
+            scope_key: Account / credential scope the region list belongs to
+            loader: Callable returning the enabled regions (e.g. via describe_regions)
+            force_refresh: Ignore any cached entry and reload
+        """
+        now = time.monotonic()
+        if not force_refresh:
+            with self._lock:
+                entry = self._entries.get(scope_key)
+            if entry and entry[0] > now:
+                return list(entry[1])
+
+        regions = self._apply_allowlist(loader())
+        with self._lock:
+            self._entries[scope_key] = (now + self.ttl, regions)
+        return list(regions)
+
+    def invalidate(self, scope_key: Optional[str] = None):
+        """Drop one scope from the cache, or everything when no scope is given"""
+        with self._lock:
+            if scope_key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(scope_key, None)
+
+
+# Process-wide cache shared by every AWSService instance
+region_cache = RegionCache()
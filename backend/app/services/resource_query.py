@@ -0,0 +1,158 @@
+import os
+import json
+import heapq
+import base64
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Page size used when a query does not ask for one, and the upper bound
+DEFAULT_PAGE_SIZE = int(os.getenv("RESOURCE_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("RESOURCE_MAX_PAGE_SIZE", "1000"))
+
+
+def _values(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter into values"""
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+def _rank(value: Any) -> Tuple[int, Any]:
+    """Total ordering across record values: missing < numbers < strings"""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+class ResourceQuery:
+    """Filters, sort order, field projection and keyset cursor for resource listings
+
+    Filters that the AWS API understands are pushed down through
+    aws_filters(); everything is also re-checked client-side by matches() so
+    the store and live paths return identical pages.
+    """
+
+    def __init__(
+        self,
+        region: Optional[str] = None,
+        state: Optional[str] = None,
+        instance_type: Optional[str] = None,
+        tag_key: Optional[str] = None,
+        tag_value: Optional[str] = None,
+        engine: Optional[str] = None,
+        runtime: Optional[str] = None,
+        sort: Optional[str] = None,
+        fields: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ):
+        """Initialize from the listing endpoint's query parameters"""
+        self.regions = _values(region)
+        self.states = _values(state)
+        self.instance_types = _values(instance_type)
+        self.tag_key = tag_key
+        self.tag_values = _values(tag_value)
+        self.engines = _values(engine)
+        self.runtimes = _values(runtime)
+        self.descending = bool(sort and sort.startswith("-"))
+        self.sort = sort.lstrip("-") if sort else None
+        self.fields = _values(fields)
+        self.cursor = cursor
+        self.limit = limit
+        self._after = self._decode_cursor(cursor) if cursor else None
+
+        if self.tag_values and not self.tag_key:
+            raise ValueError("tag_value requires tag_key")
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    def is_empty(self) -> bool:
+        """True when no filtering, sorting, projection or paging was requested"""
+        return not any([
+            self.regions, self.states, self.instance_types, self.tag_key, self.engines,
+            self.runtimes, self.sort, self.fields, self.cursor, self.limit,
+        ])
+
+    def aws_filters(self, service: str) -> Dict[str, Any]:
+        """Paginator arguments for the filters the service's list API supports"""
+        filters = []
+        if service == 'ec2':
+            if self.states:
+                filters.append({'Name': 'instance-state-name', 'Values': self.states})
+            if self.instance_types:
+                filters.append({'Name': 'instance-type', 'Values': self.instance_types})
+            if self.tag_key and self.tag_values:
+                filters.append({'Name': f'tag:{self.tag_key}', 'Values': self.tag_values})
+            elif self.tag_key:
+                filters.append({'Name': 'tag-key', 'Values': [self.tag_key]})
+        elif service == 'rds':
+            if self.engines:
+                filters.append({'Name': 'engine', 'Values': self.engines})
+        return {'Filters': filters} if filters else {}
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        """Check a normalized record against every filter"""
+        if self.regions and record.get('region') not in self.regions:
+            return False
+        if self.states and (record.get('state') or record.get('status')) not in self.states:
+            return False
+        if self.instance_types and (record.get('type') or record.get('size')) not in self.instance_types:
+            return False
+        if self.engines and record.get('engine') not in self.engines:
+            return False
+        if self.runtimes and record.get('runtime') not in self.runtimes:
+            return False
+        if self.tag_key:
+            tags = record.get('tags') or {}
+            if self.tag_key not in tags:
+                return False
+            if self.tag_values and tags[self.tag_key] not in self.tag_values:
+                return False
+        return True
+
+    def sort_key(self, record: Dict[str, Any]) -> Tuple:
+        """Keyset ordering: sort field, then region and resource id as tie-breakers"""
+        key = _rank(record.get(self.sort)) if self.sort else (0, 0)
+        return key + (record.get('region') or '', record.get('id') or record.get('name') or '')
+
+    def _encode_cursor(self, key: Tuple) -> str:
+        return base64.urlsafe_b64encode(json.dumps([self.sort, self.descending, list(key)]).encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> Tuple:
+        try:
+            sort, descending, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if sort != self.sort or descending != self.descending:
+            raise ValueError("Cursor does not match the requested sort order")
+        return tuple(key)
+
+    def _project(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.fields:
+            return record
+        return {field: record.get(field) for field in self.fields}
+
+    def page(self, records: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Filter, order and cut one page from a stream of records
+
+        Only limit + 1 records are retained at a time, so large stores can be
+        streamed through without being loaded into memory.
+        """
+        limit = self.limit or DEFAULT_PAGE_SIZE
+        candidates = (
+            (self.sort_key(record), record) for record in records
+            if self.matches(record) and self._after_cursor(record)
+        )
+        select = heapq.nlargest if self.descending else heapq.nsmallest
+        selected = select(limit + 1, candidates, key=lambda item: item[0])
+
+        next_cursor = self._encode_cursor(selected[limit - 1][0]) if len(selected) > limit else None
+        return [self._project(record) for _, record in selected[:limit]], next_cursor
+
+    def _after_cursor(self, record: Dict[str, Any]) -> bool:
+        if self._after is None:
+            return True
+        key = self.sort_key(record)
+        return key < self._after if self.descending else key > self._after
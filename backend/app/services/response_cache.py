@@ -0,0 +1,158 @@
+import os
+import gzip
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Seconds a serialized response is reused before the route recomputes it
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+# Maximum number of cached responses before the least recently used is evicted
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Bodies smaller than this are always sent uncompressed
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# Content encodings we can produce, most preferred first
+SUPPORTED_ENCODINGS = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+
+
+def strong_etag(body: bytes) -> str:
+    """Strong entity tag of a response body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith('W/') else candidate) == opaque:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content encoding for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        weight = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding] = weight
+    candidates = [(weights.get(coding, weights.get('*', 0.0)), -i, coding) for i, coding in enumerate(SUPPORTED_ENCODINGS)]
+    weight, _, coding = max(candidates)
+    return coding if weight > 0 else None
+
+
+class CachedResponse:
+    """Serialized body of one response, its ETag and its compressed variants
+
+    Compressed variants are built the first time a client asks for them and
+    kept alongside the identity body, so repeated hits skip both
+    serialization and compression.
+    """
+
+    def __init__(self, body: bytes, expires_at: float):
+        """Initialize with the identity body and an expiry (monotonic seconds)"""
+        self.body = body
+        self.etag = strong_etag(body)
+        self.expires_at = expires_at
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """(body, content encoding) for a negotiated encoding"""
+        if encoding is None or len(self.body) < RESPONSE_COMPRESS_MIN_BYTES:
+            return self.body, None
+        with self._lock:
+            compressed = self._variants.get(encoding)
+            if compressed is None:
+                if encoding == 'br':
+                    compressed = brotli.compress(self.body, quality=5)
+                else:
+                    compressed = gzip.compress(self.body, compresslevel=6)
+                self._variants[encoding] = compressed
+        return compressed, encoding
+
+
+class ResponseCache:
+    """LRU of serialized responses keyed by account scope and request parameters
+
+    Entries expire after their TTL and are dropped for a whole scope when
+    that account's inventory changes.
+    """
+
+    def __init__(self, ttl: int = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        """Initialize the cache with a default TTL and an LRU size bound"""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope: str, key: Hashable) -> Optional[CachedResponse]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is None or entry.expires_at <= now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((scope, key))
+            self.hits += 1
+            return entry
+
+    def put(self, scope: str, key: Hashable, body: bytes, ttl: Optional[int] = None) -> CachedResponse:
+        """Store a serialized body; a TTL of 0 builds the entry without keeping it"""
+        ttl = self.ttl if ttl is None else ttl
+        entry = CachedResponse(body, time.monotonic() + ttl)
+        if ttl > 0:
+            with self._lock:
+                self._entries[(scope, key)] = entry
+                self._entries.move_to_end((scope, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, scope: Optional[str] = None):
+        """Drop one scope's responses, or everything"""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                return
+            for entry_key in [k for k in self._entries if k[0] == scope]:
+                del self._entries[entry_key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Process-wide cache of serialized API responses
+response_cache = ResponseCache()
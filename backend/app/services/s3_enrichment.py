@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.fanout_executor import FanoutExecutor
+
+logger = logging.getLogger(__name__)
+
+# Worker threads dedicated to per-bucket enrichment calls
+S3_ENRICH_WORKERS = int(os.getenv("S3_ENRICH_WORKERS", "16"))
+
+# Seconds a bucket's region is remembered (buckets cannot change region)
+S3_LOCATION_CACHE_TTL = int(os.getenv("S3_LOCATION_CACHE_TTL", "86400"))
+
+# Optional per-bucket attributes; the bucket region is always resolved
+S3_ENRICHMENTS = ('public', 'encryption', 'versioning')
+
+
+class BucketLocationCache:
+    """Cache of bucket regions keyed by credential scope and bucket name"""
+
+    def __init__(self, ttl: int = S3_LOCATION_CACHE_TTL):
+        """Initialize the cache with a TTL"""
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, bucket: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((scope, bucket))
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, scope: str, bucket: str, region: str):
+        with self._lock:
+            self._entries[(scope, bucket)] = (time.monotonic() + self.ttl, region)
+
+    def invalidate(self, scope: str, bucket: Optional[str] = None):
+        """Drop one bucket, or every bucket of a scope"""
+        with self._lock:
+            if bucket is not None:
+                self._entries.pop((scope, bucket), None)
+            else:
+                for key in [k for k in self._entries if k[0] == scope]:
+                    del self._entries[key]
+
+
+def _normalize_location(constraint: Optional[str]) -> str:
+    """Map a LocationConstraint to a region name"""
+    if not constraint:
+        return 'us-east-1'
+    if constraint == 'EU':
+        return 'eu-west-1'
+    return constraint
+
+
+class S3BucketEnricher:
+    """Enrich buckets concurrently with region-correct clients
+
+    Each bucket is one job on a bounded executor: its region is resolved
+    (from cache when possible) and the requested attributes are fetched from
+    a client in that region.
+    """
+
+    def __init__(self, scope: str, client_factory: Callable[[str, Optional[str]], Any], include: Optional[List[str]] = None):
+        """Initialize with a credential scope, a (service, region) client factory and the attributes to fetch"""
+        self.scope = scope
+        self.client_factory = client_factory
+        self.include = [name for name in (include if include is not None else S3_ENRICHMENTS) if name in S3_ENRICHMENTS]
+
+    def _region(self, bucket_name: str) -> str:
+        region = bucket_location_cache.get(self.scope, bucket_name)
+        if region is None:
+            location = self.client_factory('s3', None).get_bucket_location(Bucket=bucket_name)
+            region = _normalize_location(location.get('LocationConstraint'))
+            bucket_location_cache.set(self.scope, bucket_name, region)
+        return region
+
+    def enrich(self, bucket: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch the region and requested attributes of one bucket"""
+        name = bucket['Name']
+        try:
+            region = self._region(name)
+            client = self.client_factory('s3', region)
+            bucket_info = {
+                'name': name,
+                'creation_date': bucket['CreationDate'].isoformat() if bucket.get('CreationDate') else None,
+                'region': region,
+            }
+
+            if 'public' in self.include:
+                try:
+                    bucket_info['public'] = client.get_bucket_policy_status(Bucket=name).get('PolicyStatus', {}).get('IsPublic', False)
+                except Exception:
+                    bucket_info['public'] = False
+
+            if 'encryption' in self.include:
+                encryption = {'enabled': False}
+                try:
+                    encryption_config = client.get_bucket_encryption(Bucket=name)
+                    encryption = {
+                        'enabled': True,
+                        'type': encryption_config.get('ServerSideEncryptionConfiguration', {}).get('Rules', [{}])[0].get('ServerSideEncryptionByDefault', {}).get('SSEAlgorithm')
+                    }
+                except Exception:
+                    pass
+                bucket_info['encryption'] = encryption
+
+            if 'versioning' in self.include:
+                bucket_info['versioning'] = client.get_bucket_versioning(Bucket=name).get('Status')
+
+            return bucket_info
+        except Exception as e:
+            logger.error(f"Error getting details for bucket {name}: {str(e)}")
+            return {'name': name, 'error': str(e)}
+
+    async def enrich_all(self, buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Enrich every bucket concurrently, preserving input order"""
+        lane = s3_enrichment_executor.lane()
+        return await asyncio.gather(*[
+            lane.run('s3', bucket_location_cache.get(self.scope, b['Name']) or 'unresolved', self.enrich, b)
+            for b in buckets
+        ])
+
+
+# Process-wide bucket region cache
+bucket_location_cache = BucketLocationCache()
+
+# Bounded executor for bucket enrichment; no per-region cap beyond the worker count
+s3_enrichment_executor = FanoutExecutor(
+    max_workers=S3_ENRICH_WORKERS,
+    per_service_limit=S3_ENRICH_WORKERS,
+    per_region_limit=S3_ENRICH_WORKERS,
+    service_limits={},
+)
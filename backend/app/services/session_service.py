@@ -1,7 +1,36 @@
-import boto3
-from typing import Optional
+import os
+import hmac
+import time
+import hashlib
+import logging
+import secrets
+import datetime
+import threading
+from typing import Any, Dict, Optional, Tuple
 from app.schemas.aws import AWSCredentials
-from fastapi import Depends, HTTPException
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Key for salting credential fingerprints; a random per-process salt is used when unset
+CREDENTIAL_HASH_SALT = (os.getenv("CREDENTIAL_HASH_SALT") or secrets.token_hex(32)).encode()
+
+# Seconds a successful validation is reused for long-term keys, and for
+# session credentials whose expiry is unknown
+CREDENTIAL_CACHE_TTL = int(os.getenv("CREDENTIAL_CACHE_TTL", "3600"))
+CREDENTIAL_SESSION_CACHE_TTL = int(os.getenv("CREDENTIAL_SESSION_CACHE_TTL", "300"))
+
+# Error codes meaning the credentials themselves are no longer accepted
+AUTH_ERROR_CODES = {
+    'InvalidClientTokenId',
+    'UnrecognizedClientException',
+    'SignatureDoesNotMatch',
+    'ExpiredToken',
+    'ExpiredTokenException',
+    'AuthFailure',
+    'InvalidAccessKeyId',
+    'RequestExpired',
+}
 
 def get_aws_session(credentials: AWSCredentials):
     """
@@ -10,18 +39,163 @@ def get_aws_session(credentials: AWSCredentials):
     This is a FastAPI dependency that can be used in route functions
     to get a boto3 session from the credentials provided in the request.
     """
+    # Imported here because the client pool keys itself with credentials_fingerprint below
+    from app.services.client_pool import client_pool
+
     try:
-        session = boto3.Session(
-            aws_access_key_id=credentials.access_key,
-            aws_secret_access_key=credentials.secret_key,
-            region_name=credentials.region,
-            aws_session_token=credentials.session_token
-        )
+        session = client_pool.get_session(credentials)
         
-        # Validate session by making a test call
-        sts = session.client('sts')
-        sts.get_caller_identity()
+        # Validate session (cached per credentials)
+        get_caller_identity(credentials)
         
         return session
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid AWS credentials: {str(e)}")
+
+
+def credentials_fingerprint(credentials: AWSCredentials) -> str:
+    """
+    Build a stable, non-reversible key identifying a set of AWS credentials
+
+    Used to scope shared caches to the caller without keeping the raw
+    secret key around as a dictionary key.
+    """
+    material = "|".join([
+        credentials.access_key,
+        credentials.secret_key,
+        credentials.session_token or "",
+    ])
+    return hmac.new(CREDENTIAL_HASH_SALT, material.encode(), hashlib.sha256).hexdigest()
+
+
+def is_auth_error(error: Any) -> bool:
+    """True when an exception (or botocore error code) means the credentials were rejected"""
+    if isinstance(error, str):
+        return error in AUTH_ERROR_CODES
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in AUTH_ERROR_CODES
+
+
+class CallerIdentityCache:
+    """STS caller identities keyed by credential fingerprint
+
+    Entries live for CREDENTIAL_CACHE_TTL (CREDENTIAL_SESSION_CACHE_TTL for
+    session credentials), never past the session token's expiration, and are
+    dropped as soon as AWS rejects the credentials.
+    """
+
+    def __init__(self, ttl: int = CREDENTIAL_CACHE_TTL, session_ttl: int = CREDENTIAL_SESSION_CACHE_TTL):
+        """Initialize the cache with TTLs for long-term and session credentials"""
+        self.ttl = ttl
+        self.session_ttl = session_ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _lifetime(self, credentials: AWSCredentials) -> float:
+        if not credentials.session_token:
+            return self.ttl
+        lifetime = self.session_ttl
+        if credentials.expiration is not None:
+            expiration = credentials.expiration
+            if expiration.tzinfo is None:
+                expiration = expiration.replace(tzinfo=datetime.timezone.utc)
+            remaining = (expiration - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            lifetime = min(self.session_ttl, max(remaining, 0))
+        return lifetime
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, fingerprint: str, credentials: AWSCredentials, identity: Dict[str, str]):
+        lifetime = self._lifetime(credentials)
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[fingerprint] = (time.monotonic() + lifetime, identity)
+
+    def invalidate(self, fingerprint: Optional[str] = None):
+        """Drop one set of credentials, or everything when no fingerprint is given"""
+        with self._lock:
+            if fingerprint is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(fingerprint, None)
+
+
+def get_caller_identity(credentials: AWSCredentials, force_refresh: bool = False) -> Dict[str, str]:
+    """Account, ARN and user ID of the credentials, from cache when possible
+
+    Raises the STS error when the credentials are invalid.
+    """
+    from app.services.client_pool import client_pool
+
+    fingerprint = credentials_fingerprint(credentials)
+    if not force_refresh:
+        identity = identity_cache.get(fingerprint)
+        if identity is not None:
+            return identity
+    try:
+        response = client_pool.client(credentials, 'sts').get_caller_identity()
+    except Exception as e:
+        if is_auth_error(e):
+            invalidate_credentials(credentials)
+        raise
+    identity = {'account': response['Account'], 'arn': response['Arn'], 'user_id': response['UserId']}
+    identity_cache.set(fingerprint, credentials, identity)
+    return identity
+
+
+def invalidate_credentials(credentials: AWSCredentials):
+    """Forget the cached identity and pooled clients of rejected credentials"""
+    from app.services.async_inventory import async_inventory
+    from app.services.client_pool import client_pool
+
+    identity_cache.invalidate(credentials_fingerprint(credentials))
+    client_pool.evict(credentials)
+    async_inventory.evict(credentials)
+
+
+def region_partition(region: Optional[str]) -> str:
+    """AWS partition a region belongs to"""
+    region = region or ""
+    if region.startswith("cn-"):
+        return "aws-cn"
+    if region.startswith("us-gov-"):
+        return "aws-us-gov"
+    return "aws"
+
+
+def credential_partition(credentials: AWSCredentials) -> str:
+    """AWS partition implied by the credentials' region"""
+    return region_partition(credentials.region)
+
+
+def resolve_scopes(credentials: AWSCredentials) -> Tuple[str, str]:
+    """Account scope and caller scope of the credentials, from one identity lookup
+
+    The account scope (account ID plus AWS partition) keys per-account
+    caches shared by every set of credentials of the account. The caller
+    scope adds the principal's ARN and keys permission-sensitive data:
+    principals of one account can be allowed to see different IAM, cost and
+    resource data, so what one of them fetched is never served to another.
+    When the identity cannot be resolved, the credential fingerprint stands
+    in for both the account and the ARN.
+
+    Makes a (cached) STS call, so async callers run it in a thread.
+    """
+    try:
+        identity = get_caller_identity(credentials)
+        account, arn = identity['account'], identity['arn']
+    except Exception as e:
+        logger.warning(f"Could not resolve caller for cache scope: {str(e)}")
+        account = arn = credentials_fingerprint(credentials)
+    account_scope = f"{account}:{credential_partition(credentials)}"
+    return account_scope, f"{account_scope}:{arn}"
+
+
+# Process-wide caller identity cache
+identity_cache = CallerIdentityCache()
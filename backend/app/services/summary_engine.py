@@ -0,0 +1,110 @@
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+import jmespath
+
+from app.services.rate_limiter import error_category
+
+logger = logging.getLogger(__name__)
+
+# Fields the summary needs from each page. None of these APIs support
+# server-side projection, so each page is reduced with JMESPath as soon as it
+# arrives and dropped before the next one is fetched.
+EC2_STATES = jmespath.compile('Reservations[].Instances[].State.Name')
+RDS_STATES = jmespath.compile('DBInstances[].DBInstanceStatus')
+LAMBDA_NAMES = jmespath.compile('Functions[].FunctionName')
+
+# (paginated operation, pagination params, projection) per service
+SUMMARY_SOURCES = {
+    'ec2': ('describe_instances', {'PaginationConfig': {'PageSize': 1000}}, EC2_STATES),
+    'rds': ('describe_db_instances', {'PaginationConfig': {'PageSize': 100}}, RDS_STATES),
+    'lambda': ('list_functions', {'PaginationConfig': {'PageSize': 50}}, LAMBDA_NAMES),
+}
+
+
+# How each failure category is reported
+FAILURE_MESSAGES = {
+    'throttled': "throttled by AWS; results are incomplete.",
+    'denied': "access denied.",
+    'disabled': "region not enabled.",
+}
+
+# Categories that leave a region's results incomplete (as opposed to
+# legitimately empty, as for a denied or disabled region)
+PARTIAL_CATEGORIES = ('throttled', 'error')
+
+
+def region_failure(region: str, error: Exception) -> Dict[str, str]:
+    """Describe a failed regional call: region, category and message"""
+    category = error_category(error)
+    message = FAILURE_MESSAGES.get(category) or str(error)
+    if category in PARTIAL_CATEGORIES:
+        logger.warning(f"{region}: {category}: {str(error)}")
+    return {'region': region, 'category': category, 'message': f"{region}: {message}"}
+
+
+def count_pages(pages, projection) -> Counter:
+    """Tally projected values over an iterable of pages in one streaming pass"""
+    counts = Counter()
+    for page in pages:
+        counts.update(projection.search(page) or [])
+    return counts
+
+
+def region_result(service: str, counts: Counter) -> Dict[str, Any]:
+    """Shape per-region counts; EC2 and RDS keep a per-state breakdown"""
+    result = {'count': sum(counts.values()), 'error': None, 'error_category': None}
+    if service in ('ec2', 'rds'):
+        result['states'] = dict(counts)
+    return result
+
+
+class SummaryEngine:
+    """Counts-only regional summaries streamed from paginated client calls"""
+
+    def __init__(self, client_factory: Callable[[str, str], Any]):
+        """Initialize with a callable returning a client for (service, region)"""
+        self.client_factory = client_factory
+
+    def count_region(self, service: str, region: str) -> Dict[str, Any]:
+        """Count one service in one region without materializing its resources"""
+        operation, params, projection = SUMMARY_SOURCES[service]
+        try:
+            paginator = self.client_factory(service, region).get_paginator(operation)
+            return region_result(service, count_pages(paginator.paginate(**params), projection))
+        except Exception as e:
+            result = region_result(service, Counter())
+            failure = region_failure(region, e)
+            result['error'], result['error_category'] = failure['message'], failure['category']
+            return result
+
+    @staticmethod
+    def merge(service: str, regions: List[str], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-region results into totals with per-state and per-region breakdowns"""
+        states = Counter()
+        for result in results:
+            states.update(result.get('states', {}))
+
+        summary = {
+            'count': sum(r['count'] for r in results),
+            'regions': {region: r['count'] for region, r in zip(regions, results) if r['count']},
+        }
+        if service == 'ec2':
+            summary['running'] = states.get('running', 0)
+            summary['stopped'] = states.get('stopped', 0)
+        if service in ('ec2', 'rds'):
+            summary['states'] = dict(states)
+
+        # Denied regions are reported but, as before, not flagged as an error
+        errors = {}
+        for region, r in zip(regions, results):
+            if r.get('error_category'):
+                errors.setdefault(r['error_category'], []).append(region)
+        messages = [r['error'] for r in results if r['error'] and r.get('error_category') != 'denied']
+        if messages:
+            summary['error'] = "; ".join(messages)
+        if errors:
+            summary['errors'] = errors
+            summary['partial'] = any(category in errors for category in PARTIAL_CATEGORIES)
+        return summary
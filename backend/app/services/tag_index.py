@@ -0,0 +1,230 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.summary_engine import region_failure
+
+logger = logging.getLogger(__name__)
+
+# Seconds a region's tag data is reused before an incremental refresh re-reads it
+TAG_INDEX_TTL = int(os.getenv("TAG_INDEX_TTL", "900"))
+
+# Resource Groups Tagging API resource type per inventory service
+SERVICE_RESOURCE_TYPES = {
+    'ec2': 'ec2:instance',
+    'rds': 'rds:db',
+    'lambda': 'lambda:function',
+    's3': 's3',
+}
+
+
+def resource_type(arn: str) -> str:
+    """Tagging API resource type of an ARN, e.g. 'ec2:instance' or 's3'"""
+    parts = arn.split(':', 5)
+    if len(parts) < 6:
+        return ''
+    service, resource = parts[2], parts[5]
+    for separator in ('/', ':'):
+        if separator in resource:
+            return f"{service}:{resource.split(separator, 1)[0]}"
+    return service
+
+
+def _type_matches(arn_type: str, wanted: Optional[str]) -> bool:
+    return wanted is None or arn_type == wanted or arn_type.startswith(f"{wanted}:")
+
+
+class ScopeTagIndex:
+    """Inverted tag index of one caller scope: key -> value -> ARNs
+
+    Regions are the unit of refresh; replacing a region removes its previous
+    ARNs from the index before the new ones are added, so the index never
+    has to be rebuilt from scratch.
+    """
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self._resources: Dict[str, Tuple[str, str, Dict[str, str]]] = {}
+        self._index: Dict[str, Dict[str, Set[str]]] = {}
+        self._region_arns: Dict[str, Set[str]] = {}
+        self._region_as_of: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, arn: str):
+        entry = self._resources.pop(arn, None)
+        if entry is None:
+            return
+        region, _, tags = entry
+        self._region_arns.get(region, set()).discard(arn)
+        for key, value in tags.items():
+            arns = self._index.get(key, {}).get(value)
+            if arns is None:
+                continue
+            arns.discard(arn)
+            if not arns:
+                del self._index[key][value]
+                if not self._index[key]:
+                    del self._index[key]
+
+    def _add(self, arn: str, region: str, tags: Dict[str, str]):
+        self._resources[arn] = (region, resource_type(arn), tags)
+        self._region_arns.setdefault(region, set()).add(arn)
+        for key, value in tags.items():
+            self._index.setdefault(key, {}).setdefault(value, set()).add(arn)
+
+    def replace_region(self, region: str, resources: Iterable[Tuple[str, Dict[str, str]]], as_of: Optional[float] = None):
+        """Swap a region's (arn, tags) pairs for a fresh listing"""
+        with self._lock:
+            for arn in list(self._region_arns.get(region, ())):
+                self._remove(arn)
+            for arn, tags in resources:
+                self._add(arn, region, tags)
+            self._region_as_of[region] = as_of or time.time()
+
+    def update_resource(self, arn: str, region: str, tags: Optional[Dict[str, str]]):
+        """Replace one resource's tags; None drops the resource"""
+        with self._lock:
+            self._remove(arn)
+            if tags is not None:
+                self._add(arn, region, tags)
+
+    def patch_tags(self, arn: str, set_tags: Optional[Dict[str, str]] = None, remove_keys: Iterable[str] = ()) -> bool:
+        """Add or overwrite some tags of an indexed resource and drop others
+
+        Returns False when the resource is not indexed, since its other tags
+        are then unknown.
+        """
+        with self._lock:
+            entry = self._resources.get(arn)
+            if entry is None:
+                return False
+            region, _, tags = entry
+            tags = {**tags, **(set_tags or {})}
+            for key in remove_keys:
+                tags.pop(key, None)
+            self._remove(arn)
+            self._add(arn, region, tags)
+            return True
+
+    def expire_region(self, region: str):
+        """Make a region stale so the next refresh re-reads it"""
+        with self._lock:
+            if region in self._region_as_of:
+                self._region_as_of[region] = 0
+
+    def stale_regions(self, regions: List[str], ttl: int) -> List[str]:
+        """Regions never indexed or indexed more than ttl seconds ago"""
+        cutoff = time.time() - ttl
+        with self._lock:
+            return [r for r in regions if self._region_as_of.get(r, 0) < cutoff]
+
+    def as_of(self) -> Optional[float]:
+        """Time of the oldest indexed region"""
+        with self._lock:
+            return min(self._region_as_of.values()) if self._region_as_of else None
+
+    def keys(self, resource_type_filter: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Every tag key with its resource and distinct value counts"""
+        with self._lock:
+            result = {}
+            for key, values in self._index.items():
+                counts = {
+                    value: sum(1 for arn in arns if _type_matches(self._resources[arn][1], resource_type_filter))
+                    for value, arns in values.items()
+                }
+                counts = {value: n for value, n in counts.items() if n}
+                if counts:
+                    result[key] = {'resources': sum(counts.values()), 'values': len(counts)}
+            return result
+
+    def values(self, key: str, resource_type_filter: Optional[str] = None) -> Dict[str, int]:
+        """Values of one tag key with the number of resources carrying each"""
+        with self._lock:
+            counts = {
+                value: sum(1 for arn in arns if _type_matches(self._resources[arn][1], resource_type_filter))
+                for value, arns in self._index.get(key, {}).items()
+            }
+        return {value: n for value, n in counts.items() if n}
+
+    def resources(self, key: str, value: Optional[str] = None, missing: bool = False,
+                  resource_type_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Resources carrying key (optionally =value), or lacking key when missing is set"""
+        with self._lock:
+            if missing:
+                tagged = set().union(*self._index.get(key, {}).values()) if key in self._index else set()
+                arns = [arn for arn in self._resources if arn not in tagged]
+            elif value is not None:
+                arns = list(self._index.get(key, {}).get(value, ()))
+            else:
+                arns = [arn for arns in self._index.get(key, {}).values() for arn in arns]
+            return sorted(
+                ({'arn': arn, 'region': self._resources[arn][0], 'resource_type': self._resources[arn][1], 'tags': dict(self._resources[arn][2])}
+                 for arn in arns if _type_matches(self._resources[arn][1], resource_type_filter)),
+                key=lambda r: r['arn'],
+            )
+
+    def resource_types(self) -> Dict[str, int]:
+        """Number of indexed resources per resource type"""
+        with self._lock:
+            return dict(Counter(entry[1] for entry in self._resources.values()))
+
+
+class TagIndex:
+    """Process-wide tag indexes keyed by caller scope"""
+
+    def __init__(self, ttl: int = TAG_INDEX_TTL):
+        """Initialize with the per-region refresh TTL"""
+        self.ttl = ttl
+        self._scopes: Dict[str, ScopeTagIndex] = {}
+        self._lock = threading.Lock()
+
+    def scope(self, scope: str) -> ScopeTagIndex:
+        """Index of one scope, created on first use"""
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None:
+                index = self._scopes[scope] = ScopeTagIndex()
+            return index
+
+    def existing(self, scope: str) -> Optional[ScopeTagIndex]:
+        """Index of one scope, or None when it has never been built"""
+        with self._lock:
+            return self._scopes.get(scope)
+
+    def account_scopes(self, account_scope: str) -> List[str]:
+        """Indexed scopes belonging to an account scope: the account's own and its callers'"""
+        with self._lock:
+            return [scope for scope in self._scopes if scope == account_scope or scope.startswith(f"{account_scope}:")]
+
+    def invalidate(self, scope: Optional[str] = None):
+        """Drop one scope, or everything when no scope is given"""
+        with self._lock:
+            if scope is None:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope, None)
+
+
+def collect_region_tags(client_factory: Callable[[str, str], Any], region: str) -> Tuple[List[Tuple[str, Dict[str, str]]], Optional[Dict[str, str]]]:
+    """Page through the Tagging API in one region
+
+    Returns (arn, tags) pairs for every resource the API reports in that
+    region, and the region's failure (if any).
+    """
+    resources = []
+    try:
+        paginator = client_factory('resourcegroupstaggingapi', region).get_paginator('get_resources')
+        for page in paginator.paginate(ResourcesPerPage=100):
+            for mapping in page.get('ResourceTagMappingList', []):
+                tags = {tag['Key']: tag['Value'] for tag in mapping.get('Tags', [])}
+                resources.append((mapping['ResourceARN'], tags))
+    except Exception as e:
+        return resources, region_failure(region, e)
+    return resources, None
+
+
+# Process-wide tag index
+tag_index = TagIndex()
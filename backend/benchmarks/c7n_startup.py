@@ -0,0 +1,95 @@
+"""
+Compare per-run startup of the custodian CLI with the warm c7n engine.
+
+Each CLI run starts an interpreter, imports c7n and loads the resource
+types its policies use before making any AWS call. This times
+`custodian validate` on a policy, which pays exactly that startup and
+stops before touching AWS, against the same load-and-validate request sent
+to a warm engine worker. The worker's one-time warm-up is reported
+separately.
+
+Usage:
+    python -m benchmarks.c7n_startup --rounds 5
+    python -m benchmarks.c7n_startup --policy my-policies.yml
+
+Run from the backend directory with c7n installed. No AWS access is needed.
+"""
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+import yaml
+
+from app.services.c7n_engine import C7nEngine
+
+# Minimal valid policy used when no --policy is given
+PROBE_POLICY = {'policies': [{'name': 'startup-probe', 'resource': 'aws.ec2', 'filters': [{'State.Name': 'running'}]}]}
+
+
+def time_cli(policy_file: str, rounds: int):
+    """Wall-clock seconds of each `custodian validate` run"""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        subprocess.run(['custodian', 'validate', policy_file], check=True, capture_output=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def time_engine(policy_file: str, rounds: int):
+    """(worker warm-up seconds, seconds of each validate request on the warm worker)"""
+    with open(policy_file) as f:
+        policies = yaml.safe_load(f)
+    engine = C7nEngine(workers=1)
+    output_dir = tempfile.mkdtemp(prefix='c7n-startup-')
+    request = {
+        'op': 'validate',
+        'policies': policies,
+        'credentials': {'access_key': 'AKIDEXAMPLE', 'secret_key': 'example', 'session_token': None},
+        'region': 'us-east-1',
+        'account_id': '123456789012',
+        'output_dir': output_dir,
+    }
+    try:
+        # The first request waits for the worker to import c7n
+        response = engine.run(request)
+        if not response['success']:
+            raise SystemExit(f"Engine could not load {policy_file}: {response.get('error')}")
+        warm_seconds = engine.stats()['worker_warm_seconds']
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            engine.run(request)
+            timings.append(time.perf_counter() - started)
+        return warm_seconds, timings
+    finally:
+        engine.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policy", help="Policy file to load (default: a one-filter aws.ec2 policy)")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed runs per path (median is reported)")
+    args = parser.parse_args()
+
+    policy_file = args.policy
+    if policy_file is None:
+        with tempfile.NamedTemporaryFile('w', suffix='.yml', delete=False) as f:
+            yaml.safe_dump(PROBE_POLICY, f)
+            policy_file = f.name
+
+    cli = statistics.median(time_cli(policy_file, args.rounds))
+    warm_seconds, timings = time_engine(policy_file, args.rounds)
+    engine = statistics.median(timings)
+
+    print(f"policy file:               {args.policy or 'built-in aws.ec2 probe'}")
+    print(f"custodian CLI per run:     {cli * 1000:9.1f} ms")
+    print(f"warm engine per run:       {engine * 1000:9.1f} ms")
+    print(f"startup saved per run:     {(cli - engine) * 1000:9.1f} ms ({cli / engine:.0f}x)")
+    print(f"one-time worker warm-up:   {warm_seconds * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
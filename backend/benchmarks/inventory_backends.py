@@ -0,0 +1,78 @@
+"""
+Compare the thread and async inventory backends against a local moto server.
+
+Usage:
+    pip install "moto[server]" aiobotocore
+    moto_server -p 5000 &
+    AWS_ENDPOINT_URL=http://localhost:5000 python -m benchmarks.inventory_backends --seed 500 --rounds 5
+
+Run from the backend directory so the `app` package is importable.
+"""
+import os
+import time
+import asyncio
+import argparse
+
+import boto3
+
+from app.schemas.aws import AWSCredentials
+from app.services import async_inventory as async_inventory_module
+from app.services.aws_service import AWSService
+
+CREDENTIALS = AWSCredentials(access_key="testing", secret_key="testing", region="us-east-1")
+
+
+def seed(endpoint_url: str, count: int, regions):
+    """Create EC2 instances in each region of the mock account"""
+    for region in regions:
+        ec2 = boto3.client(
+            "ec2",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            aws_access_key_id=CREDENTIALS.access_key,
+            aws_secret_access_key=CREDENTIALS.secret_key,
+        )
+        remaining = count
+        while remaining > 0:
+            batch = min(remaining, 100)
+            ec2.run_instances(ImageId="ami-12c6146b", MinCount=batch, MaxCount=batch, InstanceType="t3.micro")
+            remaining -= batch
+
+
+async def run_rounds(backend: str, rounds: int):
+    """Time get_resource_summary and get_resources('ec2') for one backend"""
+    async_inventory_module.INVENTORY_BACKEND = backend
+    service = AWSService(CREDENTIALS)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await asyncio.gather(service.get_resource_summary(), service.get_resources("ec2"))
+        timings.append(time.perf_counter() - started)
+    await async_inventory_module.async_inventory.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="EC2 instances to create per region before timing")
+    parser.add_argument("--regions", default="us-east-1,us-west-2,eu-west-1", help="Regions to seed")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per backend")
+    args = parser.parse_args()
+
+    endpoint_url = os.getenv("AWS_ENDPOINT_URL")
+    if not endpoint_url:
+        parser.error("AWS_ENDPOINT_URL must point at a moto server")
+
+    if args.seed:
+        seed(endpoint_url, args.seed, args.regions.split(","))
+
+    for backend in ("thread", "async"):
+        if backend == "async" and not async_inventory_module.AIOBOTOCORE_AVAILABLE:
+            print("async: skipped (aiobotocore not installed)")
+            continue
+        timings = asyncio.run(run_rounds(backend, args.rounds))
+        print(f"{backend}: best {min(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s over {len(timings)} rounds")
+
+
+if __name__ == "__main__":
+    main()
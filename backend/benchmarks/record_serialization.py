@@ -0,0 +1,106 @@
+"""
+Compare dict and slotted inventory records on a synthetic large account.
+
+Builds EC2 records from generated describe_instances output, then reports
+the memory held by each representation and the time to serialize a
+/resources/ec2 response: FastAPI's default path (jsonable_encoder plus the
+stdlib encoder) against json_encoding.dumps.
+
+Usage:
+    python -m benchmarks.record_serialization --instances 100000 --rounds 3
+
+Run from the backend directory so the `app` package is importable. No AWS
+access is needed.
+"""
+import json
+import time
+import random
+import argparse
+import datetime
+import tracemalloc
+
+from app.services.inventory_records import ec2_record
+from app.services.json_encoding import ORJSON_AVAILABLE, dumps
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:
+    jsonable_encoder = None
+
+REGIONS = ["us-east-1", "us-west-2", "eu-west-1", "ap-southeast-2"]
+TYPES = ["t3.micro", "t3.large", "m5.xlarge", "c6g.2xlarge", "r5.4xlarge"]
+STATES = ["running", "stopped", "pending"]
+
+
+def synthetic_instances(count: int):
+    """Generate (describe_instances instance, region) pairs"""
+    rng = random.Random(42)
+    launched = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    for i in range(count):
+        instance = {
+            "InstanceId": f"i-{i:017x}",
+            "InstanceType": rng.choice(TYPES),
+            "State": {"Name": rng.choice(STATES)},
+            "PrivateIpAddress": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+            "LaunchTime": launched + datetime.timedelta(minutes=i),
+            "Tags": [
+                {"Key": "Name", "Value": f"web-{i}"},
+                {"Key": "team", "Value": rng.choice(["core", "data", "platform"])},
+                {"Key": "env", "Value": rng.choice(["prod", "staging", "dev"])},
+            ],
+        }
+        if rng.random() < 0.3:
+            instance["PublicIpAddress"] = f"52.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        yield instance, REGIONS[i % len(REGIONS)]
+
+
+def measure(build):
+    """Traced memory (bytes) still held once build() has returned its result"""
+    tracemalloc.start()
+    result = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held
+
+
+def best_time(fn, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def fastapi_default(records):
+    """What a route returning a dict costs: jsonable_encoder, then json.dumps"""
+    content = {"instances": records}
+    if jsonable_encoder is not None:
+        content = jsonable_encoder(content)
+    return json.dumps(content, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=100000, help="EC2 instances in the synthetic account")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed rounds per encoder (best is reported)")
+    args = parser.parse_args()
+
+    instances = list(synthetic_instances(args.instances))
+    slotted, slotted_bytes = measure(lambda: [ec2_record(i, region) for i, region in instances])
+    # Built from the raw instances too, so neither list shares the other's values
+    dicts, dict_bytes = measure(lambda: [ec2_record(i, region).to_dict() for i, region in instances])
+
+    print(f"{args.instances} EC2 records")
+    print(f"memory: dict {dict_bytes / 2**20:.1f} MiB, slotted {slotted_bytes / 2**20:.1f} MiB "
+          f"({(1 - slotted_bytes / dict_bytes) * 100:.0f}% less)")
+
+    baseline = best_time(lambda: fastapi_default(dicts), args.rounds)
+    fast = best_time(lambda: dumps({"instances": slotted}), args.rounds)
+    encoder = "orjson" if ORJSON_AVAILABLE else "stdlib fallback"
+    path = "jsonable_encoder + json" if jsonable_encoder is not None else "json (fastapi not installed)"
+    print(f"serialize: {path} {baseline * 1000:.0f} ms, dumps/{encoder} {fast * 1000:.0f} ms ({baseline / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
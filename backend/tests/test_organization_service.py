@@ -0,0 +1,118 @@
+import asyncio
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+mock_aws = pytest.importorskip("moto").mock_aws
+
+from app.schemas.aws import AWSCredentials
+from app.services import organization_service
+from app.services.assume_role_pool import AssumeRolePool, assume_role_pool
+from app.services.client_pool import client_pool
+from app.services.organization_service import OrganizationService
+from app.services.region_cache import region_cache
+from app.services.session_service import credentials_fingerprint, identity_cache
+
+HUB_ACCOUNT = '123456789012'
+ROLE_NAME = 'OrganizationAccountAccessRole'
+IMAGE_ID = 'ami-12c6146b'
+
+
+def credentials_of(session_credentials: AWSCredentials) -> dict:
+    return {
+        'aws_access_key_id': session_credentials.access_key,
+        'aws_secret_access_key': session_credentials.secret_key,
+        'aws_session_token': session_credentials.session_token,
+        'region_name': 'us-east-1',
+    }
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    monkeypatch.setattr(region_cache, 'allowlist', ['us-east-1'])
+    with mock_aws():
+        credentials = AWSCredentials(access_key='AKIAHUBEXAMPLE', secret_key='hub-secret', region='us-east-1')
+        yield credentials
+        # Pooled clients and sessions must not outlive the mock
+        assume_role_pool.invalidate()
+        client_pool.evict(credentials)
+        identity_cache.invalidate()
+
+
+@pytest.fixture
+def organization(hub):
+    """Member account IDs of an organization managed by the hub account"""
+    org = boto3.client('organizations', **credentials_of(hub))
+    org.create_organization(FeatureSet='ALL')
+    members = []
+    for name in ('dev', 'prod'):
+        org.create_account(AccountName=name, Email=f"{name}@example.com")
+    for account in org.list_accounts()['Accounts']:
+        if account['Id'] != HUB_ACCOUNT:
+            members.append(account['Id'])
+    return members
+
+
+def run_instance(credentials: AWSCredentials):
+    boto3.client('ec2', **credentials_of(credentials)).run_instances(ImageId=IMAGE_ID, MinCount=1, MaxCount=1)
+
+
+def role_arn(account_id: str) -> str:
+    return f"arn:aws:iam::{account_id}:role/{ROLE_NAME}"
+
+
+def test_inventory_tags_records_with_their_account(hub, organization):
+    run_instance(hub)
+    for account_id in organization:
+        run_instance(assume_role_pool.credentials(hub, role_arn(account_id)))
+
+    service = OrganizationService(hub, role_name=ROLE_NAME)
+    response = asyncio.run(service.get_resources('ec2'))
+
+    assert 'errors' not in response
+    accounts = sorted(record['account_id'] for record in response['instances'])
+    assert accounts == sorted([HUB_ACCOUNT] + organization)
+
+
+def test_failing_role_is_reported_without_failing_the_others(hub, organization, monkeypatch):
+    denied, reachable = organization
+    run_instance(assume_role_pool.credentials(hub, role_arn(reachable)))
+    assume = assume_role_pool.credentials
+
+    def credentials(hub_credentials, arn, external_id=None):
+        if arn == role_arn(denied):
+            raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'not authorized'}}, 'AssumeRole')
+        return assume(hub_credentials, arn, external_id)
+
+    monkeypatch.setattr(organization_service.assume_role_pool, 'credentials', credentials)
+    service = OrganizationService(hub, role_arns=[role_arn(denied), role_arn(reachable)])
+    response = asyncio.run(service.get_resources('ec2'))
+
+    assert [record['account_id'] for record in response['instances']] == [reachable]
+    assert response['errors'] == [{'account_id': denied, 'category': 'denied', 'message': response['errors'][0]['message']}]
+    assert 'AccessDenied' in response['errors'][0]['message']
+    # Denied accounts are an expected gap, not a partial result
+    assert response['partial'] is False
+
+    summary = asyncio.run(service.get_resource_summary())
+    assert list(summary['accounts']) == [reachable]
+    assert summary['errors'][0]['account_id'] == denied
+
+
+def test_sessions_are_reused_until_the_refresh_margin(hub, organization):
+    pool = AssumeRolePool(duration=900, refresh_margin=300)
+    arn = role_arn(organization[0])
+
+    first = pool.credentials(hub, arn)
+    assert pool.credentials(hub, arn) is first
+    assert pool.size() == 1
+    # The assumed identity is known without another STS call
+    assert identity_cache.get(credentials_fingerprint(first))['account'] == organization[0]
+
+    # Within the margin of expiring, the role is assumed again
+    pool.refresh_margin = 900 + 60
+    renewed = pool.credentials(hub, arn)
+    assert renewed is not first
+    assert renewed.access_key != first.access_key
+    assert pool.size() == 1
@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.rate_limiter import (
+    AWS_MAX_ATTEMPTS,
+    AdaptiveTokenBucket,
+    RateLimiter,
+    RetryBudget,
+    RetryBudgetExhausted,
+    current_retry_budget,
+    error_category,
+)
+
+
+class FakeEvents:
+    """Records the handlers a client is instrumented with"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, event_name, handler):
+        self.handlers[event_name] = handler
+
+
+def fake_client(service='ec2'):
+    return SimpleNamespace(meta=SimpleNamespace(service_model=SimpleNamespace(service_name=service), events=FakeEvents()))
+
+
+def response(status=200, code=None):
+    parsed = {'Error': {'Code': code}} if code else {}
+    return SimpleNamespace(status_code=status), parsed
+
+
+OPERATION = SimpleNamespace(name='DescribeInstances')
+
+
+def test_bucket_halves_on_throttle_down_to_the_floor():
+    bucket = AdaptiveTokenBucket(rate=8, min_rate=1, burst=2)
+    for expected in (4, 2, 1, 1):
+        bucket.on_throttle()
+        assert bucket.rate == expected
+    assert bucket.throttled == 4
+
+
+def test_bucket_recovers_to_its_maximum_on_success():
+    bucket = AdaptiveTokenBucket(rate=8, min_rate=1, burst=2)
+    bucket.on_throttle()
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(4.4)
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 8
+
+
+def test_bucket_waits_once_the_burst_is_spent():
+    bucket = AdaptiveTokenBucket(rate=10, min_rate=1, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+
+def test_throttle_drains_the_burst():
+    bucket = AdaptiveTokenBucket(rate=10, min_rate=1, burst=5)
+    bucket.on_throttle()
+    assert bucket.reserve() == pytest.approx(1 / 5, abs=0.01)
+
+
+def test_retry_budget_is_spent_once():
+    budget = RetryBudget(2)
+    assert budget.consume()
+    assert budget.consume()
+    assert not budget.consume()
+
+
+def test_throttled_responses_slow_the_operation_bucket():
+    limiter = RateLimiter()
+    client = fake_client()
+    limiter.instrument(client, lambda: '123456789012', 'us-east-1')
+    needs_retry = client.meta.events.handlers['needs-retry']
+
+    needs_retry(response=response(400, 'Throttling'), operation=OPERATION, attempts=1)
+    bucket = limiter.bucket(('123456789012', 'us-east-1', 'ec2', 'DescribeInstances'))
+    assert bucket.throttled == 1
+    assert bucket.rate == bucket.max_rate / 2
+
+    needs_retry(response=response(200), operation=OPERATION, attempts=1)
+    assert bucket.rate > bucket.max_rate / 2
+    assert limiter.stats()['throttled'][0]['operation'] == 'DescribeInstances'
+
+
+def test_retries_raise_once_the_request_budget_is_spent():
+    limiter = RateLimiter()
+    client = fake_client()
+    limiter.instrument(client, lambda: '123456789012', 'us-east-1')
+    needs_retry = client.meta.events.handlers['needs-retry']
+
+    budget = RetryBudget(1)
+    token = current_retry_budget.set(budget)
+    try:
+        assert needs_retry(response=response(400, 'Throttling'), operation=OPERATION, attempts=1) is None
+        with pytest.raises(RetryBudgetExhausted) as raised:
+            needs_retry(response=response(400, 'Throttling'), operation=OPERATION, attempts=2)
+        assert raised.value.code == 'Throttling'
+        assert error_category(raised.value) == 'throttled'
+
+        # The last attempt is not retried, so it draws nothing from the budget
+        assert needs_retry(response=response(400, 'Throttling'), operation=OPERATION, attempts=AWS_MAX_ATTEMPTS) is None
+    finally:
+        current_retry_budget.reset(token)
+
+
+def test_retries_outside_a_request_are_not_budgeted():
+    limiter = RateLimiter()
+    client = fake_client()
+    limiter.instrument(client, lambda: '123456789012', 'us-east-1')
+    needs_retry = client.meta.events.handlers['needs-retry']
+
+    for attempt in range(1, AWS_MAX_ATTEMPTS):
+        assert needs_retry(response=response(503), operation=OPERATION, attempts=attempt) is None
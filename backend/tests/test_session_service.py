@@ -0,0 +1,30 @@
+from app.schemas.aws import AWSCredentials
+from app.services import session_service
+from app.services.session_service import credentials_fingerprint, resolve_scopes
+
+CREDENTIALS = AWSCredentials(access_key='AKIAEXAMPLE', secret_key='secret', region='cn-north-1')
+
+
+def test_scopes_come_from_one_identity_lookup(monkeypatch):
+    calls = []
+
+    def identity(credentials):
+        calls.append(credentials)
+        return {'account': '123456789012', 'arn': 'arn:aws-cn:iam::123456789012:user/alice', 'user_id': 'AIDA'}
+
+    monkeypatch.setattr(session_service, 'get_caller_identity', identity)
+    account_scope, scope = resolve_scopes(CREDENTIALS)
+
+    assert len(calls) == 1
+    assert account_scope == '123456789012:aws-cn'
+    assert scope == '123456789012:aws-cn:arn:aws-cn:iam::123456789012:user/alice'
+
+
+def test_unresolved_identity_falls_back_to_the_fingerprint(monkeypatch):
+    def identity(credentials):
+        raise RuntimeError("no network")
+
+    monkeypatch.setattr(session_service, 'get_caller_identity', identity)
+    fingerprint = credentials_fingerprint(CREDENTIALS)
+
+    assert resolve_scopes(CREDENTIALS) == (f"{fingerprint}:aws-cn", f"{fingerprint}:aws-cn:{fingerprint}")
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class Gated:
+    """Coroutine function that counts calls and blocks until released"""
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_result():
+    async def scenario():
+        flights = SingleFlight()
+        fn = Gated(result={'count': 1})
+        first = asyncio.ensure_future(flights.do('key', fn))
+        second = asyncio.ensure_future(flights.do('key', fn))
+        await asyncio.sleep(0)
+        assert flights.in_flight() == 1
+        fn.release.set()
+        results = await asyncio.gather(first, second)
+        assert fn.calls == 1
+        assert results[0] is results[1]
+        assert flights.in_flight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_callers_share_one_exception():
+    async def scenario():
+        flights = SingleFlight()
+        fn = Gated(error=ValueError("boom"))
+        first = asyncio.ensure_future(flights.do('key', fn))
+        second = asyncio.ensure_future(flights.do('key', fn))
+        await asyncio.sleep(0)
+        fn.release.set()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert fn.calls == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert results[0] is results[1]
+
+    asyncio.run(scenario())
+
+
+def test_distinct_keys_run_separately():
+    async def scenario():
+        flights = SingleFlight()
+        fn = Gated(result='done')
+        fn.release.set()
+        await asyncio.gather(flights.do('a', fn), flights.do('b', fn))
+        assert fn.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_one_waiter_keeps_the_computation():
+    async def scenario():
+        flights = SingleFlight()
+        fn = Gated(result='done')
+        first = asyncio.ensure_future(flights.do('key', fn))
+        second = asyncio.ensure_future(flights.do('key', fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert not fn.cancelled
+        fn.release.set()
+        assert await second == 'done'
+        assert fn.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_last_waiter_cancels_the_computation():
+    async def scenario():
+        flights = SingleFlight()
+        fn = Gated(result='done')
+        first = asyncio.ensure_future(flights.do('key', fn))
+        second = asyncio.ensure_future(flights.do('key', fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        # Let the cancellation reach the shared task
+        await asyncio.sleep(0)
+        assert fn.cancelled
+        assert flights.in_flight() == 0
+
+        # A later caller starts a fresh computation
+        fn.release.set()
+        assert await flights.do('key', fn) == 'done'
+        assert fn.calls == 2
+
+    asyncio.run(scenario())
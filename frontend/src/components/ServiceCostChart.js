@@ -10,15 +10,17 @@ import {
 // Removed unused imports: PieChart, Pie, Cell
 // Removed unused constant: COLORS
 
-const ServiceCostChart = ({ service, title }) => {
-  const [costData, setCostData] = useState({});
+const ServiceCostChart = ({ service, title, data }) => {
+  const [fetchedData, setCostData] = useState({});
   const [isLoading, setIsLoading] = useState(false);
   const [activePeriod, setActivePeriod] = useState('1m');
   const { credentials } = useAWSCredentials();
+  // Cost data passed in by the parent (batch request) takes precedence
+  const costData = data || fetchedData;
   
   useEffect(() => {
     const fetchCostData = async () => {
-      if (!credentials) return;
+      if (!credentials || data) return;
       
       setIsLoading(true);
       try {
@@ -33,7 +35,7 @@ const ServiceCostChart = ({ service, title }) => {
     };
     
     fetchCostData();
-  }, [service, credentials, activePeriod]);
+  }, [service, credentials, activePeriod, data]);
   
   const formatCurrency = (value) => {
     return new Intl.NumberFormat('en-US', {
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAWSCredentials } from '../context/AWSCredentialsContext';
 // Removed unused import: useSSOAuth
-import { getResourceSummary } from '../services/api';
+import { getResourceSummary, streamResourceSummary } from '../services/api';
 import SSOStatus from '../components/SSOStatus';
 import { toast } from 'react-toastify';
 import { Bar } from 'react-chartjs-2';
@@ -37,10 +37,24 @@ const Dashboard = () => {
       
       setIsLoading(true);
       setError(null);
+      setSummary({});
       
       try {
-        const data = await getResourceSummary(credentials);
-        setSummary(data);
+        // Render each region's counts as soon as they arrive
+        const finalSummary = await streamResourceSummary(credentials, (event) => {
+          if (event.type !== 'region') return;
+          setIsLoading(false);
+          setSummary(prev => {
+            const current = prev[event.service] || { count: 0, running: 0, stopped: 0 };
+            const next = { ...current, count: (current.count || 0) + event.count };
+            if (event.service === 'ec2' && event.states) {
+              next.running = (current.running || 0) + (event.states.running || 0);
+              next.stopped = (current.stopped || 0) + (event.states.stopped || 0);
+            }
+            return { ...prev, [event.service]: next };
+          });
+        });
+        setSummary(finalSummary || await getResourceSummary(credentials));
       } catch (err) {
         setError(err.message || 'Failed to fetch resource summary');
         toast.error(`Error fetching resource summary: ${err.message}`);
@@ -52,13 +66,16 @@ const Dashboard = () => {
     fetchSummary();
   }, [credentials]);
 
+  // Service entries only (the summary also carries metadata such as as_of)
+  const services = Object.entries(summary).filter(([, data]) => data && typeof data === 'object');
+
   // Prepare chart data
   const chartData = {
-    labels: Object.keys(summary).map(key => key.toUpperCase()),
+    labels: services.map(([key]) => key.toUpperCase()),
     datasets: [
       {
         label: 'Resources Count',
-        data: Object.values(summary).map(val => val.count || 0),
+        data: services.map(([, val]) => val.count || 0),
         backgroundColor: 'rgba(54, 162, 235, 0.5)',
         borderColor: 'rgba(54, 162, 235, 1)',
         borderWidth: 1,
@@ -142,7 +159,7 @@ const Dashboard = () => {
 
             {/* Resource cards */}
             <div className="grid grid-cols-1 gap-5 sm:grid-cols-2 lg:grid-cols-3">
-              {Object.entries(summary).map(([service, data]) => (
+              {services.map(([service, data]) => (
                 <div key={service} className="bg-white overflow-hidden shadow rounded-lg">
                   <div className="px-4 py-5 sm:p-6">
                     <div className="flex items-center">
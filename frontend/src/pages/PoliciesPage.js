@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { getPolicies, getPolicyCategories } from '../services/api';
+import { useAWSCredentials } from '../context/AWSCredentialsContext';
+import { getPolicies, getPolicyCategories, runPolicyBatch, dryRunPolicyBatch } from '../services/api';
 import { toast } from 'react-toastify';
 import { 
   ShieldCheckIcon, 
@@ -9,6 +10,7 @@ import {
 } from '@heroicons/react/24/outline';
 
 const PoliciesPage = () => {
+  const { credentials } = useAWSCredentials();
   const [isLoading, setIsLoading] = useState(true);
   const [policies, setPolicies] = useState([]);
   const [categories, setCategories] = useState([]);
@@ -18,6 +20,11 @@ const PoliciesPage = () => {
   const [selectedCategory, setSelectedCategory] = useState('all');
   const [searchQuery, setSearchQuery] = useState('');
   
+  // Batch run of the policies currently shown
+  const [batchMode, setBatchMode] = useState(null);
+  const [batchStatus, setBatchStatus] = useState(null);
+  const [batchResult, setBatchResult] = useState(null);
+  
   useEffect(() => {
     const fetchPolicies = async () => {
       setIsLoading(true);
@@ -52,6 +59,45 @@ const PoliciesPage = () => {
     return matchesCategory && matchesSearch;
   });
   
+  const handleRunBatch = async (dryrun) => {
+    if (!credentials) {
+      toast.error('No AWS credentials available. Please log in again.');
+      return;
+    }
+    if (!dryrun && !window.confirm(`Run ${filteredPolicies.length} policies, including their actions?`)) {
+      return;
+    }
+    
+    setBatchMode(dryrun ? 'dryrun' : 'run');
+    setBatchStatus(null);
+    setBatchResult(null);
+    
+    try {
+      // The shown policies run as one job, sharing resource queries per type
+      const selection = { policyIds: filteredPolicies.map(policy => policy.id) };
+      const onStatus = (job) => setBatchStatus(job.status);
+      const result = dryrun
+        ? await dryRunPolicyBatch(selection, credentials, onStatus)
+        : await runPolicyBatch(selection, credentials, onStatus);
+      
+      setBatchResult(result);
+      if (result.success) {
+        toast.success(`Batch ${dryrun ? 'dry run' : 'execution'} completed successfully!`);
+      } else {
+        toast.error(`Batch ${dryrun ? 'dry run' : 'execution'} failed: ${result.message}`);
+      }
+    } catch (err) {
+      toast.error(`Error ${dryrun ? 'dry running' : 'running'} policies: ${err.message}`);
+    } finally {
+      setBatchMode(null);
+    }
+  };
+  
+  const batchLabel = (mode, idle, busy) => {
+    if (batchMode !== mode) return idle;
+    return batchStatus === 'queued' ? 'Queued...' : busy;
+  };
+  
   // Group policies by category for display
   const policiesByCategory = filteredPolicies.reduce((acc, policy) => {
     if (!acc[policy.category]) {
@@ -70,8 +116,46 @@ const PoliciesPage = () => {
             Browse and run policies to manage your AWS resources.
           </p>
         </div>
+        <div className="mt-4 sm:mt-0 sm:flex sm:space-x-4">
+          <button
+            onClick={() => handleRunBatch(true)}
+            disabled={batchMode !== null || isLoading || filteredPolicies.length === 0}
+            className="inline-flex items-center px-4 py-2 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50"
+          >
+            {batchLabel('dryrun', `Dry Run Shown (${filteredPolicies.length})`, 'Dry Running...')}
+          </button>
+          <button
+            onClick={() => handleRunBatch(false)}
+            disabled={batchMode !== null || isLoading || filteredPolicies.length === 0}
+            className="inline-flex items-center px-4 py-2 border border-transparent shadow-sm text-sm font-medium rounded-md text-white bg-blue-600 hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50"
+          >
+            {batchLabel('run', `Run Shown (${filteredPolicies.length})`, 'Running...')}
+          </button>
+        </div>
       </div>
       
+      {/* Batch result */}
+      {batchResult && (
+        <div className="mt-6 bg-white shadow overflow-hidden sm:rounded-lg">
+          <div className="px-4 py-5 sm:px-6">
+            <h3 className="text-lg leading-6 font-medium text-gray-900">Batch Result</h3>
+            <p className="mt-1 text-sm text-gray-500">{batchResult.message}</p>
+          </div>
+          <ul className="border-t border-gray-200 divide-y divide-gray-200">
+            {(batchResult.policies || []).map((policyResult) => (
+              <li key={policyResult.policy_id} className="px-4 py-3 sm:px-6 flex items-center justify-between">
+                <span className="text-sm font-medium text-gray-900">{policyResult.policy_id}</span>
+                <span className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${policyResult.success ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'}`}>
+                  {policyResult.success
+                    ? `${policyResult.resources_count ?? 0} resources`
+                    : (policyResult.errors && policyResult.errors[0]) || policyResult.message || 'Failed'}
+                </span>
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+      
       {/* Filters */}
       <div className="mt-6 flex flex-col md:flex-row gap-4">
         <div className="md:w-1/3">
@@ -19,6 +19,7 @@ const PolicyRunPage = () => {
   const [isRunning, setIsRunning] = useState(false);
   const [isDryRunning, setIsDryRunning] = useState(false);
   const [result, setResult] = useState(null);
+  const [jobStatus, setJobStatus] = useState(null);
   const [error, setError] = useState(null);
   
   useEffect(() => {
@@ -55,11 +56,13 @@ const PolicyRunPage = () => {
     
     setError(null);
     setResult(null);
+    setJobStatus(null);
     
     try {
+      const onStatus = (job) => setJobStatus(job.status);
       const result = dryrun 
-        ? await dryRunPolicy(policyId, credentials)
-        : await runPolicy(policyId, credentials);
+        ? await dryRunPolicy(policyId, credentials, onStatus)
+        : await runPolicy(policyId, credentials, onStatus);
       
       setResult(result);
       
@@ -77,6 +80,7 @@ const PolicyRunPage = () => {
       } else {
         setIsRunning(false);
       }
+      setJobStatus(null);
     }
   };
   
@@ -128,14 +132,14 @@ const PolicyRunPage = () => {
             disabled={isDryRunning || isRunning}
             className="inline-flex items-center px-4 py-2 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50"
           >
-            {isDryRunning ? 'Dry Running...' : 'Dry Run'}
+            {isDryRunning ? (jobStatus === 'queued' ? 'Queued...' : 'Dry Running...') : 'Dry Run'}
           </button>
           <button
             onClick={() => handleRunPolicy(false)}
             disabled={isDryRunning || isRunning}
             className="inline-flex items-center px-4 py-2 border border-transparent shadow-sm text-sm font-medium rounded-md text-white bg-blue-600 hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-blue-500 disabled:opacity-50"
           >
-            {isRunning ? 'Running...' : 'Run Policy'}
+            {isRunning ? (jobStatus === 'queued' ? 'Queued...' : 'Running...') : 'Run Policy'}
           </button>
         </div>
       </div>
@@ -1,15 +1,70 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import { useNavigate } from 'react-router-dom';
+import { useAWSCredentials } from '../context/AWSCredentialsContext';
+import { streamResourceDetails } from '../services/api';
+import { toast } from 'react-toastify';
 
-// This is a placeholder component - in a real implementation,
-// you would fetch detailed information about the specific resource
-// and display it here.
+// Services the backend streams detail records for
+const STREAMED_SERVICES = ['ec2', 'rds', 'lambda'];
+
+const formatValue = (value) => {
+  if (value === null || value === undefined || value === '') return '-';
+  if (typeof value === 'object') return JSON.stringify(value, null, 2);
+  return String(value);
+};
 
 const ResourceDetailPage = () => {
   const { service, id } = useParams();
   const navigate = useNavigate();
-  
+  const { credentials } = useAWSCredentials();
+  const [resource, setResource] = useState(null);
+  const [regionsScanned, setRegionsScanned] = useState(0);
+  const [regionErrors, setRegionErrors] = useState([]);
+  const [isLoading, setIsLoading] = useState(STREAMED_SERVICES.includes(service));
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    if (!credentials || !STREAMED_SERVICES.includes(service)) return;
+    // Events arriving after navigating away are ignored
+    let active = true;
+
+    const fetchDetails = async () => {
+      setIsLoading(true);
+      setError(null);
+      setResource(null);
+      setRegionsScanned(0);
+      setRegionErrors([]);
+
+      try {
+        // Show the resource as soon as the region holding it reports,
+        // instead of waiting for every collection and region
+        await streamResourceDetails(service, credentials, (event) => {
+          if (!active || event.type !== 'records') return;
+          setRegionsScanned((count) => count + 1);
+          if (event.error) {
+            setRegionErrors((errors) => errors.concat(`${event.region}: ${event.error}`));
+          }
+          const match = event.records.find((record) => record.id === id || record.name === id);
+          if (match) {
+            setResource({ ...match, collection: event.collection });
+          }
+        });
+      } catch (err) {
+        if (!active) return;
+        setError(err.message || 'Failed to fetch resource details');
+        toast.error(`Error fetching ${service} details: ${err.message}`);
+      } finally {
+        if (active) setIsLoading(false);
+      }
+    };
+
+    fetchDetails();
+    return () => {
+      active = false;
+    };
+  }, [credentials, service, id]);
+
   return (
     <div className="px-4 sm:px-6 lg:px-8">
       <div className="sm:flex sm:items-center">
@@ -28,7 +83,19 @@ const ResourceDetailPage = () => {
           </button>
         </div>
       </div>
-      
+
+      {error && (
+        <div className="mt-6 rounded-md bg-red-50 p-4">
+          <p className="text-sm text-red-700">{error}</p>
+        </div>
+      )}
+
+      {isLoading && (
+        <p className="mt-6 text-sm text-gray-500">
+          {resource ? 'Found; still scanning remaining regions' : 'Searching regions'} ({regionsScanned} scanned)...
+        </p>
+      )}
+
       <div className="mt-6 bg-white shadow overflow-hidden sm:rounded-lg">
         <div className="px-4 py-5 sm:px-6">
           <h3 className="text-lg leading-6 font-medium text-gray-900">
@@ -53,29 +120,44 @@ const ResourceDetailPage = () => {
                 {service}
               </dd>
             </div>
-            <div className="py-4 sm:py-5 sm:grid sm:grid-cols-3 sm:gap-4 sm:px-6">
-              <dt className="text-sm font-medium text-gray-500">
-                Status
-              </dt>
-              <dd className="mt-1 text-sm text-gray-900 sm:mt-0 sm:col-span-2">
-                <span className="px-2 inline-flex text-xs leading-5 font-semibold rounded-full bg-green-100 text-green-800">
-                  Active
-                </span>
-              </dd>
-            </div>
+            {resource && Object.entries(resource)
+              .filter(([key]) => key !== 'id' && key !== 'name')
+              .map(([key, value]) => (
+                <div key={key} className="py-4 sm:py-5 sm:grid sm:grid-cols-3 sm:gap-4 sm:px-6">
+                  <dt className="text-sm font-medium text-gray-500">
+                    {key}
+                  </dt>
+                  <dd className="mt-1 text-sm text-gray-900 sm:mt-0 sm:col-span-2 whitespace-pre-wrap break-words">
+                    {formatValue(value)}
+                  </dd>
+                </div>
+              ))}
           </dl>
         </div>
       </div>
-      
-      <div className="mt-6 text-center py-12 bg-gray-50 rounded-lg">
-        <svg className="mx-auto h-12 w-12 text-gray-400" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-          <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z" />
-        </svg>
-        <h3 className="mt-2 text-sm font-medium text-gray-900">Resource details</h3>
-        <p className="mt-1 text-sm text-gray-500">
-          In a complete implementation, detailed information about this resource would be displayed here.
-        </p>
-      </div>
+
+      {regionErrors.length > 0 && (
+        <div className="mt-6 rounded-md bg-yellow-50 p-4">
+          <p className="text-sm font-medium text-yellow-800">Some regions could not be scanned:</p>
+          <ul className="mt-2 list-disc pl-5 text-sm text-yellow-700">
+            {regionErrors.map((message) => <li key={message}>{message}</li>)}
+          </ul>
+        </div>
+      )}
+
+      {!isLoading && !resource && !error && (
+        <div className="mt-6 text-center py-12 bg-gray-50 rounded-lg">
+          <svg className="mx-auto h-12 w-12 text-gray-400" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+            <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M9 12h6m-6 4h6m2 5H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z" />
+          </svg>
+          <h3 className="mt-2 text-sm font-medium text-gray-900">Resource details</h3>
+          <p className="mt-1 text-sm text-gray-500">
+            {STREAMED_SERVICES.includes(service)
+              ? `No ${service} resource named ${id} was found in any region.`
+              : `Detailed information is not available for ${service} resources.`}
+          </p>
+        </div>
+      )}
     </div>
   );
 };
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAWSCredentials } from '../context/AWSCredentialsContext';
-import { getResourceSummary } from '../services/api';
+import { getCosts, getResourceSummary } from '../services/api';
 import ServiceCostChart from '../components/ServiceCostChart';
 import { toast } from 'react-toastify';
 
@@ -11,6 +11,8 @@ const ServiceCostsPage = () => {
   const [serviceSummary, setServiceSummary] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [selectedServices, setSelectedServices] = useState(['ec2', 's3', 'rds']);
+  // Costs of every service from one batch request; null until loaded (charts fetch on their own if it fails)
+  const [costs, setCosts] = useState(null);
   const { credentials } = useAWSCredentials();
   
   useEffect(() => {
@@ -19,7 +21,14 @@ const ServiceCostsPage = () => {
       
       setIsLoading(true);
       try {
-        const result = await getResourceSummary(credentials);
+        const [result, costResult] = await Promise.all([
+          getResourceSummary(credentials),
+          getCosts(credentials).catch((error) => {
+            console.error("Error fetching batch cost data:", error);
+            return null;
+          })
+        ]);
+        setCosts(costResult ? costResult.services : null);
         
         // Convert the object to an array of services
         const servicesArray = Object.entries(result).map(([key, value]) => ({
@@ -96,6 +105,7 @@ const ServiceCostsPage = () => {
             <ServiceCostChart 
               key={serviceId}
               service={serviceId}
+              data={costs ? costs[serviceId] || {} : undefined}
               title={serviceOptions.find(s => s.id === serviceId)?.name || serviceId.toUpperCase()}
             />
           ))}
@@ -9,6 +9,8 @@ const apiClient = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // 304s are answered from etagCache below
+  validateStatus: status => (status >= 200 && status < 300) || status === 304,
 });
 
 // Add JWT token to requests if available
@@ -20,6 +22,33 @@ apiClient.interceptors.request.use(config => {
   return config;
 });
 
+// Last ETag and body per POST (browsers only revalidate GETs themselves), so
+// a poll whose data has not changed comes back as an empty 304
+const etagCache = new Map();
+
+apiClient.interceptors.request.use(config => {
+  if (config.method === 'post') {
+    const accessKey = (config.data && config.data.access_key) || '';
+    config.etagKey = `${config.url} ${JSON.stringify(config.params || {})} ${accessKey}`;
+    const cached = etagCache.get(config.etagKey);
+    if (cached) {
+      config.headers['If-None-Match'] = cached.etag;
+    }
+  }
+  return config;
+});
+
+apiClient.interceptors.response.use(response => {
+  const key = response.config.etagKey;
+  if (key && response.status === 304 && etagCache.has(key)) {
+    return { ...response, status: 200, data: etagCache.get(key).data };
+  }
+  if (key && response.headers.etag) {
+    etagCache.set(key, { etag: response.headers.etag, data: response.data });
+  }
+  return response;
+});
+
 // AWS Service API calls
 export const validateAWSCredentials = async (credentials) => {
   try {
@@ -55,7 +84,84 @@ export const getResourceSummary = async (credentials) => {
   }
 };
 
-export const getResources = async (service, credentials) => {
+// POST credentials to a streaming endpoint and hand each NDJSON event to onEvent
+const streamNdjson = async (path, credentials, onEvent, errorMessage) => {
+  const formattedCredentials = {
+    access_key: credentials.access_key || credentials.accessKey,
+    secret_key: credentials.secret_key || credentials.secretKey,
+    region: credentials.region || 'us-east-1',
+    session_token: credentials.session_token || credentials.sessionToken
+  };
+
+  const headers = { 'Content-Type': 'application/json' };
+  const token = localStorage.getItem('sso_token');
+  if (token) {
+    headers.Authorization = `Bearer ${token}`;
+  }
+
+  const response = await fetch(`${API_URL}${path}?format=ndjson`, {
+    method: 'POST',
+    headers,
+    body: JSON.stringify(formattedCredentials),
+  });
+  if (!response.ok || !response.body) {
+    let detail = errorMessage;
+    try {
+      detail = (await response.json()).detail || detail;
+    } catch (e) {
+      // Non-JSON error body
+    }
+    throw { message: detail, status: response.status };
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === 'error') {
+        throw { message: event.detail, status: 0 };
+      }
+      onEvent(event);
+    }
+  }
+};
+
+// Streams per-region summary events (NDJSON) and calls onEvent for each one.
+// Resolves with the final merged summary.
+export const streamResourceSummary = async (credentials, onEvent) => {
+  let summary = null;
+  await streamNdjson('/aws/resources/summary/stream', credentials, (event) => {
+    if (event.type === 'summary') {
+      summary = event.summary;
+    }
+    onEvent(event);
+  }, 'Failed to stream resource summary');
+  return summary;
+};
+
+// Streams detail records per collection and region; resolves with the accumulated details
+export const streamResourceDetails = async (service, credentials, onEvent = () => {}) => {
+  const details = {};
+  await streamNdjson(`/aws/resources/${service}/details/stream`, credentials, (event) => {
+    if (event.type === 'records') {
+      details[event.collection] = (details[event.collection] || []).concat(event.records);
+    }
+    onEvent(event);
+  }, `Failed to stream ${service} details`);
+  return details;
+};
+
+// Optional params: region, state, instance_type, tag_key, tag_value, engine,
+// runtime, sort, fields, cursor, limit, max_age
+export const getResources = async (service, credentials, params = {}) => {
   try {
     // Make sure credentials match the backend schema
     const formattedCredentials = {
@@ -65,7 +171,7 @@ export const getResources = async (service, credentials) => {
       session_token: credentials.session_token || credentials.sessionToken
     };
     
-    const response = await apiClient.post(`/aws/resources/${service}`, formattedCredentials);
+    const response = await apiClient.post(`/aws/resources/${service}`, formattedCredentials, { params });
     return response.data;
   } catch (error) {
     throw handleApiError(error);
@@ -111,6 +217,24 @@ export const getServiceCost = async (service, credentials, period = null) => {
   }
 };
 
+// Every service's cost periods from one request
+export const getCosts = async (credentials, params = {}) => {
+  try {
+    // Make sure credentials match the backend schema
+    const formattedCredentials = {
+      access_key: credentials.access_key || credentials.accessKey,
+      secret_key: credentials.secret_key || credentials.secretKey,
+      region: credentials.region || 'us-east-1',
+      session_token: credentials.session_token || credentials.sessionToken
+    };
+    
+    const response = await apiClient.post('/aws/cost', formattedCredentials, { params });
+    return response.data;
+  } catch (error) {
+    throw handleApiError(error);
+  }
+};
+
 // Enhanced AWS feature details
 export const getAwsFeatureDetails = async (service, credentials) => {
   try {
@@ -171,40 +295,104 @@ export const getAllPoliciesWithDetails = async () => {
 };
 
 // Custodian API calls
-export const runPolicy = async (policyId, credentials) => {
+const JOB_POLL_INTERVAL_MS = 2000;
+
+export const getJobStatus = async (jobId) => {
   try {
-    // Make sure credentials match the backend schema
-    const formattedCredentials = {
-      access_key: credentials.access_key || credentials.accessKey,
-      secret_key: credentials.secret_key || credentials.secretKey,
-      region: credentials.region || 'us-east-1',
-      session_token: credentials.session_token || credentials.sessionToken
-    };
-    
-    const response = await apiClient.post(`/custodian/run/${policyId}`, formattedCredentials);
+    const response = await apiClient.get(`/custodian/jobs/${jobId}`);
     return response.data;
   } catch (error) {
     throw handleApiError(error);
   }
 };
 
-export const dryRunPolicy = async (policyId, credentials) => {
+export const getJobResult = async (jobId) => {
   try {
-    // Make sure credentials match the backend schema
-    const formattedCredentials = {
-      access_key: credentials.access_key || credentials.accessKey,
-      secret_key: credentials.secret_key || credentials.secretKey,
-      region: credentials.region || 'us-east-1',
-      session_token: credentials.session_token || credentials.sessionToken
-    };
-    
-    const response = await apiClient.post(`/custodian/dryrun/${policyId}`, formattedCredentials);
+    const response = await apiClient.get(`/custodian/jobs/${jobId}/result`);
     return response.data;
   } catch (error) {
     throw handleApiError(error);
   }
 };
 
+// Poll a custodian job until it finishes, reporting each status, and return its result
+export const waitForJob = async (job, onStatus) => {
+  let current = job;
+  while (current.status === 'queued' || current.status === 'running') {
+    if (onStatus) onStatus(current);
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    current = await getJobStatus(current.job_id);
+  }
+  if (onStatus) onStatus(current);
+  return { ...(await getJobResult(current.job_id)), job_id: current.job_id };
+};
+
+const submitPolicyJob = async (path, credentials) => {
+  // Make sure credentials match the backend schema
+  const formattedCredentials = {
+    access_key: credentials.access_key || credentials.accessKey,
+    secret_key: credentials.secret_key || credentials.secretKey,
+    region: credentials.region || 'us-east-1',
+    session_token: credentials.session_token || credentials.sessionToken
+  };
+
+  const response = await apiClient.post(path, formattedCredentials);
+  return response.data;
+};
+
+export const runPolicy = async (policyId, credentials, onStatus) => {
+  try {
+    const job = await submitPolicyJob(`/custodian/run/${policyId}`, credentials);
+    return await waitForJob(job, onStatus);
+  } catch (error) {
+    throw handleApiError(error);
+  }
+};
+
+export const dryRunPolicy = async (policyId, credentials, onStatus) => {
+  try {
+    const job = await submitPolicyJob(`/custodian/dryrun/${policyId}`, credentials);
+    return await waitForJob(job, onStatus);
+  } catch (error) {
+    throw handleApiError(error);
+  }
+};
+
+// Run several policies as one job: { policyIds } or { category }, or neither for all policies
+const submitPolicyBatch = async (path, { policyIds, category } = {}, credentials) => {
+  const formattedCredentials = {
+    access_key: credentials.access_key || credentials.accessKey,
+    secret_key: credentials.secret_key || credentials.secretKey,
+    region: credentials.region || 'us-east-1',
+    session_token: credentials.session_token || credentials.sessionToken
+  };
+
+  const response = await apiClient.post(path, {
+    credentials: formattedCredentials,
+    policy_ids: policyIds,
+    category
+  });
+  return response.data;
+};
+
+export const runPolicyBatch = async (selection, credentials, onStatus) => {
+  try {
+    const job = await submitPolicyBatch('/custodian/batch/run', selection, credentials);
+    return await waitForJob(job, onStatus);
+  } catch (error) {
+    throw handleApiError(error);
+  }
+};
+
+export const dryRunPolicyBatch = async (selection, credentials, onStatus) => {
+  try {
+    const job = await submitPolicyBatch('/custodian/batch/dryrun', selection, credentials);
+    return await waitForJob(job, onStatus);
+  } catch (error) {
+    throw handleApiError(error);
+  }
+};
+
 export const getPolicyOutput = async (jobId) => {
   try {
     const response = await apiClient.get(`/custodian/outputs/${jobId}`);